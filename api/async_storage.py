@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+import functools
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Iterable, Protocol
+
+from .storage import (
+    NotEnoughPasswords,
+    PostgresPasswordStore,
+    Reservation,
+    Store,
+    counts_from_rows,
+)
+
+
+class AsyncStore(Protocol):
+    """Awaitable counterpart of :class:`~api.storage.Store` for handlers.
+
+    Schema setup stays on the blocking ``store`` at startup; everything the
+    API does per request is awaited so the event loop never waits on I/O.
+    """
+
+    hotel_id: str
+    store: Store
+
+    async def health(self) -> bool: ...
+    async def preview_import(self, passwords: Iterable[str]) -> dict: ...
+    async def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]: ...
+    async def stats(self) -> dict[str, int]: ...
+    async def reconcile_counters(self) -> dict[str, int]: ...
+    async def list_available(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> list[dict]: ...
+    async def list_generations(self, limit: int = 50) -> list[dict]: ...
+    async def get_generation(self, batch_id: str) -> dict | None: ...
+    async def delete_available(self, password_id: int) -> bool: ...
+    async def update_available(self, password_id: int, password: str) -> bool: ...
+    async def delete_available_many(self, password_ids: Iterable[int]) -> int: ...
+    async def issue_available(self, password_ids: Iterable[int]) -> list[str]: ...
+    async def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]: ...
+    async def import_passwords_with_stats(
+        self, passwords: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]: ...
+    async def update_available_with_stats(
+        self, password_id: int, password: str
+    ) -> tuple[bool, dict[str, int]]: ...
+    async def delete_available_with_stats(
+        self, password_id: int
+    ) -> tuple[bool, dict[str, int]]: ...
+    async def delete_available_many_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[int, dict[str, int]]: ...
+    async def issue_available_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[list[str], dict[str, int]]: ...
+    async def reserve(
+        self, count: int, ru_count: int = 0, en_count: int = 0
+    ) -> Reservation: ...
+    async def renew(self, batch_id: str) -> int: ...
+    async def commit(self, batch_id: str, profile: dict | None = None) -> int: ...
+    async def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int: ...
+    async def release_stale_reservations(
+        self, max_age_minutes: int | None = None, batch_size: int | None = None
+    ) -> int: ...
+    async def archive(
+        self, retention_days: int, batch_size: int = 1000
+    ) -> dict[str, int]: ...
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> AsyncStore: ...
+    async def close(self) -> None: ...
+    def pool_stats(self) -> dict | None: ...
+
+
+class ThreadedAsyncStore:
+    """Runs a blocking store on its own small thread pool.
+
+    SQLite has no async driver. A dedicated executor keeps its calls off the
+    event loop and out of the threadpool Starlette shares with file
+    responses, and each worker thread reuses its own tuned connection.
+    """
+
+    def __init__(self, store: Store, workers: int = 4):
+        self.store = store
+        self.hotel_id = store.hotel_id
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="wifi-voucher-db"
+        )
+        # Stores made by for_hotel() share the owner's executor and pools.
+        self._owner = self
+
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> ThreadedAsyncStore:
+        scoped = copy.copy(self)
+        scoped.store = self.store.for_hotel(hotel_id, hotel_name)
+        scoped.hotel_id = hotel_id
+        return scoped
+
+    async def _call(self, method: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(method, *args, **kwargs)
+        )
+
+    async def health(self) -> bool:
+        return await self._call(self.store.health)
+
+    async def preview_import(self, passwords: Iterable[str]) -> dict:
+        return await self._call(self.store.preview_import, list(passwords))
+
+    async def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]:
+        return await self._call(self.store.import_passwords, list(passwords))
+
+    async def stats(self) -> dict[str, int]:
+        return await self._call(self.store.stats)
+
+    async def reconcile_counters(self) -> dict[str, int]:
+        return await self._call(self.store.reconcile_counters)
+
+    async def list_available(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> list[dict]:
+        return await self._call(
+            self.store.list_available, limit, offset, search, after_id
+        )
+
+    async def list_generations(self, limit: int = 50) -> list[dict]:
+        return await self._call(self.store.list_generations, limit)
+
+    async def get_generation(self, batch_id: str) -> dict | None:
+        return await self._call(self.store.get_generation, batch_id)
+
+    async def delete_available(self, password_id: int) -> bool:
+        return await self._call(self.store.delete_available, password_id)
+
+    async def update_available(self, password_id: int, password: str) -> bool:
+        return await self._call(self.store.update_available, password_id, password)
+
+    async def delete_available_many(self, password_ids: Iterable[int]) -> int:
+        return await self._call(self.store.delete_available_many, list(password_ids))
+
+    async def issue_available(self, password_ids: Iterable[int]) -> list[str]:
+        return await self._call(self.store.issue_available, list(password_ids))
+
+    async def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]:
+        return await self._call(
+            self.store.list_available_with_stats, limit, offset, search, after_id
+        )
+
+    async def import_passwords_with_stats(
+        self, passwords: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        return await self._call(
+            self.store.import_passwords_with_stats, list(passwords)
+        )
+
+    async def update_available_with_stats(
+        self, password_id: int, password: str
+    ) -> tuple[bool, dict[str, int]]:
+        return await self._call(
+            self.store.update_available_with_stats, password_id, password
+        )
+
+    async def delete_available_with_stats(
+        self, password_id: int
+    ) -> tuple[bool, dict[str, int]]:
+        return await self._call(self.store.delete_available_with_stats, password_id)
+
+    async def delete_available_many_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[int, dict[str, int]]:
+        return await self._call(
+            self.store.delete_available_many_with_stats, list(password_ids)
+        )
+
+    async def issue_available_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[list[str], dict[str, int]]:
+        return await self._call(
+            self.store.issue_available_with_stats, list(password_ids)
+        )
+
+    async def reserve(
+        self, count: int, ru_count: int = 0, en_count: int = 0
+    ) -> Reservation:
+        return await self._call(self.store.reserve, count, ru_count, en_count)
+
+    async def renew(self, batch_id: str) -> int:
+        return await self._call(self.store.renew, batch_id)
+
+    async def commit(self, batch_id: str, profile: dict | None = None) -> int:
+        return await self._call(self.store.commit, batch_id, profile)
+
+    async def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int:
+        return await self._call(self.store.release, batch_id, error, profile)
+
+    async def release_stale_reservations(
+        self, max_age_minutes: int | None = None, batch_size: int | None = None
+    ) -> int:
+        return await self._call(
+            self.store.release_stale_reservations, max_age_minutes, batch_size
+        )
+
+    async def archive(
+        self, retention_days: int, batch_size: int = 1000
+    ) -> dict[str, int]:
+        return await self._call(self.store.archive, retention_days, batch_size)
+
+    async def close(self) -> None:
+        if self._owner is not self:
+            return
+        await self._call(self.store.close)
+        self._executor.shutdown(wait=True)
+
+    def pool_stats(self) -> dict | None:
+        return self.store.pool_stats()
+
+
+class AsyncPostgresPasswordStore(ThreadedAsyncStore):
+    """PostgreSQL on an async psycopg pool for the per-request queries.
+
+    Reads polled by the dashboard and the reserve → commit/release lifecycle
+    run natively on ``AsyncConnectionPool`` with the SQL of
+    :class:`~api.storage.PostgresPasswordStore`. Rare administrative writes
+    (imports, edits, archiving) keep using the blocking store on the
+    executor.
+    """
+
+    def __init__(self, store: PostgresPasswordStore, workers: int = 2):
+        super().__init__(store, workers=workers)
+        self.pool_bounds = store.split_pool()
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _get_pool(self):
+        if self._owner is not self:
+            return await self._owner._get_pool()
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    from psycopg.rows import dict_row
+                    from psycopg_pool import AsyncConnectionPool
+
+                    min_size, max_size = self.pool_bounds
+                    pool = AsyncConnectionPool(
+                        self.store.database_url,
+                        min_size=min_size,
+                        max_size=max_size,
+                        max_idle=self.store.pool_max_idle_seconds,
+                        timeout=self.store.pool_timeout_seconds,
+                        check=AsyncConnectionPool.check_connection,
+                        kwargs={
+                            "row_factory": dict_row,
+                            "connect_timeout": 15,
+                            "application_name": "wifi-voucher",
+                        },
+                        name="wifi-voucher-async",
+                        open=False,
+                    )
+                    await pool.open()
+                    self._pool = pool
+        return self._pool
+
+    @asynccontextmanager
+    async def _connection(self):
+        # The pool commits on success and rolls back on error.
+        async with (await self._get_pool()).connection() as connection:
+            yield connection
+
+    async def _fetchall(self, query: tuple[str, tuple]) -> list[dict]:
+        async with self._connection() as connection:
+            cursor = await connection.execute(*query)
+            return await cursor.fetchall()
+
+    async def _run_counted(self, queries: list[tuple[str, tuple]]) -> int:
+        async with self._connection() as connection:
+            counted, *rest = queries
+            cursor = await connection.execute(*counted)
+            for query in rest:
+                await connection.execute(*query)
+        return cursor.rowcount
+
+    async def health(self) -> bool:
+        rows = await self._fetchall(("SELECT 1 AS ok", ()))
+        return rows[0]["ok"] == 1
+
+    async def stats(self) -> dict[str, int]:
+        return counts_from_rows(await self._fetchall(self.store._stats_query()))
+
+    async def list_available(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> list[dict]:
+        query = self.store._available_query(limit, offset, search, after_id)
+        return [dict(row) for row in await self._fetchall(query)]
+
+    async def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]:
+        query = self.store._available_query(limit, offset, search, after_id)
+        async with self._connection() as connection:
+            # Both queries go out in one network round trip.
+            async with connection.pipeline():
+                items = await connection.execute(*query)
+                counters = await connection.execute(*self.store._stats_query())
+            rows = await items.fetchall()
+            stats = counts_from_rows(await counters.fetchall())
+        return [dict(row) for row in rows], stats
+
+    async def list_generations(self, limit: int = 50) -> list[dict]:
+        query = self.store._generations_query(limit)
+        return [dict(row) for row in await self._fetchall(query)]
+
+    async def get_generation(self, batch_id: str) -> dict | None:
+        query = self.store._generation_query(batch_id)
+        if query is None:
+            return None
+        rows = await self._fetchall(query)
+        return dict(rows[0]) if rows else None
+
+    async def reserve(
+        self, count: int, ru_count: int = 0, en_count: int = 0
+    ) -> Reservation:
+        if count <= 0:
+            return Reservation(batch_id="", passwords=())
+
+        batch_id = uuid.uuid4()
+        select, writes = self.store._reserve_queries(
+            batch_id, count, ru_count, en_count
+        )
+        async with self._connection() as connection:
+            cursor = await connection.execute(*select)
+            rows = await cursor.fetchall()
+            if len(rows) < count:
+                raise NotEnoughPasswords(needed=count, available=len(rows))
+            for query in writes([row["id"] for row in rows]):
+                await connection.execute(*query)
+        return Reservation(
+            batch_id=str(batch_id),
+            passwords=tuple(row["password"] for row in rows),
+            ids=tuple(row["id"] for row in rows),
+        )
+
+    async def renew(self, batch_id: str) -> int:
+        return await self._run_counted([self.store._renew_query(batch_id)])
+
+    async def commit(self, batch_id: str, profile: dict | None = None) -> int:
+        return await self._run_counted(self.store._commit_queries(batch_id, profile))
+
+    async def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int:
+        return await self._run_counted(
+            self.store._release_queries(batch_id, error, profile)
+        )
+
+    async def close(self) -> None:
+        if self._owner is not self:
+            return
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+        await super().close()
+
+    def pool_stats(self) -> dict | None:
+        if self._owner is not self:
+            return self._owner.pool_stats()
+        payload = self.store.pool_stats()
+        if self._pool is None:
+            return payload
+        stats = self._pool.get_stats()
+        return {
+            **(payload or {}),
+            "async": {
+                "size": stats.get("pool_size", 0),
+                "available": stats.get("pool_available", 0),
+                "waiting": stats.get("requests_waiting", 0),
+                "min_size": self.pool_bounds[0],
+                "max_size": self.pool_bounds[1],
+                "connections_lost": stats.get("connections_lost", 0),
+            },
+        }
+
+
+def create_async_store(store: Store, workers: int = 4) -> AsyncStore:
+    if isinstance(store, PostgresPasswordStore):
+        return AsyncPostgresPasswordStore(store, workers=workers)
+    return ThreadedAsyncStore(store, workers=workers)
@@ -1,16 +1,50 @@
 from __future__ import annotations
 
+import hashlib
+import io
+import json
+import math
+import multiprocessing
 import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from xml.sax.saxutils import escape as xml_escape
 from pathlib import Path
 import copy
 from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 from pptx.util import Emu
-from pypdf import PdfMerger
+from typing import Iterator
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+)
+
+from .pdfstream import StreamingPdfWriter
+from .profiling import RenderProfile
+from .qr import QR_BORDER, qr_matrix, qr_pixels_for_box, qr_png_batch
+from .render_cache import RenderCache
 
 PASSWORD_TOKEN = "{{PASSWORD}}"
 QR_TOKEN = "{{QR_WIFI}}"
 
+# Same look as client/pdf.js, so both engines print identical brochures.
+PDF_FONT_SIZE = 18
+PDF_TEXT_COLOR = (0.05, 0.05, 0.06)
+PDF_LANGUAGES = ("ru", "en")
+# Part of every render cache key; bump it when the PPTX path starts producing
+# different PDFs for the same template and password.
+RENDER_CACHE_VERSION = 1
+_OVERLAY_NAME = NameObject("/VoucherOverlay")
+
 def _iter_shapes_recursive(shapes):
     for sh in shapes:
         yield sh
@@ -89,6 +123,122 @@ def render_single_brochure_pptx(template_path: str, password: str, qr_png_path:
         _insert_qr(slide, qr_png_path)
     prs.save(out_pptx_path)
 
+def _placeholder_png() -> bytes:
+    from PIL import Image
+
+    # Distinct pixels, so the placeholder never collides with template media.
+    image = Image.new("RGB", (2, 2), (0x51, 0x52, 0x57))
+    image.putpixel((1, 1), (0x49, 0x46, 0x49))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """A PPTX template prepared once per process.
+
+    Token search, run merging and QR shape replacement happen at compile
+    time. Every unchanged part lives in ``base_zip`` and is copied byte for
+    byte; an instance only appends the slide XML holding the password and
+    the QR media part.
+    """
+
+    path: str
+    mtime_ns: int
+    size: int
+    digest: str
+    base_zip: bytes
+    slides: dict[str, bytes]
+    qr_part: str | None
+    qr_pixels: int | None
+
+    @classmethod
+    def compile(cls, template_path: str) -> "CompiledTemplate":
+        source = Path(template_path)
+        data = source.read_bytes()
+        stat = source.stat()
+        placeholder = _placeholder_png()
+
+        prs = Presentation(io.BytesIO(data))
+        qr_width = 0
+        for slide in prs.slides:
+            # Merges split runs so the token sits in one <a:t> element.
+            _replace_password(slide, PASSWORD_TOKEN)
+            _insert_qr(slide, io.BytesIO(placeholder))
+            for shape in slide.shapes:
+                if (
+                    shape.shape_type == MSO_SHAPE_TYPE.PICTURE
+                    and shape.image.blob == placeholder
+                ):
+                    qr_width = max(qr_width, shape.width)
+        prepared = io.BytesIO()
+        prs.save(prepared)
+
+        token = PASSWORD_TOKEN.encode("utf-8")
+        slides: dict[str, bytes] = {}
+        qr_part = None
+        base = io.BytesIO()
+        with zipfile.ZipFile(prepared) as source_zip, zipfile.ZipFile(
+            base, "w", zipfile.ZIP_DEFLATED
+        ) as base_zip:
+            for info in source_zip.infolist():
+                content = source_zip.read(info)
+                if info.filename.endswith(".xml") and token in content:
+                    slides[info.filename] = content
+                elif content == placeholder:
+                    qr_part = info.filename
+                else:
+                    base_zip.writestr(info, content, zipfile.ZIP_DEFLATED)
+        return cls(
+            path=template_path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=hashlib.sha256(data).hexdigest(),
+            base_zip=base.getvalue(),
+            slides=slides,
+            qr_part=qr_part,
+            qr_pixels=qr_pixels_for_box(qr_width) if qr_width else None,
+        )
+
+    def render(self, password: str, qr_png: bytes, out_pptx_path: str) -> None:
+        value = xml_escape(password).encode("utf-8")
+        token = PASSWORD_TOKEN.encode("utf-8")
+        with open(out_pptx_path, "wb") as output:
+            output.write(self.base_zip)
+        with zipfile.ZipFile(out_pptx_path, "a", zipfile.ZIP_DEFLATED) as out:
+            for name, content in self.slides.items():
+                out.writestr(name, content.replace(token, value))
+            if self.qr_part is not None:
+                # PNG is already compressed.
+                out.writestr(self.qr_part, qr_png, zipfile.ZIP_STORED)
+
+
+_compiled_templates: dict[str, CompiledTemplate] = {}
+_compiled_templates_lock = threading.Lock()
+
+
+def compiled_template(template_path: str) -> CompiledTemplate:
+    """Return the cached template, recompiling when the file has changed."""
+    stat = Path(template_path).stat()
+    with _compiled_templates_lock:
+        cached = _compiled_templates.get(template_path)
+        if cached is not None and (cached.mtime_ns, cached.size) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return cached
+        if cached is not None:
+            digest = hashlib.sha256(Path(template_path).read_bytes()).hexdigest()
+            if digest == cached.digest:
+                cached = replace(cached, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                _compiled_templates[template_path] = cached
+                return cached
+        cached = CompiledTemplate.compile(template_path)
+        _compiled_templates[template_path] = cached
+        return cached
+
+
 def _copy_slide(dest_prs: Presentation, src_slide):
     layout = dest_prs.slide_layouts[0]
     new_slide = dest_prs.slides.add_slide(layout)
@@ -176,15 +326,74 @@ def convert_pptx_to_pdf(
     return pdf_path
 
 
+def batch_timeout_seconds(batch_size: int) -> int:
+    return max(120, 30 + batch_size * 15)
+
+
+def run_soffice_batch(
+    soffice_bin: str,
+    profile_dir: Path,
+    batch: list[Path],
+    output_dir: Path,
+    timeout_seconds: int,
+) -> list[str]:
+    """Convert one batch with a single LibreOffice process and profile."""
+    import subprocess
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    cmd = [
+        soffice_bin,
+        f"-env:UserInstallation={profile_dir.resolve().as_uri()}",
+        "--headless",
+        "--nologo",
+        "--nofirststartwizard",
+        "--norestore",
+        "--convert-to",
+        "pdf",
+        "--outdir",
+        str(output_dir),
+        *[str(path) for path in batch],
+    ]
+    try:
+        proc = subprocess.run(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout_seconds,
+        )
+    except subprocess.TimeoutExpired as error:
+        raise RuntimeError(
+            f"LibreOffice batch conversion timed out after "
+            f"{timeout_seconds} seconds."
+        ) from error
+    if proc.returncode != 0:
+        message = proc.stderr.strip() or proc.stdout.strip()
+        raise RuntimeError(
+            f"LibreOffice batch convert failed ({proc.returncode}): "
+            f"{message}"
+        )
+
+    pdf_paths: list[str] = []
+    for pptx_path in batch:
+        pdf_path = output_dir / f"{pptx_path.stem}.pdf"
+        if not pdf_path.exists():
+            raise RuntimeError(
+                f"PDF file was not produced by LibreOffice: "
+                f"{pptx_path.name}"
+            )
+        pdf_paths.append(str(pdf_path))
+    return pdf_paths
+
+
 def convert_pptx_batch_to_pdf(
     soffice_bin: str,
     pptx_paths: list[str],
     out_dir: str,
     batch_size: int = 100,
+    profile: RenderProfile | None = None,
 ) -> list[str]:
     """Convert many presentations with one LibreOffice start per batch."""
-    import subprocess
-
     if not pptx_paths:
         return []
     if batch_size < 1:
@@ -197,96 +406,551 @@ def convert_pptx_batch_to_pdf(
 
     for batch_index, start in enumerate(range(0, len(resolved_paths), batch_size)):
         batch = resolved_paths[start:start + batch_size]
-        profile_dir = output_dir / f"lo_profile_batch_{batch_index:04d}"
-        profile_dir.mkdir(parents=True, exist_ok=True)
-        cmd = [
-            soffice_bin,
-            f"-env:UserInstallation={profile_dir.resolve().as_uri()}",
-            "--headless",
-            "--nologo",
-            "--nofirststartwizard",
-            "--norestore",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            str(output_dir),
-            *[str(path) for path in batch],
-        ]
-        timeout_seconds = max(120, 30 + len(batch) * 15)
+        started = time.perf_counter()
         try:
-            proc = subprocess.run(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=timeout_seconds,
-            )
-        except subprocess.TimeoutExpired as error:
-            raise RuntimeError(
-                f"LibreOffice batch conversion timed out after "
-                f"{timeout_seconds} seconds."
-            ) from error
-        if proc.returncode != 0:
-            message = proc.stderr.strip() or proc.stdout.strip()
-            raise RuntimeError(
-                f"LibreOffice batch convert failed ({proc.returncode}): "
-                f"{message}"
+            pdf_paths.extend(
+                run_soffice_batch(
+                    soffice_bin,
+                    output_dir / f"lo_profile_batch_{batch_index:04d}",
+                    batch,
+                    output_dir,
+                    batch_timeout_seconds(len(batch)),
+                )
             )
+        except Exception:
+            if profile is not None:
+                profile.office_failure(time.perf_counter() - started)
+            raise
+        if profile is not None:
+            profile.office_batch(len(batch), time.perf_counter() - started)
+
+    return pdf_paths
+
+def _render_pptx_chunk(jobs: list[tuple[str, str, bytes, str]]) -> list[str]:
+    """Process-pool work unit: one PPTX instance per password."""
+    pptx_paths = []
+    for template_path, password, qr_png_bytes, out_pptx_path in jobs:
+        compiled_template(template_path).render(
+            password, qr_png_bytes, out_pptx_path
+        )
+        pptx_paths.append(out_pptx_path)
+    return pptx_paths
+
+
+def render_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool for PPTX instances and QR codes.
+
+    Workers start from a fork server (or are spawned where there is none),
+    never forked from the server process itself: a fork could copy the
+    template cache, logging or database pool locks while another thread
+    holds them, and the child would hang on its first render.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def render_pptx_parts(
+    jobs: list[tuple[str, str, bytes, str]],
+    executor=None,
+    workers: int = 1,
+) -> list[str]:
+    """Instantiate every brochure, in parallel when an executor is given.
+
+    Chunks keep pickling overhead low, and ``executor.map`` returns them in
+    submission order, so the output stays RU first, then EN.
+    """
+    if executor is None or len(jobs) < 2:
+        return _render_pptx_chunk(jobs)
+    chunk_size = min(50, max(1, math.ceil(len(jobs) / (workers * 4))))
+    chunks = [
+        jobs[start:start + chunk_size]
+        for start in range(0, len(jobs), chunk_size)
+    ]
+    return [
+        path
+        for chunk_paths in executor.map(_render_pptx_chunk, chunks)
+        for path in chunk_paths
+    ]
+
+
+def brochure_cache_key(soffice_bin: str, template: str, password: str) -> str:
+    """What a PPTX-path brochure PDF depends on."""
+    compiled = compiled_template(template)
+    return RenderCache.key(
+        RENDER_CACHE_VERSION,
+        soffice_bin,
+        compiled.digest,
+        compiled.qr_pixels,
+        QR_BORDER,
+        password,
+    )
 
-        for pptx_path in batch:
-            pdf_path = output_dir / f"{pptx_path.stem}.pdf"
-            if not pdf_path.exists():
-                raise RuntimeError(
-                    f"PDF file was not produced by LibreOffice: "
-                    f"{pptx_path.name}"
+
+def render_brochure_pdfs(
+    soffice_bin: str,
+    brochures: list[tuple[str, str, str]],
+    pdf_dir: str,
+    qr_pngs: list[bytes] | None = None,
+    office_pool=None,
+    executor=None,
+    workers: int = 1,
+    profile: RenderProfile | None = None,
+    render_cache: RenderCache | None = None,
+) -> list[str]:
+    """One PDF per ``(template, password, out_pptx)``, in the same order.
+
+    The intermediate PPTX files are removed once they are converted. With
+    ``render_cache`` only brochures it has not seen are rendered; callers
+    passing their own QR codes bypass it.
+    """
+    if profile is None:
+        profile = RenderProfile()
+    if render_cache is None or qr_pngs is not None:
+        return _render_brochure_pdfs(
+            soffice_bin,
+            brochures,
+            pdf_dir,
+            qr_pngs,
+            office_pool,
+            executor,
+            workers,
+            profile,
+        )
+
+    pdfs: list[str | None] = [None] * len(brochures)
+    with profile.phase("cache"):
+        keys = [
+            brochure_cache_key(soffice_bin, template, password)
+            for template, password, _out in brochures
+        ]
+        for index, (key, (_template, _password, out)) in enumerate(
+            zip(keys, brochures)
+        ):
+            target = Path(pdf_dir) / f"{Path(out).stem}.pdf"
+            if render_cache.fetch(key, target):
+                pdfs[index] = str(target)
+    missing = [index for index, pdf in enumerate(pdfs) if pdf is None]
+    rendered = _render_brochure_pdfs(
+        soffice_bin,
+        [brochures[index] for index in missing],
+        pdf_dir,
+        None,
+        office_pool,
+        executor,
+        workers,
+        profile,
+    )
+    with profile.phase("cache"):
+        for index, pdf in zip(missing, rendered):
+            render_cache.store(keys[index], pdf)
+            pdfs[index] = pdf
+    return pdfs
+
+
+def _render_brochure_pdfs(
+    soffice_bin: str,
+    brochures: list[tuple[str, str, str]],
+    pdf_dir: str,
+    qr_pngs: list[bytes] | None,
+    office_pool,
+    executor,
+    workers: int,
+    profile: RenderProfile,
+) -> list[str]:
+    if not brochures:
+        return []
+    # QR codes are rendered in memory at the template's box size,
+    # through the cache, unless prepared ones were passed in.
+    with profile.phase("qr"):
+        if qr_pngs is None:
+            qr_pngs = [b""] * len(brochures)
+            for template in {path for path, _pwd, _out in brochures}:
+                indexes = [
+                    index
+                    for index, (path, _pwd, _out) in enumerate(brochures)
+                    if path == template
+                ]
+                rendered = qr_png_batch(
+                    [brochures[index][1] for index in indexes],
+                    size=compiled_template(template).qr_pixels,
+                    executor=executor,
                 )
-            pdf_paths.append(str(pdf_path))
+                for index, png in zip(indexes, rendered):
+                    qr_pngs[index] = png
 
-    return pdf_paths
+    with profile.phase("pptx"):
+        jobs = [
+            (template, pwd, qr_png, out)
+            for (template, pwd, out), qr_png in zip(brochures, qr_pngs)
+        ]
+        pptx_paths = render_pptx_parts(jobs, executor=executor, workers=workers)
+
+    # LibreOffice startup is the expensive part. Converting the whole
+    # package in batches avoids starting a new office process for every
+    # voucher; the warm pool additionally reuses profiles and converts
+    # batches in parallel.
+    with profile.phase("convert"):
+        if office_pool is not None:
+            pdfs = office_pool.convert(pptx_paths, pdf_dir, profile=profile)
+        else:
+            pdfs = convert_pptx_batch_to_pdf(
+                soffice_bin,
+                pptx_paths,
+                pdf_dir,
+                profile=profile,
+            )
+    for pptx_path in pptx_paths:
+        Path(pptx_path).unlink(missing_ok=True)
+    return pdfs
 
-def build_merged_pdf(
+
+def iter_merged_pdf(
     soffice_bin: str,
     template_ru: str,
     template_en: str,
     ru_passwords: list[str],
     en_passwords: list[str],
-    qr_png_paths: list[str],
     work_dir: str,
-    out_pdf_path: str
-):
+    qr_png_paths: list[str] | None = None,
+    office_pool=None,
+    executor=None,
+    workers: int = 1,
+    profile: RenderProfile | None = None,
+    chunk_size: int | None = None,
+    render_cache: RenderCache | None = None,
+) -> Iterator[bytes]:
+    """Render brochures through PPTX and LibreOffice, yielding PDF pieces.
+
+    Every chunk is instantiated, converted and streamed out before the next
+    one starts; its intermediate files are removed right away.
+    """
     work = Path(work_dir)
     pdf_dir = work / "pdf_parts"
     pdf_dir.mkdir(parents=True, exist_ok=True)
+    if profile is None:
+        profile = RenderProfile()
+
+    # Порядок: сначала RU, потом EN.
+    brochures = [
+        (template_ru, pwd, str(work / f"ru_{i:04d}.pptx"))
+        for i, pwd in enumerate(ru_passwords, start=1)
+    ] + [
+        (template_en, pwd, str(work / f"en_{i:04d}.pptx"))
+        for i, pwd in enumerate(en_passwords, start=1)
+    ]
+    chunk_size = chunk_size or max(1, len(brochures))
+    writer = StreamingPdfWriter()
 
-    pptx_paths: list[str] = []
+    for start in range(0, len(brochures), chunk_size):
+        pdfs = render_brochure_pdfs(
+            soffice_bin,
+            brochures[start:start + chunk_size],
+            str(pdf_dir),
+            qr_pngs=(
+                None
+                if qr_png_paths is None
+                else [
+                    Path(path).read_bytes()
+                    for path in qr_png_paths[start:start + chunk_size]
+                ]
+            ),
+            office_pool=office_pool,
+            executor=executor,
+            workers=workers,
+            profile=profile,
+            render_cache=render_cache,
+        )
+        with profile.phase("merge"):
+            pieces = []
+            for pdf_path in pdfs:
+                for page in PdfReader(pdf_path).pages:
+                    pieces.append(writer.add_page(page))
+                Path(pdf_path).unlink(missing_ok=True)
+        yield profile.wrote(b"".join(pieces), len(pdfs))
+
+    yield profile.finish(writer)
+
+
+def iter_concatenated_pdf(
+    pdf_paths: list[str],
+    chunk_size: int = 50,
+    profile: RenderProfile | None = None,
+) -> Iterator[bytes]:
+    """Join ready brochure PDFs in order, deleting each one once it is read."""
+    if profile is None:
+        profile = RenderProfile()
+    writer = StreamingPdfWriter()
+    try:
+        for start in range(0, len(pdf_paths), chunk_size):
+            chunk = pdf_paths[start:start + chunk_size]
+            with profile.phase("cached"):
+                pieces = []
+                for pdf_path in chunk:
+                    for page in PdfReader(pdf_path).pages:
+                        pieces.append(writer.add_page(page))
+                    Path(pdf_path).unlink(missing_ok=True)
+            yield profile.wrote(b"".join(pieces), len(chunk))
+        yield profile.finish(writer)
+    finally:
+        for pdf_path in pdf_paths:
+            Path(pdf_path).unlink(missing_ok=True)
 
-    # QR paths aligned: сначала RU, потом EN
-    idx = 0
 
-    # RU
-    for i, pwd in enumerate(ru_passwords, start=1):
-        idx += 1
-        pptx_out = work / f"ru_{i:04d}.pptx"
-        render_single_brochure_pptx(template_ru, pwd, qr_png_paths[idx-1], str(pptx_out))
-        pptx_paths.append(str(pptx_out))
+def build_merged_pdf(
+    soffice_bin: str,
+    template_ru: str,
+    template_en: str,
+    ru_passwords: list[str],
+    en_passwords: list[str],
+    qr_png_paths: list[str] | None,
+    work_dir: str,
+    out_pdf_path: str,
+    office_pool=None,
+    executor=None,
+    workers: int = 1,
+    profile: RenderProfile | None = None,
+    render_cache: RenderCache | None = None,
+):
+    with open(out_pdf_path, "wb") as output:
+        for piece in iter_merged_pdf(
+            soffice_bin,
+            template_ru,
+            template_en,
+            ru_passwords,
+            en_passwords,
+            work_dir,
+            qr_png_paths=qr_png_paths,
+            office_pool=office_pool,
+            executor=executor,
+            workers=workers,
+            profile=profile,
+            render_cache=render_cache,
+        ):
+            output.write(piece)
+
+
+def pdf_templates_available(template_dir: str) -> bool:
+    root = Path(template_dir)
+    return (root / "layout.json").exists() and all(
+        (root / f"brochure_{language}.pdf").exists()
+        for language in PDF_LANGUAGES
+    )
 
-    # EN
-    for i, pwd in enumerate(en_passwords, start=1):
-        idx += 1
-        pptx_out = work / f"en_{i:04d}.pptx"
-        render_single_brochure_pptx(template_en, pwd, qr_png_paths[idx-1], str(pptx_out))
-        pptx_paths.append(str(pptx_out))
 
-    # LibreOffice startup is the expensive part. Converting the whole package
-    # in batches avoids starting a new office process for every voucher.
-    pdfs = convert_pptx_batch_to_pdf(
-        soffice_bin,
-        pptx_paths,
-        str(pdf_dir),
+def load_pdf_layout(template_dir: str) -> dict:
+    """Read the token boxes written by scripts/build_web_templates.py."""
+    layout_path = Path(template_dir) / "layout.json"
+    return json.loads(layout_path.read_text(encoding="utf-8"))["templates"]
+
+
+@lru_cache(maxsize=None)
+def _register_pdf_font(font_path: str) -> str:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    font_name = f"Voucher-{Path(font_path).stem}"
+    pdfmetrics.registerFont(TTFont(font_name, font_path))
+    return font_name
+
+
+def _box_on_page(box: dict, metadata: dict, page_width: float, page_height: float):
+    # layout.json keeps PPTX coordinates: EMU with the origin at the top left.
+    scale_x = page_width / metadata["slide_width"]
+    scale_y = page_height / metadata["slide_height"]
+    return (
+        box["left"] * scale_x,
+        page_height - (box["top"] + box["height"]) * scale_y,
+        box["width"] * scale_x,
+        box["height"] * scale_y,
+    )
+
+
+def _draw_qr(overlay, matrix, x, y, width, height) -> None:
+    # Vector modules stay sharp at any print resolution and need no PNG.
+    size = len(matrix)
+    module_width = width / size
+    module_height = height / size
+    overlay.setFillColorRGB(1, 1, 1)
+    overlay.rect(x, y, width, height, stroke=0, fill=1)
+    path = overlay.beginPath()
+    for row_index, row in enumerate(matrix):
+        top = y + height - (row_index + 1) * module_height
+        column = 0
+        while column < size:
+            if not row[column]:
+                column += 1
+                continue
+            start = column
+            while column < size and row[column]:
+                column += 1
+            path.rect(
+                x + start * module_width,
+                top,
+                (column - start) * module_width,
+                module_height,
+            )
+    overlay.setFillColorRGB(0, 0, 0)
+    overlay.drawPath(path, stroke=0, fill=1)
+
+
+def _overlay_pages(metadata: dict) -> list[int]:
+    return sorted({metadata["password"]["page"], metadata["qr"]["page"]})
+
+
+def _draw_overlays(
+    layout: dict,
+    page_sizes: dict[str, tuple[float, float]],
+    brochures: list[tuple[str, str]],
+    font_path: str,
+) -> bytes:
+    """Draw every password and QR into one overlay PDF, page by page.
+
+    A single document embeds the font subset once for the whole package.
+    """
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfgen import canvas
+
+    font_name = _register_pdf_font(font_path)
+    buffer = io.BytesIO()
+    overlay = canvas.Canvas(buffer, pageCompression=1)
+    for language, password in brochures:
+        metadata = layout[language]
+        page_width, page_height = page_sizes[language]
+        for page_index in _overlay_pages(metadata):
+            overlay.setPageSize((page_width, page_height))
+            if metadata["password"]["page"] == page_index:
+                x, y, width, _ = _box_on_page(
+                    metadata["password"], metadata, page_width, page_height
+                )
+                text_width = pdfmetrics.stringWidth(
+                    password, font_name, PDF_FONT_SIZE
+                )
+                overlay.setFont(font_name, PDF_FONT_SIZE)
+                overlay.setFillColorRGB(*PDF_TEXT_COLOR)
+                overlay.drawString(
+                    x + max(0, (width - text_width) / 2), y + 2, password
+                )
+            if metadata["qr"]["page"] == page_index:
+                x, y, width, height = _box_on_page(
+                    metadata["qr"], metadata, page_width, page_height
+                )
+                _draw_qr(overlay, qr_matrix(password), x, y, width, height)
+            overlay.showPage()
+    overlay.save()
+    return buffer.getvalue()
+
+
+def _stamp_page(source_page, overlay_page, wrap: tuple) -> DictionaryObject:
+    """Attach an overlay page to a template page as one Form XObject.
+
+    The template content stream and resources stay shared between all
+    brochures; each output page only gets its own small resource dictionary.
+    """
+    form = DecodedStreamObject()
+    form.set_data(overlay_page.get_contents().get_data())
+    form = form.flate_encode()
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/BBox")] = overlay_page.mediabox
+    form[NameObject("/Resources")] = overlay_page.raw_get("/Resources")
+
+    page = DictionaryObject(
+        {key: source_page.raw_get(key) for key in source_page}
     )
+    resources = DictionaryObject(source_page["/Resources"])
+    xobjects = DictionaryObject(resources.get("/XObject", {}))
+    xobjects[_OVERLAY_NAME] = form
+    resources[NameObject("/XObject")] = xobjects
+    page[NameObject("/Resources")] = resources
+
+    contents = source_page.raw_get("/Contents")
+    if isinstance(contents.get_object(), ArrayObject):
+        contents = list(contents.get_object())
+    else:
+        contents = [contents]
+    page[NameObject("/Contents")] = ArrayObject([wrap[0], *contents, wrap[1]])
+    return page
+
+
+def iter_merged_pdf_overlay(
+    template_dir: str,
+    font_path: str,
+    ru_passwords: list[str],
+    en_passwords: list[str],
+    chunk_size: int = 50,
+    profile: RenderProfile | None = None,
+) -> Iterator[bytes]:
+    """Stamp passwords and QR codes onto pre-rendered PDF templates.
+
+    Mirrors client/pdf.js: no PPTX and no LibreOffice on the request path.
+    Yields the output PDF in pieces, one per chunk of brochures.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    if profile is None:
+        profile = RenderProfile()
+    with profile.phase("templates"):
+        layout = load_pdf_layout(template_dir)
+        readers = {
+            language: PdfReader(Path(template_dir) / f"brochure_{language}.pdf")
+            for language in PDF_LANGUAGES
+        }
+        page_sizes = {
+            language: (
+                float(reader.pages[layout[language]["password"]["page"]].mediabox.width),
+                float(reader.pages[layout[language]["password"]["page"]].mediabox.height),
+            )
+            for language, reader in readers.items()
+        }
+    brochures = [("ru", pwd) for pwd in ru_passwords] + [
+        ("en", pwd) for pwd in en_passwords
+    ]
 
-    merger = PdfMerger()
-    for p in pdfs:
-        merger.append(p)
-    merger.write(out_pdf_path)
-    merger.close()
+    writer = StreamingPdfWriter()
+    wrap = []
+    for data in (b"q\n", b"\nQ\nq /VoucherOverlay Do Q\n"):
+        stream = DecodedStreamObject()
+        stream.set_data(data)
+        wrap.append(stream)
+
+    for start in range(0, len(brochures), chunk_size):
+        chunk = brochures[start:start + chunk_size]
+        with profile.phase("overlay"):
+            overlays = PdfReader(
+                io.BytesIO(_draw_overlays(layout, page_sizes, chunk, font_path))
+            )
+        with profile.phase("merge"):
+            pieces = []
+            overlay_index = 0
+            for language, _password in chunk:
+                stamped = _overlay_pages(layout[language])
+                for page_index, source_page in enumerate(readers[language].pages):
+                    if page_index in stamped:
+                        page = _stamp_page(
+                            source_page, overlays.pages[overlay_index], tuple(wrap)
+                        )
+                        overlay_index += 1
+                    else:
+                        page = source_page
+                    pieces.append(writer.add_page(page))
+        yield profile.wrote(b"".join(pieces), len(chunk))
+    yield profile.finish(writer)
+
+
+def build_merged_pdf_overlay(
+    template_dir: str,
+    font_path: str,
+    ru_passwords: list[str],
+    en_passwords: list[str],
+    out_pdf_path: str,
+    profile: RenderProfile | None = None,
+):
+    with open(out_pdf_path, "wb") as output:
+        for piece in iter_merged_pdf_overlay(
+            template_dir, font_path, ru_passwords, en_passwords, profile=profile
+        ):
+            output.write(piece)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from .async_storage import AsyncStore
+
+
+@dataclass(frozen=True)
+class HotelConfig:
+    """One hotel served by this process and the templates it prints with."""
+
+    id: str
+    name: str
+    template_ru_path: str
+    template_en_path: str
+    pdf_template_dir: str
+    # Generation jobs this hotel may have queued or running (0 = no limit).
+    max_pending_jobs: int = 0
+
+
+@dataclass
+class Tenant:
+    config: HotelConfig
+    store: AsyncStore
+
+
+def load_hotels(path: str, default: HotelConfig) -> dict[str, HotelConfig]:
+    """Read the hotels file; ``default`` is always served first.
+
+    The file is a JSON list of objects with ``id``, ``name`` and optionally
+    any other ``HotelConfig`` field; missing fields are taken from
+    ``default``, so hotels share its templates unless they set their own.
+    """
+    hotels = {default.id: default}
+    if not path:
+        return hotels
+    entries = json.loads(Path(path).read_text(encoding="utf-8"))
+    if not isinstance(entries, list):
+        raise ValueError("Hotels file must contain a JSON list")
+    for entry in entries:
+        hotel_id = str(entry.get("id", "")).strip()
+        if not hotel_id:
+            raise ValueError("Every hotel needs an id")
+        if hotel_id in hotels and hotel_id != default.id:
+            raise ValueError(f"Duplicate hotel id: {hotel_id}")
+        hotels[hotel_id] = replace(
+            default,
+            **{key: value for key, value in entry.items() if key != "id"},
+            id=hotel_id,
+        )
+    return hotels
@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import shutil
+import tempfile
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Callable
+
+from .async_storage import AsyncStore
+from .metrics import EXPIRED_LEASES, record_generation
+from .profiling import RenderProfile
+from .storage import Reservation
+
+logger = logging.getLogger(__name__)
+
+
+class RenderSlots:
+    """Renders allowed at once across jobs, streams and ``?wait=true``.
+
+    Request handlers call ``try_acquire()`` and answer 429 when it fails,
+    so a burst never queues behind the cap; the check and the increment
+    happen without an ``await`` in between. Job workers, which already wait
+    in their own queue, use ``async with`` and wait for a free slot.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.busy = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    def locked(self) -> bool:
+        return self.busy >= self.capacity
+
+    def try_acquire(self) -> bool:
+        if self.locked():
+            return False
+        self.busy += 1
+        return True
+
+    async def acquire(self) -> None:
+        while not self.try_acquire():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+
+    def release(self) -> None:
+        self.busy -= 1
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    async def __aenter__(self) -> RenderSlots:
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *_exc) -> None:
+        self.release()
+
+
+@dataclass
+class GenerationJob:
+    """One queued generation; ``id`` is the reservation batch id."""
+
+    reservation: Reservation
+    ru_count: int
+    en_count: int
+    # The hotel's store; commits, releases and renewals go through it.
+    store: AsyncStore = field(repr=False)
+    status: str = "queued"
+    done: int = 0
+    error: str | None = None
+    profile: RenderProfile = field(default_factory=RenderProfile)
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    work_dir: Path | None = None
+    pdf_path: Path | None = None
+
+    @property
+    def id(self) -> str:
+        return self.reservation.batch_id
+
+    @property
+    def hotel_id(self) -> str:
+        return self.store.hotel_id
+
+    @property
+    def total(self) -> int:
+        return self.ru_count + self.en_count
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "hotel_id": self.hotel_id,
+            "status": self.status,
+            "ru_count": self.ru_count,
+            "en_count": self.en_count,
+            "total": self.total,
+            "done": self.done,
+            "error": self.error,
+            "profile": self.profile.to_dict(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+# Renders a job into ``work_dir`` and returns the PDF path. It is called in
+# a worker thread and reports finished brochures through the callback.
+RenderJob = Callable[[GenerationJob, Path, Callable[[int], None]], str]
+
+
+class JobManager:
+    """In-process queue of generation jobs.
+
+    Passwords are reserved when a job is enqueued, so a missing stock is
+    reported immediately. Workers follow the usual reserve → commit/release
+    lifecycle, and a housekeeping loop renews leases of queued and running
+    jobs and drops finished PDFs after the retention period.
+
+    Each hotel has its own queue and workers take from them in turn, so a
+    hotel that enqueues a hundred jobs delays another hotel by at most one.
+    """
+
+    def __init__(
+        self,
+        store: AsyncStore,
+        render: RenderJob,
+        workers: int = 1,
+        lease_renewal_seconds: float = 60,
+        retention_seconds: float = 1800,
+        slots: RenderSlots | None = None,
+    ):
+        self.store = store
+        self.render = render
+        self.workers = workers
+        self.lease_renewal_seconds = lease_renewal_seconds
+        self.retention_seconds = retention_seconds
+        # Render capacity shared with the synchronous generation endpoints.
+        self.slots = slots
+        self.jobs: dict[str, GenerationJob] = {}
+        # Hotels with waiting jobs, in the order they get the next worker.
+        self._queues: dict[str, deque[GenerationJob]] = {}
+        self._queued = asyncio.Semaphore(0)
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._housekeeping()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            if job.status in {"queued", "running"}:
+                await job.store.release(job.id, "Server stopped")
+                job.status = "failed"
+            if job.work_dir is not None:
+                shutil.rmtree(job.work_dir, ignore_errors=True)
+        self.jobs.clear()
+        self._queues.clear()
+
+    def submit(
+        self,
+        reservation: Reservation,
+        ru_count: int,
+        en_count: int,
+        store: AsyncStore | None = None,
+    ) -> GenerationJob:
+        job = GenerationJob(reservation, ru_count, en_count, store or self.store)
+        self.jobs[job.id] = job
+        self._queues.setdefault(job.hotel_id, deque()).append(job)
+        self._queued.release()
+        return job
+
+    def get(self, job_id: str) -> GenerationJob | None:
+        return self.jobs.get(job_id)
+
+    def pending(self, hotel_id: str | None = None) -> int:
+        return sum(
+            job.status in {"queued", "running"}
+            and (hotel_id is None or job.hotel_id == hotel_id)
+            for job in self.jobs.values()
+        )
+
+    def _next(self) -> GenerationJob:
+        """Take the oldest job of the next hotel and move it to the back."""
+        hotel_id, queue = next(iter(self._queues.items()))
+        del self._queues[hotel_id]
+        job = queue.popleft()
+        if queue:
+            self._queues[hotel_id] = queue
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            await self._queued.acquire()
+            job = self._next()
+            try:
+                if self.slots is not None:
+                    async with self.slots:
+                        await self._run(job)
+                else:
+                    await self._run(job)
+            except Exception as error:
+                # One broken job must not take the worker down with it.
+                logger.exception("Generation job %s failed", job.id)
+                if job.finished_at is None:
+                    job.status = "failed"
+                    job.error = str(error)[:1000]
+                    job.finished_at = time.time()
+
+    async def _run(self, job: GenerationJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        job.work_dir = Path(tempfile.mkdtemp(prefix="brochures_"))
+
+        def progress(done: int) -> None:
+            job.done = min(job.total, done)
+
+        try:
+            pdf_path = await asyncio.to_thread(self.render, job, job.work_dir, progress)
+            await job.store.commit(job.id, job.profile.to_dict())
+        except Exception as error:
+            job.status = "failed"
+            job.error = str(error)[:1000]
+            try:
+                await job.store.release(job.id, job.error, job.profile.to_dict())
+            except Exception:
+                # The lease runs out and the reaper returns the passwords.
+                logger.exception("Releasing generation %s failed", job.id)
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            job.work_dir = None
+        else:
+            job.pdf_path = Path(pdf_path)
+            job.done = job.total
+            job.status = "completed"
+        finally:
+            job.finished_at = time.time()
+            record_generation(job.hotel_id, job.status, job.profile)
+
+    async def _housekeeping(self) -> None:
+        while True:
+            await asyncio.sleep(self.lease_renewal_seconds)
+            now = time.time()
+            for job in list(self.jobs.values()):
+                if job.status in {"queued", "running"}:
+                    try:
+                        await job.store.renew(job.id)
+                    except Exception:
+                        logger.exception("Renewing the lease of %s failed", job.id)
+                elif job.finished_at and now - job.finished_at > self.retention_seconds:
+                    if job.work_dir is not None:
+                        shutil.rmtree(job.work_dir, ignore_errors=True)
+                    del self.jobs[job.id]
+
+
+@asynccontextmanager
+async def lease_heartbeat(
+    store: AsyncStore, batch_id: str, interval_seconds: float
+) -> AsyncIterator[None]:
+    """Keep renewing a reservation lease while a long render runs."""
+
+    async def beat() -> None:
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await store.renew(batch_id)
+            except Exception:
+                # The next beat may get through before the lease runs out.
+                logger.exception("Renewing the lease of %s failed", batch_id)
+
+    task = asyncio.create_task(beat())
+    try:
+        yield
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+class LeaseReaper:
+    """Periodically returns passwords of expired reservations to the stock.
+
+    Reservations never wait for this: ``reserve()`` only takes available
+    rows, and each reaper pass releases at most ``batch_size`` reservations
+    per transaction. One reaper serves the stores of every hotel.
+    """
+
+    def __init__(
+        self, *stores: AsyncStore, interval_seconds: float = 30, batch_size: int = 50
+    ):
+        self.stores = stores
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.runs = 0
+        self.errors = 0
+        self.released = 0
+        self.last_released = 0
+        self.last_run_at: float | None = None
+        self.last_duration_seconds: float | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> int:
+        started = time.perf_counter()
+        released = 0
+        try:
+            for store in self.stores:
+                released += await store.release_stale_reservations(
+                    None, self.batch_size
+                )
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_duration_seconds = time.perf_counter() - started
+        self.released += released
+        self.last_released = released
+        EXPIRED_LEASES.inc(released)
+        return released
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "released": self.released,
+            "last_released": self.last_released,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": (
+                None
+                if self.last_duration_seconds is None
+                else round(self.last_duration_seconds * 1000, 3)
+            ),
+        }
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Releasing expired reservations failed")
@@ -2,36 +2,175 @@ from __future__ import annotations
 
 import tempfile
 import asyncio
+import logging
 import secrets
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
 import shutil
-from typing import Annotated
+from typing import Annotated, AsyncIterator, Callable, Iterator
 from fastapi import BackgroundTasks
 
-from fastapi import Depends, FastAPI, HTTPException, Query, Request, status
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
+from .async_storage import create_async_store
 from .settings import settings
 from .storage import (
     NotEnoughPasswords,
     PasswordConflict,
+    PasswordStore,
     PasswordsUnavailable,
+    Reservation,
     create_password_store,
 )
-from .qr import make_qr_png
-from .brochure import build_merged_pdf
+from .brochure import (
+    build_merged_pdf,
+    build_merged_pdf_overlay,
+    iter_concatenated_pdf,
+    iter_merged_pdf,
+    iter_merged_pdf_overlay,
+    pdf_templates_available,
+    render_brochure_pdfs,
+    render_process_pool,
+)
+from .hotels import HotelConfig, Tenant, load_hotels
+from . import metrics
+from .jobs import (
+    GenerationJob,
+    JobManager,
+    LeaseReaper,
+    RenderSlots,
+    lease_heartbeat,
+)
+from .office import OfficePool, default_pool_size
+from .prerender import PrerenderPool, file_fingerprint
+from .render_cache import RenderCache
+from .profiling import RenderProfile
 
 if settings.environment == "production" and not settings.admin_password:
     raise RuntimeError("ADMIN_PASSWORD is required in production")
 
+office_pool: OfficePool | None = None
+jobs: JobManager | None = None
+reaper: LeaseReaper | None = None
+prerender: PrerenderPool | None = None
+render_cache: RenderCache | None = None
+render_executor: ProcessPoolExecutor | None = None
+render_workers = settings.render_workers or default_pool_size()
+logger = logging.getLogger(__name__)
+
+
+def lease_renewal_seconds() -> float:
+    """Renew a third into the TTL so one missed heartbeat is harmless."""
+    return settings.reservation_ttl_minutes * 60 / 3
+
+
+async def archive_periodically() -> None:
+    while True:
+        for tenant in tenants.values():
+            try:
+                await tenant.store.archive(
+                    settings.archive_after_days, settings.archive_batch_size
+                )
+            except Exception:
+                logger.exception(
+                    "Archiving used passwords failed for %s", tenant.config.id
+                )
+        await asyncio.sleep(settings.archive_interval_hours * 3600)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global office_pool, render_executor, jobs, reaper, prerender, render_cache
+    if not all(use_pdf_renderer(tenant.config) for tenant in tenants.values()):
+        # Before the office pool, reaper and archiver threads exist.
+        render_executor = render_process_pool(render_workers)
+        office_pool = OfficePool(
+            settings.soffice_bin,
+            size=settings.office_pool_size or default_pool_size(),
+            profile_root=settings.office_profile_dir,
+            job_timeout_seconds=settings.office_job_timeout_seconds or None,
+            probe_interval_seconds=settings.office_probe_interval_seconds,
+        )
+        await asyncio.to_thread(office_pool.start)
+        if settings.render_cache_max_mb > 0:
+            render_cache = await asyncio.to_thread(
+                RenderCache,
+                settings.render_cache_dir,
+                settings.render_cache_max_mb * 1024 * 1024,
+            )
+    jobs = JobManager(
+        astore,
+        render_job,
+        workers=render_capacity,
+        lease_renewal_seconds=lease_renewal_seconds(),
+        retention_seconds=settings.generation_retention_minutes * 60,
+        slots=_render_slots,
+    )
+    await jobs.start()
+    reaper = LeaseReaper(
+        *(tenant.store for tenant in tenants.values()),
+        interval_seconds=settings.lease_reaper_interval_seconds,
+        batch_size=settings.lease_reaper_batch_size,
+    )
+    await reaper.start()
+    if settings.prerender_stock > 0:
+        prerender = PrerenderPool(
+            tenants.values(),
+            settings.prerender_cache_dir,
+            prerender_brochures,
+            template_fingerprint,
+            stock=settings.prerender_stock,
+            max_brochures=settings.prerender_max_brochures,
+            interval_seconds=settings.prerender_interval_seconds,
+            slots=_render_slots,
+        )
+        await prerender.start()
+    if isinstance(store, PasswordStore):
+        store.start_checkpoints(settings.sqlite_checkpoint_seconds)
+    archiver = None
+    if settings.archive_after_days > 0:
+        archiver = asyncio.create_task(archive_periodically())
+    try:
+        yield
+    finally:
+        if archiver is not None:
+            archiver.cancel()
+            await asyncio.gather(archiver, return_exceptions=True)
+        if prerender is not None:
+            await prerender.stop()
+            prerender = None
+        await reaper.stop()
+        reaper = None
+        await jobs.stop()
+        jobs = None
+        if office_pool is not None:
+            await asyncio.to_thread(office_pool.close)
+            office_pool = None
+        render_cache = None
+        if render_executor is not None:
+            render_executor.shutdown(cancel_futures=True)
+            render_executor = None
+        await astore.close()
+        metrics.mark_process_dead()
+
+
 app = FastAPI(
     title="ARTSTUDIO Wi-Fi voucher module",
     version="1.0.0",
+    lifespan=lifespan,
 )
 app.mount("/assets", StaticFiles(directory="fonts"), name="assets")
 if settings.cors_origins:
@@ -43,7 +182,6 @@ if settings.cors_origins:
         allow_headers=["Authorization", "Content-Type"],
     )
 
-_lock = asyncio.Lock()
 _security = HTTPBasic(auto_error=False)
 store = create_password_store(
     database_url=settings.database_url,
@@ -51,15 +189,55 @@ store = create_password_store(
     hotel_id=settings.hotel_id,
     hotel_name=settings.hotel_name,
     reservation_ttl_minutes=settings.reservation_ttl_minutes,
+    pool_min_size=settings.database_pool_min_size,
+    pool_max_size=settings.database_pool_max_size,
+    pool_max_idle_seconds=settings.database_pool_max_idle_seconds,
+    pool_timeout_seconds=settings.database_pool_timeout_seconds,
+    sqlite_cache_size_kib=settings.sqlite_cache_size_kib,
+    sqlite_mmap_size=settings.sqlite_mmap_size,
 )
 store.initialize()
+# Request handlers await this; ``store`` stays for startup and tooling.
+astore = metrics.MeteredStore(
+    create_async_store(store, workers=settings.database_executor_workers)
+)
+
+default_hotel = HotelConfig(
+    id=settings.hotel_id,
+    name=settings.hotel_name,
+    template_ru_path=settings.template_ru_path,
+    template_en_path=settings.template_en_path,
+    pdf_template_dir=settings.pdf_template_dir,
+    max_pending_jobs=settings.hotel_max_pending_jobs,
+)
+
+
+def build_tenants() -> dict[str, Tenant]:
+    """One scoped store per hotel, all on the same connections and threads."""
+    result = {}
+    for hotel in load_hotels(settings.hotels_file, default_hotel).values():
+        if hotel.id == settings.hotel_id and hotel.name == settings.hotel_name:
+            result[hotel.id] = Tenant(hotel, astore)
+            continue
+        hotel_store = store.for_hotel(hotel.id, hotel.name)
+        hotel_store.initialize()
+        result[hotel.id] = Tenant(hotel, astore.for_hotel(hotel.id, hotel.name))
+    return result
+
+
+tenants = build_tenants()
+
 
 class GenerateRequest(BaseModel):
     ru: int = Field(ge=0, le=500)
     en: int = Field(ge=0, le=500)
 
+# Imports run as one bulk statement, so large pastes stay cheap.
+MAX_IMPORT_PASSWORDS = 50000
+
+
 class PasswordImportRequest(BaseModel):
-    passwords: list[str] = Field(min_length=1, max_length=5000)
+    passwords: list[str] = Field(min_length=1, max_length=MAX_IMPORT_PASSWORDS)
 
 
 class PasswordUpdateRequest(BaseModel):
@@ -70,27 +248,285 @@ class PasswordIdsRequest(BaseModel):
     ids: list[int] = Field(min_length=1, max_length=1000)
 
 
-def render_pdf(passwords: list[str], ru_count: int, work_dir: Path) -> str:
-    qr_paths = []
-    for index, password in enumerate(passwords, start=1):
-        qr_path = work_dir / f"qr_{index:04d}.png"
-        make_qr_png(password, str(qr_path))
-        qr_paths.append(str(qr_path))
+def use_pdf_renderer(hotel: HotelConfig) -> bool:
+    if settings.brochure_renderer == "pptx":
+        return False
+    if settings.brochure_renderer == "pdf":
+        return True
+    return pdf_templates_available(hotel.pdf_template_dir)
+
+
+def default_render_capacity() -> int:
+    if settings.generation_workers:
+        return settings.generation_workers
+    if all(use_pdf_renderer(tenant.config) for tenant in tenants.values()):
+        return default_pool_size()
+    # Each render keeps LibreOffice busy, so more renders than profiles only
+    # queue inside the pool.
+    return settings.office_pool_size or default_pool_size()
+
+
+render_capacity = default_render_capacity()
+_render_slots = RenderSlots(render_capacity)
+RETRY_AFTER_SECONDS = 10
+
 
+def too_busy(
+    detail: str = "Все слоты генерации заняты, повторите попытку позже.",
+) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+    )
+
+
+def template_fingerprint(hotel: HotelConfig) -> str:
+    if use_pdf_renderer(hotel):
+        return file_fingerprint(
+            [*sorted(Path(hotel.pdf_template_dir).glob("*")), settings.pdf_font_path]
+        )
+    return file_fingerprint([hotel.template_ru_path, hotel.template_en_path])
+
+
+def prerender_brochures(
+    hotel: HotelConfig, language: str, passwords: list[str], out_dir: str
+) -> list[str]:
+    """One PDF per password, with the engine a generation would use."""
+    if use_pdf_renderer(hotel):
+        paths = []
+        for index, password in enumerate(passwords):
+            path = str(Path(out_dir) / f"{language}_{index:04d}.pdf")
+            build_merged_pdf_overlay(
+                template_dir=hotel.pdf_template_dir,
+                font_path=settings.pdf_font_path,
+                ru_passwords=[password] if language == "ru" else [],
+                en_passwords=[password] if language == "en" else [],
+                out_pdf_path=path,
+            )
+            paths.append(path)
+        return paths
+    template = hotel.template_ru_path if language == "ru" else hotel.template_en_path
+    profile = RenderProfile()
+    try:
+        return render_brochure_pdfs(
+            settings.soffice_bin,
+            [
+                (
+                    template,
+                    password,
+                    str(Path(out_dir) / f"{language}_{index:04d}.pptx"),
+                )
+                for index, password in enumerate(passwords)
+            ],
+            out_dir,
+            office_pool=office_pool,
+            executor=render_executor,
+            workers=render_workers,
+            profile=profile,
+            render_cache=render_cache,
+        )
+    finally:
+        metrics.record_office(profile)
+
+
+def take_prerendered(
+    hotel: HotelConfig, ids: tuple[int, ...], passwords: list[str], ru_count: int
+) -> list[str] | None:
+    if prerender is None:
+        return None
+    return prerender.take(hotel, ids, passwords, ru_count)
+
+
+def render_pdf(
+    hotel: HotelConfig,
+    passwords: list[str],
+    ru_count: int,
+    work_dir: Path,
+    profile: RenderProfile | None = None,
+    ids: tuple[int, ...] = (),
+) -> str:
     out_pdf = work_dir / "brochures.pdf"
+    cached = take_prerendered(hotel, ids, passwords, ru_count)
+    if cached is not None:
+        with out_pdf.open("wb") as output:
+            for piece in iter_concatenated_pdf(
+                cached, settings.stream_chunk_size, profile
+            ):
+                output.write(piece)
+        return str(out_pdf)
+    if use_pdf_renderer(hotel):
+        build_merged_pdf_overlay(
+            template_dir=hotel.pdf_template_dir,
+            font_path=settings.pdf_font_path,
+            ru_passwords=passwords[:ru_count],
+            en_passwords=passwords[ru_count:],
+            out_pdf_path=str(out_pdf),
+            profile=profile,
+        )
+        return str(out_pdf)
+
     build_merged_pdf(
         soffice_bin=settings.soffice_bin,
-        template_ru=settings.template_ru_path,
-        template_en=settings.template_en_path,
+        template_ru=hotel.template_ru_path,
+        template_en=hotel.template_en_path,
         ru_passwords=passwords[:ru_count],
         en_passwords=passwords[ru_count:],
-        qr_png_paths=qr_paths,
+        qr_png_paths=None,
         work_dir=str(work_dir),
         out_pdf_path=str(out_pdf),
+        office_pool=office_pool,
+        executor=render_executor,
+        workers=render_workers,
+        profile=profile,
+        render_cache=render_cache,
+    )
+    return str(out_pdf)
+
+
+def iter_render_pdf(
+    hotel: HotelConfig,
+    passwords: list[str],
+    ru_count: int,
+    work_dir: Path,
+    profile: RenderProfile | None = None,
+    ids: tuple[int, ...] = (),
+) -> Iterator[bytes]:
+    cached = take_prerendered(hotel, ids, passwords, ru_count)
+    if cached is not None:
+        return iter_concatenated_pdf(cached, settings.stream_chunk_size, profile)
+    if use_pdf_renderer(hotel):
+        return iter_merged_pdf_overlay(
+            template_dir=hotel.pdf_template_dir,
+            font_path=settings.pdf_font_path,
+            ru_passwords=passwords[:ru_count],
+            en_passwords=passwords[ru_count:],
+            chunk_size=settings.stream_chunk_size,
+            profile=profile,
+        )
+    return iter_merged_pdf(
+        soffice_bin=settings.soffice_bin,
+        template_ru=hotel.template_ru_path,
+        template_en=hotel.template_en_path,
+        ru_passwords=passwords[:ru_count],
+        en_passwords=passwords[ru_count:],
+        work_dir=str(work_dir),
+        office_pool=office_pool,
+        executor=render_executor,
+        workers=render_workers,
+        profile=profile,
+        chunk_size=settings.stream_chunk_size,
+        render_cache=render_cache,
     )
+
+
+def render_job(
+    job: GenerationJob, work_dir: Path, progress: Callable[[int], None]
+) -> str:
+    """Write the streamed pieces to disk, reporting brochures done per chunk."""
+    out_pdf = work_dir / "brochures.pdf"
+    pieces = iter_render_pdf(
+        tenants[job.hotel_id].config,
+        list(job.reservation.passwords),
+        job.ru_count,
+        work_dir,
+        job.profile,
+        job.reservation.ids,
+    )
+    with out_pdf.open("wb") as output:
+        for piece in pieces:
+            output.write(piece)
+            progress(job.profile.brochures_written)
     return str(out_pdf)
 
 
+class StreamedGeneration:
+    """A ``?stream=true`` body and the cleanup that has to follow it.
+
+    The body commits after the last byte, or releases the reservation when
+    rendering fails. Any other ending is settled by ``finish()``, the
+    response's background task, which Starlette runs after the body even when
+    the client went away: a disconnect cancels the body, whose cleanup could
+    not await anything in the cancelled scope, and a response that never got
+    to its first byte never starts the body at all. ``finish()`` first waits
+    for the chunk still rendering in its thread, so the render slot (taken
+    by the caller and owned from here on) and the work directory are only
+    given back once nothing uses them.
+    """
+
+    def __init__(self, tenant: Tenant, reservation: Reservation, ru_count: int):
+        self.tenant = tenant
+        self.reservation = reservation
+        self.ru_count = ru_count
+        self.profile = RenderProfile()
+        self.work_dir = Path(tempfile.mkdtemp(prefix="brochures_"))
+        self.settled = False
+        self._holds_slot = True
+        self._pieces: Iterator[bytes] | None = None
+        self._rendering: asyncio.Future | None = None
+
+    async def body(self) -> AsyncIterator[bytes]:
+        try:
+            async with lease_heartbeat(
+                self.tenant.store,
+                self.reservation.batch_id,
+                lease_renewal_seconds(),
+            ):
+                self._pieces = iter_render_pdf(
+                    self.tenant.config,
+                    list(self.reservation.passwords),
+                    self.ru_count,
+                    self.work_dir,
+                    self.profile,
+                    self.reservation.ids,
+                )
+                while True:
+                    self._rendering = asyncio.get_running_loop().run_in_executor(
+                        None, next, self._pieces, None
+                    )
+                    # A cancelled body must not abandon the thread's future.
+                    piece = await asyncio.shield(self._rendering)
+                    self._rendering = None
+                    if piece is None:
+                        break
+                    yield piece
+                await self.tenant.store.commit(
+                    self.reservation.batch_id, self.profile.to_dict()
+                )
+        except Exception as error:
+            await self._settle(str(error)[:1000])
+            raise
+        await self._settle(None)
+
+    async def finish(self) -> None:
+        if not self.settled:
+            await self._settle("Client disconnected")
+
+    async def _settle(self, error: str | None) -> None:
+        try:
+            if self._rendering is not None:
+                await asyncio.gather(self._rendering, return_exceptions=True)
+                self._rendering = None
+            if self._pieces is not None:
+                # Runs the generator's own cleanup, e.g. removing cached parts.
+                await asyncio.to_thread(self._pieces.close)
+            if error is not None:
+                await self.tenant.store.release(
+                    self.reservation.batch_id, error, self.profile.to_dict()
+                )
+            metrics.record_generation(
+                self.tenant.config.id,
+                "failed" if error else "completed",
+                self.profile,
+            )
+            self.settled = True
+        finally:
+            if self._holds_slot:
+                self._holds_slot = False
+                _render_slots.release()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
 def require_admin(
     credentials: Annotated[HTTPBasicCredentials | None, Depends(_security)],
 ) -> None:
@@ -115,12 +551,41 @@ def require_admin(
 admin_required = [Depends(require_admin)]
 
 
+def current_hotel(request: Request) -> Tenant:
+    """The hotel from the ``/api/v1/hotels/{hotel_id}`` prefix, else the default."""
+    hotel_id = request.path_params.get("hotel_id", settings.hotel_id)
+    tenant = tenants.get(hotel_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Отель не найден.")
+    return tenant
+
+
+CurrentHotel = Annotated[Tenant, Depends(current_hotel)]
+# Mounted at /api/v1 for the default hotel and at /api/v1/hotels/{hotel_id}.
+api = APIRouter(dependencies=admin_required)
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # The route template keeps label cardinality bounded.
+    route = request.scope.get("route")
+    metrics.REQUEST_LATENCY.labels(
+        request.method,
+        route.path if route is not None else "unmatched",
+        response.status_code,
+    ).observe(time.perf_counter() - started)
+    return response
+
+
 @app.middleware("http")
 async def security_headers(request: Request, call_next):
     response = await call_next(request)
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["Referrer-Policy"] = "no-referrer"
-    if request.url.path == "/" or request.url.path.startswith("/api/"):
+    path = request.url.path
+    if path == "/" or path.startswith(("/api/", "/hotels/")):
         response.headers["Cache-Control"] = "no-store"
     return response
 
@@ -131,22 +596,79 @@ def health():
 
 
 @app.get("/ready")
-def ready():
+async def ready():
     try:
-        healthy = store.health()
+        healthy = await astore.health()
     except Exception as error:
         raise HTTPException(status_code=503, detail="Database unavailable") from error
-    return {"status": "ready" if healthy else "not-ready"}
+    payload = {"status": "ready" if healthy else "not-ready"}
+    database_pool = astore.pool_stats()
+    if database_pool is not None:
+        payload["database_pool"] = database_pool
+    if office_pool is not None:
+        payload["office"] = office_pool.health()
+    if render_cache is not None:
+        payload["render_cache"] = render_cache.stats()
+    if reaper is not None:
+        payload["lease_reaper"] = reaper.stats()
+    if prerender is not None:
+        payload["prerender"] = prerender.stats()
+    return payload
+
+
+@app.get("/metrics", dependencies=admin_required, include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text format; gauges are refreshed here, not on requests."""
+    for tenant in tenants.values():
+        if metrics.stats_stale(
+            tenant.config.id, settings.metrics_stats_max_age_seconds
+        ):
+            await tenant.store.stats()
+    if jobs is not None:
+        metrics.GENERATION_QUEUE.set(jobs.pending())
+    # Semaphore has no public counter; a scrape only reads it.
+    metrics.RENDER_SLOTS_BUSY.set(_render_slots.busy)
+    database_pool = astore.pool_stats()
+    if database_pool is not None:
+        metrics.record_pool("sync", database_pool)
+        metrics.record_pool("async", database_pool.get("async"))
+    if office_pool is not None:
+        health = office_pool.health()
+        metrics.OFFICE_WORKERS.labels("healthy").set(health["healthy"])
+        metrics.OFFICE_WORKERS.labels("idle").set(health["idle"])
+        metrics.OFFICE_WORKERS.labels("total").set(health["size"])
+    body, content_type = metrics.exposition()
+    return Response(body, media_type=content_type)
+
+
+@app.get("/api/v1/hotels", dependencies=admin_required)
+def list_hotels():
+    return {
+        "items": [
+            {
+                "id": tenant.config.id,
+                "name": tenant.config.name,
+                "api_base": hotel_api_base(tenant),
+            }
+            for tenant in tenants.values()
+        ]
+    }
+
+
+def hotel_api_base(tenant: Tenant) -> str:
+    if tenant.config.id == settings.hotel_id:
+        return "/api/v1"
+    return f"/api/v1/hotels/{tenant.config.id}"
 
 
-@app.get("/api/v1/module-manifest", dependencies=admin_required)
-def module_manifest():
+@api.get("/module-manifest")
+def module_manifest(hotel: CurrentHotel):
     return {
         "id": "wifi-voucher",
         "name": "Wi-Fi пароли",
         "version": "1.0.0",
-        "hotel_id": settings.hotel_id,
-        "hotel_name": settings.hotel_name,
+        "hotel_id": hotel.config.id,
+        "hotel_name": hotel.config.name,
         "mode": "standalone",
         "capabilities": [
             "passwords.read",
@@ -156,31 +678,42 @@ def module_manifest():
             "passwords.delete",
             "vouchers.generate",
         ],
-        "api_base": "/api/v1",
+        "api_base": hotel_api_base(hotel),
     }
 
 
 @app.get("/", response_class=HTMLResponse, dependencies=admin_required)
-def index():
+@app.get(
+    "/hotels/{hotel_id}/",
+    response_class=HTMLResponse,
+    dependencies=admin_required,
+    include_in_schema=False,
+)
+def index(hotel: CurrentHotel):
     html_path = Path("web/index.html")
     return html_path.read_text(encoding="utf-8")
 
 
 @app.get("/api/passwords", dependencies=admin_required, include_in_schema=False)
-@app.get("/api/v1/passwords", dependencies=admin_required)
-def get_passwords(
+@api.get("/passwords")
+async def get_passwords(
+    hotel: CurrentHotel,
     limit: int = Query(default=200, ge=1, le=1000),
     offset: int = Query(default=0, ge=0),
     search: str = Query(default="", max_length=256),
+    after_id: int | None = Query(default=None, ge=0),
 ):
+    items, stats = await hotel.store.list_available_with_stats(
+        limit=limit,
+        offset=offset,
+        search=search,
+        after_id=after_id,
+    )
     return {
-        "hotel_id": settings.hotel_id,
-        "items": store.list_available(
-            limit=limit,
-            offset=offset,
-            search=search,
-        ),
-        "stats": store.stats(),
+        "hotel_id": hotel.config.id,
+        "items": items,
+        "next_after_id": items[-1]["id"] if len(items) == limit else None,
+        "stats": stats,
     }
 
 
@@ -189,28 +722,37 @@ def get_passwords(
     dependencies=admin_required,
     include_in_schema=False,
 )
-@app.post("/api/v1/passwords/import", dependencies=admin_required)
-def import_passwords(req: PasswordImportRequest):
-    result = store.import_passwords(req.passwords)
+@api.post("/passwords/import")
+async def import_passwords(req: PasswordImportRequest, hotel: CurrentHotel):
+    result, stats = await hotel.store.import_passwords_with_stats(req.passwords)
     return {
         **result,
-        "hotel_id": settings.hotel_id,
-        "stats": store.stats(),
+        "hotel_id": hotel.config.id,
+        "stats": stats,
     }
 
 
-@app.post("/api/v1/passwords/import/preview", dependencies=admin_required)
-def preview_password_import(req: PasswordImportRequest):
+@api.post("/passwords/import/preview")
+async def preview_password_import(req: PasswordImportRequest, hotel: CurrentHotel):
     return {
-        "hotel_id": settings.hotel_id,
-        **store.preview_import(req.passwords),
+        "hotel_id": hotel.config.id,
+        **await hotel.store.preview_import(req.passwords),
     }
 
 
-@app.patch("/api/v1/passwords/{password_id}", dependencies=admin_required)
-def update_password(password_id: int, req: PasswordUpdateRequest):
+def forget_prerendered(hotel: Tenant, ids: list[int]) -> None:
+    if prerender is not None:
+        prerender.discard(hotel.config.id, ids)
+
+
+@api.patch("/passwords/{password_id}")
+async def update_password(
+    password_id: int, req: PasswordUpdateRequest, hotel: CurrentHotel
+):
     try:
-        updated = store.update_available(password_id, req.password)
+        updated, stats = await hotel.store.update_available_with_stats(
+            password_id, req.password
+        )
     except PasswordConflict as error:
         raise HTTPException(status_code=409, detail=str(error)) from error
     except ValueError as error:
@@ -220,26 +762,29 @@ def update_password(password_id: int, req: PasswordUpdateRequest):
             status_code=404,
             detail="Доступный пароль не найден.",
         )
-    return {"updated": True, "stats": store.stats()}
+    forget_prerendered(hotel, [password_id])
+    return {"updated": True, "stats": stats}
 
 
-@app.post("/api/v1/passwords/issue", dependencies=admin_required)
-def issue_passwords(req: PasswordIdsRequest):
+@api.post("/passwords/issue")
+async def issue_passwords(req: PasswordIdsRequest, hotel: CurrentHotel):
     try:
-        passwords = store.issue_available(req.ids)
+        passwords, stats = await hotel.store.issue_available_with_stats(req.ids)
     except PasswordsUnavailable as error:
         raise HTTPException(status_code=409, detail=str(error)) from error
+    forget_prerendered(hotel, req.ids)
     return {
         "issued": len(passwords),
         "passwords": passwords,
-        "stats": store.stats(),
+        "stats": stats,
     }
 
 
-@app.post("/api/v1/passwords/delete", dependencies=admin_required)
-def delete_passwords(req: PasswordIdsRequest):
-    deleted = store.delete_available_many(req.ids)
-    return {"deleted": deleted, "stats": store.stats()}
+@api.post("/passwords/delete")
+async def delete_passwords(req: PasswordIdsRequest, hotel: CurrentHotel):
+    deleted, stats = await hotel.store.delete_available_many_with_stats(req.ids)
+    forget_prerendered(hotel, req.ids)
+    return {"deleted": deleted, "stats": stats}
 
 
 @app.delete(
@@ -247,64 +792,173 @@ def delete_passwords(req: PasswordIdsRequest):
     dependencies=admin_required,
     include_in_schema=False,
 )
-@app.delete("/api/v1/passwords/{password_id}", dependencies=admin_required)
-def delete_password(password_id: int):
-    if not store.delete_available(password_id):
+@api.delete("/passwords/{password_id}")
+async def delete_password(password_id: int, hotel: CurrentHotel):
+    deleted, stats = await hotel.store.delete_available_with_stats(password_id)
+    if not deleted:
         raise HTTPException(
             status_code=404,
             detail="Доступный пароль не найден.",
         )
-    return {"deleted": True, "stats": store.stats()}
+    forget_prerendered(hotel, [password_id])
+    return {"deleted": True, "stats": stats}
 
 
-@app.get("/api/v1/generations", dependencies=admin_required)
-def get_generations(limit: int = Query(default=50, ge=1, le=200)):
+@api.get("/generations")
+async def get_generations(
+    hotel: CurrentHotel, limit: int = Query(default=50, ge=1, le=200)
+):
     return {
-        "hotel_id": settings.hotel_id,
-        "items": store.list_generations(limit=limit),
+        "hotel_id": hotel.config.id,
+        "items": await hotel.store.list_generations(limit=limit),
     }
 
 
-@app.post("/generate", dependencies=admin_required, include_in_schema=False)
-@app.post("/api/v1/generations", dependencies=admin_required)
-async def generate(req: GenerateRequest, background_tasks: BackgroundTasks):
+def hotel_job(hotel: Tenant, generation_id: str) -> GenerationJob | None:
+    """The in-memory job, unless it belongs to another hotel."""
+    job = jobs.get(generation_id) if jobs is not None else None
+    if job is None or job.hotel_id != hotel.config.id:
+        return None
+    return job
+
+
+@api.get("/generations/{generation_id}")
+async def get_generation(generation_id: str, hotel: CurrentHotel):
+    job = hotel_job(hotel, generation_id)
+    if job is not None:
+        return job.to_dict()
+    generation = await hotel.store.get_generation(generation_id)
+    if generation is None:
+        raise HTTPException(status_code=404, detail="Генерация не найдена.")
+    return generation
+
+
+@api.get("/generations/{generation_id}/download")
+async def download_generation(generation_id: str, hotel: CurrentHotel):
+    job = hotel_job(hotel, generation_id)
+    if job is None:
+        if await hotel.store.get_generation(generation_id) is None:
+            raise HTTPException(status_code=404, detail="Генерация не найдена.")
+        raise HTTPException(status_code=410, detail="PDF больше недоступен.")
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail=job.error or "Render failed")
+    if job.status != "completed" or job.pdf_path is None:
+        raise HTTPException(status_code=409, detail="PDF ещё не готов.")
+    render_seconds = (job.finished_at or 0) - (job.started_at or 0)
+    return FileResponse(
+        job.pdf_path,
+        media_type="application/pdf",
+        filename="brochures.pdf",
+        headers={
+            "Server-Timing": job.profile.server_timing(render_seconds),
+            "X-Generation-Seconds": f"{render_seconds:.3f}",
+        },
+    )
+
+
+async def reserve_or_409(hotel: Tenant, req: GenerateRequest) -> Reservation:
     total = req.ru + req.en
     if total <= 0:
         raise HTTPException(
             status_code=400,
             detail="Укажите хотя бы одну брошюру.",
         )
+    try:
+        return await hotel.store.reserve(total, ru_count=req.ru, en_count=req.en)
+    except NotEnoughPasswords as error:
+        raise HTTPException(status_code=409, detail=str(error)) from error
+
 
-    async with _lock:
+@api.post("/generations")
+async def generate(
+    req: GenerateRequest,
+    background_tasks: BackgroundTasks,
+    hotel: CurrentHotel,
+    stream: bool = Query(default=False),
+    wait: bool = Query(default=False),
+):
+    """Queue a generation job; ``stream``/``wait`` return the PDF inline.
+
+    Reservations no longer need a process-wide lock: both stores reserve
+    atomically. Only rendering is capped, and a full server answers 429.
+    """
+    if stream:
+        if not _render_slots.try_acquire():
+            raise too_busy()
         try:
-            reservation = store.reserve(
-                total,
-                ru_count=req.ru,
-                en_count=req.en,
-            )
-        except NotEnoughPasswords as error:
-            raise HTTPException(status_code=409, detail=str(error)) from error
+            reservation = await reserve_or_409(hotel, req)
+            streamed = StreamedGeneration(hotel, reservation, req.ru)
+        except BaseException:
+            _render_slots.release()
+            raise
+        background_tasks.add_task(streamed.finish)
+        return StreamingResponse(
+            streamed.body(),
+            media_type="application/pdf",
+            headers={
+                "Content-Disposition": 'attachment; filename="brochures.pdf"',
+                "X-Generation-Id": reservation.batch_id,
+            },
+            background=background_tasks,
+        )
+    if wait:
+        return await generate_file(req, background_tasks, hotel)
+
+    if jobs.pending() >= render_capacity + settings.generation_queue_size:
+        raise too_busy()
+    quota = hotel.config.max_pending_jobs
+    if quota and jobs.pending(hotel.config.id) >= quota:
+        raise too_busy("Очередь генерации отеля заполнена, повторите попытку позже.")
+    reservation = await reserve_or_409(hotel, req)
+    job = jobs.submit(reservation, req.ru, req.en, hotel.store)
+    return JSONResponse(
+        job.to_dict(),
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": f"{hotel_api_base(hotel)}/generations/{job.id}"},
+    )
+
 
+@app.post("/generate", dependencies=admin_required, include_in_schema=False)
+async def generate_file(
+    req: GenerateRequest, background_tasks: BackgroundTasks, hotel: CurrentHotel
+):
+    if not _render_slots.try_acquire():
+        raise too_busy()
+    try:
+        reservation = await reserve_or_409(hotel, req)
         passwords = list(reservation.passwords)
         td = Path(tempfile.mkdtemp(prefix="brochures_"))
         render_started = time.perf_counter()
+        profile = RenderProfile()
         try:
-            pdf_path = await asyncio.to_thread(
-                render_pdf,
-                passwords,
-                req.ru,
-                td,
-            )
+            async with lease_heartbeat(
+                hotel.store, reservation.batch_id, lease_renewal_seconds()
+            ):
+                pdf_path = await asyncio.to_thread(
+                    render_pdf,
+                    hotel.config,
+                    passwords,
+                    req.ru,
+                    td,
+                    profile,
+                    reservation.ids,
+                )
             render_seconds = time.perf_counter() - render_started
-            store.commit(reservation.batch_id)
+            await hotel.store.commit(reservation.batch_id, profile.to_dict())
         except Exception as error:
-            store.release(reservation.batch_id, str(error)[:1000])
+            await hotel.store.release(
+                reservation.batch_id, str(error)[:1000], profile.to_dict()
+            )
+            metrics.record_generation(hotel.config.id, "failed", profile)
             shutil.rmtree(td, ignore_errors=True)
             raise HTTPException(
                 status_code=500,
                 detail=f"Render failed: {error}",
             ) from error
+    finally:
+        _render_slots.release()
 
+    metrics.record_generation(hotel.config.id, "completed", profile)
     # удаляем папку ПОСЛЕ отдачи файла клиенту
     background_tasks.add_task(shutil.rmtree, td, ignore_errors=True)
 
@@ -313,8 +967,12 @@ async def generate(req: GenerateRequest, background_tasks: BackgroundTasks):
         media_type="application/pdf",
         filename="brochures.pdf",
         headers={
-            "Server-Timing": f"pdf;dur={render_seconds * 1000:.0f}",
+            "Server-Timing": profile.server_timing(render_seconds),
             "X-Generation-Seconds": f"{render_seconds:.3f}",
         },
         background=background_tasks,
     )
+
+
+app.include_router(api, prefix="/api/v1")
+app.include_router(api, prefix="/api/v1/hotels/{hotel_id}")
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import inspect
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .async_storage import AsyncStore
+from .profiling import RenderProfile
+
+# Several uvicorn workers share one exposition when PROMETHEUS_MULTIPROC_DIR
+# points at an empty directory; every process then writes its samples there.
+MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+RENDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+REQUEST_LATENCY = Histogram(
+    "wifi_voucher_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+)
+STORE_LATENCY = Histogram(
+    "wifi_voucher_store_operation_duration_seconds",
+    "Latency of awaited storage calls.",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+OFFICE_CONVERSION = Histogram(
+    "wifi_voucher_office_conversion_duration_seconds",
+    "LibreOffice batch conversion time.",
+    buckets=RENDER_BUCKETS,
+)
+OFFICE_FAILURES = Counter(
+    "wifi_voucher_office_conversion_failures_total",
+    "LibreOffice batches that failed or timed out.",
+)
+GENERATION_PHASE = Histogram(
+    "wifi_voucher_generation_phase_duration_seconds",
+    "Time a finished generation spent in each render phase.",
+    ["phase"],
+    buckets=RENDER_BUCKETS,
+)
+GENERATION_BYTES = Counter(
+    "wifi_voucher_generation_bytes_total",
+    "PDF bytes produced by generations.",
+)
+GENERATIONS = Counter(
+    "wifi_voucher_generations_total",
+    "Finished generations by outcome.",
+    ["hotel", "status"],
+)
+EXPIRED_LEASES = Counter(
+    "wifi_voucher_expired_leases_total",
+    "Reservations released by the lease reaper after their lease expired.",
+)
+PASSWORDS = Gauge(
+    "wifi_voucher_passwords",
+    "Passwords by status, from the latest stats() of each hotel.",
+    ["hotel", "status"],
+    multiprocess_mode="livemostrecent",
+)
+GENERATION_QUEUE = Gauge(
+    "wifi_voucher_generation_jobs_pending",
+    "Generation jobs queued or running.",
+    multiprocess_mode="livesum",
+)
+RENDER_SLOTS_BUSY = Gauge(
+    "wifi_voucher_render_slots_busy",
+    "Render slots in use out of GENERATION_WORKERS.",
+    multiprocess_mode="livesum",
+)
+DATABASE_POOL = Gauge(
+    "wifi_voucher_database_pool_connections",
+    "PostgreSQL pool connections by state.",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+OFFICE_WORKERS = Gauge(
+    "wifi_voucher_office_workers",
+    "LibreOffice profiles by health.",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+
+# Monotonic time of the last stats() seen per hotel. Handlers already get
+# stats from every mutation, so a scrape only queries idle hotels.
+_stats_seen: dict[str, float] = {}
+
+
+def record_stats(hotel_id: str, stats: dict[str, int]) -> None:
+    for status in ("available", "reserved", "used"):
+        PASSWORDS.labels(hotel_id, status).set(stats[status])
+    _stats_seen[hotel_id] = time.monotonic()
+
+
+def stats_stale(hotel_id: str, max_age_seconds: float) -> bool:
+    seen = _stats_seen.get(hotel_id)
+    return seen is None or time.monotonic() - seen > max_age_seconds
+
+
+def record_generation(hotel_id: str, status: str, profile: RenderProfile) -> None:
+    GENERATIONS.labels(hotel_id, status).inc()
+    for phase, seconds in list(profile.phases.items()):
+        GENERATION_PHASE.labels(phase).observe(seconds)
+    GENERATION_BYTES.inc(profile.bytes_written)
+    record_office(profile)
+
+
+def record_office(profile: RenderProfile) -> None:
+    """LibreOffice batches of a render, failed ones included."""
+    for _size, seconds in list(profile.office_batches):
+        OFFICE_CONVERSION.observe(seconds)
+    for seconds in list(profile.office_failures):
+        OFFICE_CONVERSION.observe(seconds)
+        OFFICE_FAILURES.inc()
+
+
+def record_pool(name: str, stats: dict | None) -> None:
+    if not stats:
+        return
+    for state in ("size", "available", "waiting"):
+        if state in stats:
+            DATABASE_POOL.labels(name, state).set(stats[state])
+
+
+class MeteredStore:
+    """``AsyncStore`` wrapper timing every awaited call.
+
+    Wrapped methods are cached on the instance, so after the first call a
+    lookup costs nothing extra. Stats returned by ``stats()`` and the
+    ``*_with_stats`` methods also refresh the password gauge.
+    """
+
+    def __init__(self, store: AsyncStore):
+        self._store = store
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._store, name)
+        if not inspect.iscoroutinefunction(attribute):
+            return attribute
+        histogram = STORE_LATENCY.labels(name)
+        hotel_id = self._store.hotel_id
+        reports_stats = name == "stats" or name.endswith("_with_stats")
+
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = await attribute(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+            if reports_stats:
+                record_stats(hotel_id, result if name == "stats" else result[1])
+            return result
+
+        setattr(self, name, timed)
+        return timed
+
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> MeteredStore:
+        return MeteredStore(self._store.for_hotel(hotel_id, hotel_name))
+
+
+def exposition() -> tuple[bytes, str]:
+    """The text format for ``/metrics`` and its content type."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the shared directory on exit."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
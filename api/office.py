@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+import math
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from .brochure import batch_timeout_seconds, run_soffice_batch
+from .profiling import RenderProfile
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OfficeWorker:
+    index: int
+    profile_dir: Path
+    healthy: bool = False
+    conversions: int = 0
+    failures: int = 0
+    restarts: int = 0
+    last_error: str | None = None
+
+
+class OfficePool:
+    """Long-lived LibreOffice profiles shared by all PPTX conversions.
+
+    Creating a fresh ``UserInstallation`` dominates a cold ``soffice`` start,
+    so every worker keeps one pre-initialized profile for the process
+    lifetime. Batches are spread across idle workers in parallel. A worker
+    whose conversion crashes or times out gets a freshly warmed profile
+    before it takes the next job. With ``probe_interval_seconds`` a
+    background thread also re-checks idle workers and rebuilds profiles
+    that broke or disappeared between jobs.
+    """
+
+    def __init__(
+        self,
+        soffice_bin: str,
+        size: int,
+        profile_root: str,
+        job_timeout_seconds: int | None = None,
+        probe_interval_seconds: float = 0,
+    ):
+        if size < 1:
+            raise ValueError("size must be positive")
+        self.soffice_bin = soffice_bin
+        self.size = size
+        self.profile_root = Path(profile_root)
+        self.job_timeout_seconds = job_timeout_seconds
+        self.workers = [
+            OfficeWorker(index, self.profile_root / f"worker_{index:02d}")
+            for index in range(size)
+        ]
+        self._idle: queue.Queue[OfficeWorker] = queue.Queue()
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.probe_interval_seconds = probe_interval_seconds
+        self.probes = 0
+        self.last_probe_at: float | None = None
+        self._stopped = threading.Event()
+        self._monitor: threading.Thread | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.size, thread_name_prefix="office"
+            )
+        list(self._executor.map(self._warm, self.workers))
+        for worker in self.workers:
+            self._idle.put(worker)
+        if self.probe_interval_seconds > 0:
+            self._stopped.clear()
+            self._monitor = threading.Thread(
+                target=self._monitor_loop, name="office-probe", daemon=True
+            )
+            self._monitor.start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def probe(self) -> None:
+        """Check every idle worker once; rebuild the ones that fail.
+
+        Workers are borrowed one at a time, so conversions keep running on
+        the rest of the pool while a profile is checked.
+        """
+        seen: set[int] = set()
+        for _ in range(self.size):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if worker.index in seen:
+                    break
+                seen.add(worker.index)
+                if worker.healthy and worker.profile_dir.is_dir():
+                    # A warm start on the existing profile is the cheapest
+                    # proof that LibreOffice still runs with it.
+                    self._warm(worker)
+                    if worker.healthy:
+                        continue
+                self._restart(worker)
+            finally:
+                self._idle.put(worker)
+        self.probes += 1
+        self.last_probe_at = time.time()
+
+    def _monitor_loop(self) -> None:
+        while not self._stopped.wait(self.probe_interval_seconds):
+            try:
+                self.probe()
+            except Exception:
+                logger.exception("LibreOffice health probe failed")
+
+    def _warm(self, worker: OfficeWorker) -> None:
+        """Let LibreOffice create the profile once, then exit."""
+        worker.profile_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            proc = subprocess.run(
+                [
+                    self.soffice_bin,
+                    f"-env:UserInstallation={worker.profile_dir.resolve().as_uri()}",
+                    "--headless",
+                    "--nologo",
+                    "--nofirststartwizard",
+                    "--norestore",
+                    "--terminate_after_init",
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=120,
+            )
+        except (OSError, subprocess.TimeoutExpired) as error:
+            worker.healthy = False
+            worker.last_error = str(error)
+            return
+        worker.healthy = proc.returncode == 0
+        worker.last_error = (
+            None
+            if worker.healthy
+            else (proc.stderr.strip() or proc.stdout.strip() or None)
+        )
+
+    def _restart(self, worker: OfficeWorker) -> None:
+        shutil.rmtree(worker.profile_dir, ignore_errors=True)
+        worker.restarts += 1
+        self._warm(worker)
+
+    def _convert_batch(
+        self,
+        batch: list[Path],
+        output_dir: Path,
+        profile: RenderProfile | None = None,
+    ) -> list[str]:
+        worker = self._idle.get()
+        started = time.perf_counter()
+        try:
+            pdf_paths = run_soffice_batch(
+                self.soffice_bin,
+                worker.profile_dir,
+                batch,
+                output_dir,
+                self.job_timeout_seconds or batch_timeout_seconds(len(batch)),
+            )
+        except Exception as error:
+            if profile is not None:
+                profile.office_failure(time.perf_counter() - started)
+            worker.failures += 1
+            worker.last_error = str(error)
+            self._restart(worker)
+            raise
+        finally:
+            self._idle.put(worker)
+        worker.conversions += 1
+        if profile is not None:
+            profile.office_batch(len(batch), time.perf_counter() - started)
+        return pdf_paths
+
+    def convert(
+        self,
+        pptx_paths: list[str],
+        out_dir: str,
+        batch_size: int = 100,
+        profile: RenderProfile | None = None,
+    ) -> list[str]:
+        """Convert presentations on all workers, keeping the input order."""
+        if not pptx_paths:
+            return []
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        if self._executor is None:
+            raise RuntimeError("Office pool is not started")
+
+        output_dir = Path(out_dir).resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        resolved_paths = [Path(path).resolve() for path in pptx_paths]
+        # Smaller batches keep every worker busy on mid-sized packages.
+        batch_size = min(
+            batch_size, math.ceil(len(resolved_paths) / self.size)
+        )
+        batches = [
+            resolved_paths[start:start + batch_size]
+            for start in range(0, len(resolved_paths), batch_size)
+        ]
+        futures = [
+            self._executor.submit(self._convert_batch, batch, output_dir, profile)
+            for batch in batches
+        ]
+        return [path for future in futures for path in future.result()]
+
+    def health(self) -> dict:
+        return {
+            "size": self.size,
+            "healthy": sum(worker.healthy for worker in self.workers),
+            "idle": self._idle.qsize(),
+            "probes": self.probes,
+            "last_probe_at": self.last_probe_at,
+            "workers": [
+                {
+                    "index": worker.index,
+                    "healthy": worker.healthy,
+                    "conversions": worker.conversions,
+                    "failures": worker.failures,
+                    "restarts": worker.restarts,
+                    "last_error": worker.last_error,
+                }
+                for worker in self.workers
+            ],
+        }
+
+
+def default_pool_size() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
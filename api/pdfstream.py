@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import itertools
+import weakref
+import zlib
+
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NullObject,
+    NumberObject,
+    PdfObject,
+    StreamObject,
+)
+
+# Back references that would drag the source page tree or the structure tree
+# into the output.
+_SKIP_KEYS = {"/Parent", "/StructParent", "/StructParents"}
+# /P is such a back reference (the page, the parent element) only in these
+# dictionaries; elsewhere it is data, e.g. the permissions of /Encrypt.
+_BACK_P_TYPES = {"/Annot", "/StructElem"}
+# Objects whose identity matters; everything else with equal content is
+# written once however many parts carry a copy.
+_UNIQUE_TYPES = {"/Page", "/Pages", "/Annot", "/StructElem", "/StructTreeRoot"}
+_CATALOG = 1
+_PAGES = 2
+
+
+def _skipped(dictionary: DictionaryObject, key: str) -> bool:
+    if key == "/P":
+        return dictionary.get("/Type") in _BACK_P_TYPES
+    return key in _SKIP_KEYS
+
+
+class StreamingPdfWriter:
+    """Serialize a PDF incrementally, page by page.
+
+    Every object a page reaches is written as soon as the page is added, and
+    objects shared between pages (template fonts, images, content streams)
+    are written once. Identical objects coming from different source files,
+    such as the fonts and images of per-brochure PDFs, are recognised by a
+    content digest and written once as well. The page tree, catalog and
+    xref follow at the end, so the caller can send bytes while later pages
+    are still rendering.
+
+    With ``compress`` the dictionaries of each page are packed into one
+    Flate-compressed object stream, unfiltered streams are compressed and
+    the xref becomes a compressed cross-reference stream.
+    """
+
+    def __init__(self, compress: bool = True):
+        self.compress = compress
+        self._offset = 0
+        self._offsets: dict[int, int] = {}
+        # Objects packed into object streams: number -> (stream, index).
+        self._packed: dict[int, tuple[int, int]] = {}
+        self._unpacked: list[tuple[int, bytes]] = []
+        self._numbers: dict[tuple, int] = {}
+        self._by_content: dict[bytes, int] = {}
+        self._digests: dict[tuple, bytes | None] = {}
+        self._next_number = _PAGES + 1
+        self._kids: list[int] = []
+        # Source documents get a serial for as long as they are alive, so a
+        # finished part can be garbage collected while streaming continues.
+        self._sources: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._serials = itertools.count()
+        # Direct streams of the current page are keyed by id(); holding them
+        # prevents id reuse until the page is out.
+        self._keep: list[object] = []
+        self._started = False
+        self.bytes_written = 0
+        # Source objects written as a reference to an identical earlier one.
+        self.shared_objects = 0
+
+    def _allocate(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _emit(self, chunks: list[bytes], data: bytes) -> None:
+        chunks.append(data)
+        self._offset += len(data)
+
+    def _header(self, chunks: list[bytes]) -> None:
+        if not self._started:
+            self._started = True
+            self._emit(chunks, b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write_object(self, chunks: list[bytes], number: int, obj: PdfObject) -> None:
+        if self.compress and not isinstance(obj, StreamObject):
+            buffer = io.BytesIO()
+            obj.write_to_stream(buffer)
+            self._unpacked.append((number, buffer.getvalue()))
+            return
+        buffer = io.BytesIO()
+        buffer.write(f"{number} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(buffer)
+        buffer.write(b"\nendobj\n")
+        self._offsets[number] = self._offset
+        self._emit(chunks, buffer.getvalue())
+
+    def _flush_object_stream(self, chunks: list[bytes]) -> None:
+        """Pack the dictionaries written since the last flush into one stream."""
+        if not self._unpacked:
+            return
+        number = self._allocate()
+        header = []
+        body = io.BytesIO()
+        for index, (packed_number, data) in enumerate(self._unpacked):
+            header.append(f"{packed_number} {body.tell()}")
+            body.write(data)
+            body.write(b"\n")
+            self._packed[packed_number] = (number, index)
+        prefix = (" ".join(header) + "\n").encode("ascii")
+        stream = StreamObject()
+        stream._data = zlib.compress(prefix + body.getvalue())
+        stream[NameObject("/Type")] = NameObject("/ObjStm")
+        stream[NameObject("/N")] = NumberObject(len(self._unpacked))
+        stream[NameObject("/First")] = NumberObject(len(prefix))
+        stream[NameObject("/Filter")] = NameObject("/FlateDecode")
+        self._unpacked = []
+        self._write_object(chunks, number, stream)
+
+    def _digest(self, obj: IndirectObject, source: int, visiting: set) -> bytes | None:
+        """Content hash of an indirect object and all it references.
+
+        ``None`` marks objects that must keep their identity: pages,
+        annotations and anything reaching itself through references.
+        """
+        key = (source, obj.idnum, obj.generation)
+        if key in self._digests:
+            return self._digests[key]
+        if key in visiting:
+            return None
+        visiting.add(key)
+        try:
+            target = obj.get_object()
+            if target is None or (
+                isinstance(target, DictionaryObject)
+                and target.get("/Type") in _UNIQUE_TYPES
+            ):
+                digest = None
+            else:
+                hasher = hashlib.blake2b(digest_size=20)
+                digest = (
+                    hasher.digest()
+                    if self._hash(hasher, target, source, visiting)
+                    else None
+                )
+        finally:
+            visiting.discard(key)
+        self._digests[key] = digest
+        return digest
+
+    def _hash(self, hasher, value, source: int, visiting: set) -> bool:
+        if isinstance(value, IndirectObject):
+            digest = self._digest(value, source, visiting)
+            if digest is None:
+                return False
+            hasher.update(b"R" + digest)
+        elif isinstance(value, DictionaryObject):
+            hasher.update(b"<<")
+            # items(), unlike [], keeps references unresolved.
+            for key, item in sorted(value.items()):
+                if _skipped(value, key):
+                    continue
+                hasher.update(key.encode("utf-8"))
+                if not self._hash(hasher, item, source, visiting):
+                    return False
+            hasher.update(b">>")
+            if isinstance(value, StreamObject):
+                hasher.update(b"stream")
+                hasher.update(value._data)
+        elif isinstance(value, ArrayObject):
+            hasher.update(b"[")
+            for item in value:
+                if not self._hash(hasher, item, source, visiting):
+                    return False
+            hasher.update(b"]")
+        else:
+            buffer = io.BytesIO()
+            value.write_to_stream(buffer)
+            hasher.update(type(value).__name__.encode("ascii"))
+            hasher.update(buffer.getvalue())
+            hasher.update(b" ")
+        return True
+
+    def _reference(self, key: tuple, target, pending: list) -> IndirectObject:
+        number = self._numbers.get(key)
+        if number is None:
+            number = self._allocate()
+            self._numbers[key] = number
+            pending.append((number, target))
+        return IndirectObject(number, 0, None)
+
+    def _translate(self, obj, pending: list):
+        if isinstance(obj, IndirectObject):
+            source = self._sources.get(obj.pdf)
+            if source is None:
+                source = self._sources[obj.pdf] = next(self._serials)
+            key = (source, obj.idnum, obj.generation)
+            if key not in self._numbers:
+                digest = self._digest(obj, source, set())
+                if digest is not None:
+                    number = self._by_content.get(digest)
+                    if number is not None:
+                        self._numbers[key] = number
+                        self.shared_objects += 1
+                        return IndirectObject(number, 0, None)
+                    reference = self._reference(key, obj, pending)
+                    self._by_content[digest] = reference.idnum
+                    return reference
+            return self._reference(key, obj, pending)
+        if isinstance(obj, StreamObject):
+            # Direct streams are not valid PDF; give them their own number.
+            key = ("direct", id(obj))
+            if key not in self._numbers:
+                self._keep.append(obj)
+            return self._reference(key, obj, pending)
+        if isinstance(obj, DictionaryObject):
+            return self._translate_dict(obj, DictionaryObject(), pending)
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._translate(item, pending) for item in obj)
+        return obj
+
+    def _translate_dict(self, source, target, pending: list):
+        for key, value in source.items():
+            if _skipped(source, key):
+                continue
+            target[NameObject(key)] = self._translate(value, pending)
+        return target
+
+    def _materialize(self, obj, pending: list) -> PdfObject:
+        if isinstance(obj, IndirectObject):
+            obj = obj.get_object()
+            if obj is None:
+                return NullObject()
+        if isinstance(obj, StreamObject):
+            stream = StreamObject()
+            stream._data = obj._data
+            self._translate_dict(obj, stream, pending)
+            if self.compress and "/Filter" not in stream and stream._data:
+                stream._data = zlib.compress(stream._data)
+                stream[NameObject("/Filter")] = NameObject("/FlateDecode")
+            return stream
+        return self._translate(obj, pending)
+
+    def add_page(self, page: DictionaryObject) -> bytes:
+        """Write a page and every object it reaches that is not out yet."""
+        chunks: list[bytes] = []
+        self._header(chunks)
+        pending: list = []
+        translated = self._translate_dict(page, DictionaryObject(), pending)
+        translated[NameObject("/Type")] = NameObject("/Page")
+        translated[NameObject("/Parent")] = IndirectObject(_PAGES, 0, None)
+        while pending:
+            number, target = pending.pop()
+            self._write_object(chunks, number, self._materialize(target, pending))
+        page_number = self._allocate()
+        self._write_object(chunks, page_number, translated)
+        self._kids.append(page_number)
+        self._flush_object_stream(chunks)
+        # Each page's direct streams are written with it, so neither their
+        # keys nor the objects have to live until finish().
+        for obj in self._keep:
+            del self._numbers[("direct", id(obj))]
+        self._keep.clear()
+        data = b"".join(chunks)
+        self.bytes_written += len(data)
+        return data
+
+    def finish(self) -> bytes:
+        """Write the page tree, catalog and cross-reference section."""
+        chunks: list[bytes] = []
+        self._header(chunks)
+        pages = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Pages"),
+                NameObject("/Kids"): ArrayObject(
+                    IndirectObject(number, 0, None) for number in self._kids
+                ),
+                NameObject("/Count"): NumberObject(len(self._kids)),
+            }
+        )
+        catalog = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Catalog"),
+                NameObject("/Pages"): IndirectObject(_PAGES, 0, None),
+            }
+        )
+        self._write_object(chunks, _PAGES, pages)
+        self._write_object(chunks, _CATALOG, catalog)
+        self._flush_object_stream(chunks)
+        if self.compress:
+            self._xref_stream(chunks)
+        else:
+            self._xref_table(chunks)
+        data = b"".join(chunks)
+        self.bytes_written += len(data)
+        return data
+
+    def _xref_table(self, chunks: list[bytes]) -> None:
+        xref_offset = self._offset
+        size = self._next_number
+        lines = [f"xref\n0 {size}\n", "0000000000 65535 f \n"]
+        for number in range(1, size):
+            offset = self._offsets.get(number)
+            if offset is None:
+                lines.append("0000000000 65535 f \n")
+            else:
+                lines.append(f"{offset:010d} 00000 n \n")
+        lines.append(
+            f"trailer\n<< /Size {size} /Root {_CATALOG} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n"
+        )
+        self._emit(chunks, "".join(lines).encode("ascii"))
+
+    def _xref_stream(self, chunks: list[bytes]) -> None:
+        """Compressed xref, required once objects live in object streams."""
+        number = self._allocate()
+        xref_offset = self._offset
+        self._offsets[number] = xref_offset
+        size = self._next_number
+        width = max(4, (xref_offset.bit_length() + 7) // 8)
+        rows = [b"\x00" + bytes(width) + b"\xff\xff"]
+        for entry in range(1, size):
+            if entry in self._packed:
+                stream, index = self._packed[entry]
+                rows.append(
+                    b"\x02" + stream.to_bytes(width, "big") + index.to_bytes(2, "big")
+                )
+            elif entry in self._offsets:
+                rows.append(
+                    b"\x01" + self._offsets[entry].to_bytes(width, "big") + bytes(2)
+                )
+            else:
+                rows.append(b"\x00" + bytes(width) + b"\xff\xff")
+        stream = StreamObject()
+        stream._data = zlib.compress(b"".join(rows))
+        stream[NameObject("/Type")] = NameObject("/XRef")
+        stream[NameObject("/Size")] = NumberObject(size)
+        stream[NameObject("/W")] = ArrayObject(
+            NumberObject(value) for value in (1, width, 2)
+        )
+        stream[NameObject("/Root")] = IndirectObject(_CATALOG, 0, None)
+        stream[NameObject("/Filter")] = NameObject("/FlateDecode")
+        buffer = io.BytesIO()
+        buffer.write(f"{number} 0 obj\n".encode("ascii"))
+        stream.write_to_stream(buffer)
+        buffer.write(b"\nendobj\n")
+        self._emit(chunks, buffer.getvalue())
+        self._emit(chunks, f"startxref\n{xref_offset}\n%%EOF\n".encode("ascii"))
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+from .brochure import PDF_LANGUAGES
+from .hotels import HotelConfig, Tenant
+from .jobs import RenderSlots
+
+logger = logging.getLogger(__name__)
+
+# render(hotel, language, passwords, out_dir) -> one PDF path per password.
+Renderer = Callable[[HotelConfig, str, list[str], str], list[str]]
+
+
+def file_fingerprint(paths: Iterable[str | Path]) -> str:
+    """Changes whenever one of the files is replaced, edited or removed."""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            parts.append(f"{path}:missing")
+        else:
+            parts.append(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedBrochure:
+    password: str
+    fingerprint: str
+    path: Path
+
+
+class PrerenderPool:
+    """Brochures rendered ahead for the next available passwords.
+
+    The worker keeps RU and EN PDFs for the first ``stock`` available
+    passwords of every hotel, keyed by password id. A generation whose
+    reservation is fully in the cache only concatenates the files; any miss
+    renders the whole reservation as before. An entry is only used while
+    its password text and the hotel's template fingerprint still match, so
+    an edited password or a replaced template never prints stale pages.
+    The oldest entries are evicted above ``max_brochures``.
+    """
+
+    def __init__(
+        self,
+        tenants: Iterable[Tenant],
+        cache_dir: str,
+        render: Renderer,
+        fingerprint: Callable[[HotelConfig], str],
+        stock: int = 200,
+        max_brochures: int = 2000,
+        interval_seconds: float = 5,
+        batch_size: int = 20,
+        slots: RenderSlots | None = None,
+    ):
+        self.tenants = list(tenants)
+        self.cache_dir = Path(cache_dir)
+        self.render = render
+        self.fingerprint = fingerprint
+        self.stock = stock
+        self.max_brochures = max_brochures
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        # Batches only start while no generation renders, and never take a
+        # slot themselves: a request arriving mid-batch still gets one.
+        self.slots = slots
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.evicted = 0
+        self.errors = 0
+        self._entries: OrderedDict[tuple[str, int, str], CachedBrochure] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # Nothing survives a restart: the index lives in memory only.
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        with self._lock:
+            self._entries.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def take(
+        self,
+        hotel: HotelConfig,
+        ids: Sequence[int],
+        passwords: Sequence[str],
+        ru_count: int,
+    ) -> list[str] | None:
+        """Cached PDFs for a reservation in print order, or ``None``.
+
+        Only a complete hit is returned; the entries leave the cache and the
+        caller owns (and deletes) the files.
+        """
+        if not ids or len(ids) != len(passwords):
+            return None
+        fingerprint = self.fingerprint(hotel)
+        keys = [
+            (hotel.id, password_id, "ru" if index < ru_count else "en")
+            for index, password_id in enumerate(ids)
+        ]
+        with self._lock:
+            for key, password in zip(keys, passwords):
+                entry = self._entries.get(key)
+                if (
+                    entry is None
+                    or entry.password != password
+                    or entry.fingerprint != fingerprint
+                ):
+                    self.misses += 1
+                    return None
+            self.hits += 1
+            return [str(self._entries.pop(key).path) for key in keys]
+
+    def discard(self, hotel_id: str, ids: Iterable[int]) -> None:
+        """Forget the brochures of passwords that were edited or removed."""
+        with self._lock:
+            stale = [
+                self._entries.pop(key)
+                for password_id in ids
+                for language in PDF_LANGUAGES
+                if (key := (hotel_id, password_id, language)) in self._entries
+            ]
+        for entry in stale:
+            entry.path.unlink(missing_ok=True)
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    async def fill(self, tenant: Tenant) -> int:
+        """Render what is missing for the hotel's next ``stock`` passwords."""
+        hotel = tenant.config
+        fingerprint = self.fingerprint(hotel)
+        available = await tenant.store.list_available(limit=self.stock)
+        wanted = {
+            (hotel.id, item["id"], language): item["password"]
+            for item in available
+            for language in PDF_LANGUAGES
+        }
+        with self._lock:
+            # Taken, issued or outdated passwords of this hotel.
+            stale = [
+                self._entries.pop(key)
+                for key, entry in list(self._entries.items())
+                if key[0] == hotel.id
+                and (
+                    wanted.get(key) != entry.password
+                    or entry.fingerprint != fingerprint
+                )
+            ]
+            missing = [key for key in wanted if key not in self._entries]
+        for entry in stale:
+            entry.path.unlink(missing_ok=True)
+
+        rendered = 0
+        for start in range(0, len(missing), self.batch_size):
+            if self.size() >= self.max_brochures:
+                break
+            if self.slots is not None and self.slots.busy:
+                break
+            batch = missing[start:start + self.batch_size]
+            rendered += await self._render_batch(hotel, fingerprint, batch, wanted)
+        return rendered
+
+    async def run_once(self) -> int:
+        rendered = 0
+        for tenant in self.tenants:
+            try:
+                rendered += await self.fill(tenant)
+            except Exception:
+                self.errors += 1
+                logger.exception("Pre-rendering failed for %s", tenant.config.id)
+        return rendered
+
+    def stats(self) -> dict:
+        return {
+            "brochures": self.size(),
+            "max_brochures": self.max_brochures,
+            "stock": self.stock,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rendered": self.rendered,
+            "evicted": self.evicted,
+            "errors": self.errors,
+        }
+
+    async def _render_batch(
+        self,
+        hotel: HotelConfig,
+        fingerprint: str,
+        keys: list[tuple[str, int, str]],
+        passwords: dict[tuple[str, int, str], str],
+    ) -> int:
+        rendered = 0
+        for language in PDF_LANGUAGES:
+            group = [key for key in keys if key[2] == language]
+            if not group:
+                continue
+            paths = await asyncio.to_thread(
+                self._render_files,
+                hotel,
+                language,
+                [passwords[key] for key in group],
+            )
+            self._add(
+                [
+                    (key, CachedBrochure(passwords[key], fingerprint, path))
+                    for key, path in zip(group, paths)
+                ]
+            )
+            rendered += len(group)
+        self.rendered += rendered
+        return rendered
+
+    def _render_files(
+        self, hotel: HotelConfig, language: str, passwords: list[str]
+    ) -> list[Path]:
+        out_dir = tempfile.mkdtemp(prefix="render_", dir=self.cache_dir)
+        try:
+            paths = []
+            for path in self.render(hotel, language, passwords, out_dir):
+                target = self.cache_dir / f"{secrets.token_hex(8)}.pdf"
+                os.replace(path, target)
+                paths.append(target)
+            return paths
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def _add(self, items: list[tuple[tuple[str, int, str], CachedBrochure]]) -> None:
+        with self._lock:
+            evicted = []
+            for key, entry in items:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    evicted.append(previous)
+                self._entries[key] = entry
+            while len(self._entries) > self.max_brochures:
+                evicted.append(self._entries.popitem(last=False)[1])
+                self.evicted += 1
+        for entry in evicted:
+            entry.path.unlink(missing_ok=True)
+
+    async def _loop(self) -> None:
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval_seconds)
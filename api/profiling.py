@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class RenderProfile:
+    """Where one generation spent its time, filled in while it renders.
+
+    Phases add up across chunks. LibreOffice batches are kept one by one,
+    because the office pool converts them concurrently and a single slow
+    profile is what needs spotting.
+    """
+
+    def __init__(self) -> None:
+        self.phases: dict[str, float] = {}
+        self.office_batches: list[tuple[int, float]] = []
+        # Seconds spent in batches that failed or timed out.
+        self.office_failures: list[float] = []
+        self.bytes_written = 0
+        # Brochures whose pages have been handed out, for job progress.
+        self.brochures_written = 0
+        # Objects of the parts that were written once for the whole output.
+        self.shared_objects = 0
+        self._lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def office_batch(self, size: int, seconds: float) -> None:
+        with self._lock:
+            self.office_batches.append((size, seconds))
+
+    def office_failure(self, seconds: float) -> None:
+        with self._lock:
+            self.office_failures.append(seconds)
+
+    def wrote(self, piece: bytes, brochures: int = 0) -> bytes:
+        self.bytes_written += len(piece)
+        self.brochures_written += brochures
+        return piece
+
+    def finish(self, writer) -> bytes:
+        """Close a ``StreamingPdfWriter`` and note what it deduplicated."""
+        piece = writer.finish()
+        self.shared_objects += writer.shared_objects
+        return self.wrote(piece)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "phases_ms": {
+                    phase: round(seconds * 1000, 1)
+                    for phase, seconds in self.phases.items()
+                },
+                "office_batches": [
+                    {"size": size, "ms": round(seconds * 1000, 1)}
+                    for size, seconds in self.office_batches
+                ],
+                "bytes": self.bytes_written,
+                "shared_objects": self.shared_objects,
+            }
+
+    def server_timing(self, total_seconds: float) -> str:
+        """Multi-entry ``Server-Timing`` value: total, phases, batches, size."""
+        with self._lock:
+            entries = [f"pdf;dur={total_seconds * 1000:.0f}"]
+            entries += [
+                f"{phase};dur={seconds * 1000:.0f}"
+                for phase, seconds in self.phases.items()
+            ]
+            entries += [
+                f'soffice-{index};dur={seconds * 1000:.0f};desc="{size} files"'
+                for index, (size, seconds) in enumerate(self.office_batches)
+            ]
+        entries.append(f'bytes;desc="{self.bytes_written}"')
+        entries.append(f'shared;desc="{self.shared_objects} objects"')
+        return ", ".join(entries)
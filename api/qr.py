@@ -1,18 +1,161 @@
 from __future__ import annotations
 
+import io
+import threading
+from collections import OrderedDict
 from pathlib import Path
 import qrcode
+from qrcode.constants import (
+    ERROR_CORRECT_H,
+    ERROR_CORRECT_L,
+    ERROR_CORRECT_M,
+    ERROR_CORRECT_Q,
+)
 
-def make_qr_png(password: str, out_path: str):
+ERROR_CORRECTION = {
+    "L": ERROR_CORRECT_L,
+    "M": ERROR_CORRECT_M,
+    "Q": ERROR_CORRECT_Q,
+    "H": ERROR_CORRECT_H,
+}
+QR_BORDER = 2
+QR_CACHE_SIZE = 4096
+# Print resolution used to size QR bitmaps for a template box.
+QR_DPI = 300
+EMU_PER_INCH = 914400
+
+
+class QrCache:
+    """Bounded LRU shared by every engine in this process.
+
+    Released passwords come back in the next generation, so retries hit the
+    cache instead of recomputing the matrix and the PNG.
+    """
+
+    def __init__(self, max_size: int = QR_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: tuple, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+cache = QrCache()
+
+
+def _build_matrix(payload: str, ecc: str) -> tuple[tuple[bool, ...], ...]:
     # Small payload: simple text like ABCD-1234
     qr = qrcode.QRCode(
         version=None,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=2,
+        error_correction=ERROR_CORRECTION[ecc],
+        box_size=1,
+        border=QR_BORDER,
     )
-    qr.add_data(password)
+    qr.add_data(payload)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def _render_png(matrix: tuple[tuple[bool, ...], ...], size: int | None) -> bytes:
+    from PIL import Image
+
+    modules = len(matrix)
+    image = Image.new("1", (modules, modules), 1)
+    image.putdata([0 if dark else 1 for row in matrix for dark in row])
+    # Default matches the former box_size=10 output.
+    pixels = size or modules * 10
+    image = image.resize((pixels, pixels), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def qr_matrix(payload: str, ecc: str = "M") -> tuple[tuple[bool, ...], ...]:
+    """Module grid including the quiet zone; True is a dark module."""
+    key = ("matrix", payload, ecc)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = _build_matrix(payload, ecc)
+        cache.put(key, matrix)
+    return matrix
+
+
+def qr_png(payload: str, ecc: str = "M", size: int | None = None) -> bytes:
+    """PNG bytes exactly ``size`` pixels wide, rendered without temp files."""
+    key = ("png", payload, ecc, size)
+    png = cache.get(key)
+    if png is None:
+        png = _render_png(qr_matrix(payload, ecc), size)
+        cache.put(key, png)
+    return png
+
+
+def _qr_png_chunk(jobs: list[tuple[str, str, int | None]]) -> list[bytes]:
+    return [_render_png(_build_matrix(payload, ecc), size) for payload, ecc, size in jobs]
+
+
+def qr_png_batch(
+    payloads: list[str],
+    ecc: str = "M",
+    size: int | None = None,
+    executor=None,
+    chunk_size: int = 64,
+) -> list[bytes]:
+    """Render many codes in input order; cache misses go to the executor."""
+    results: list[bytes | None] = [
+        cache.get(("png", payload, ecc, size)) for payload in payloads
+    ]
+    missing = [index for index, png in enumerate(results) if png is None]
+    if executor is None or len(missing) < 2:
+        for index in missing:
+            results[index] = qr_png(payloads[index], ecc, size)
+        return results
+
+    chunks = [
+        missing[start:start + chunk_size]
+        for start in range(0, len(missing), chunk_size)
+    ]
+    rendered = executor.map(
+        _qr_png_chunk,
+        [[(payloads[index], ecc, size) for index in chunk] for chunk in chunks],
+    )
+    for chunk, pngs in zip(chunks, rendered):
+        for index, png in zip(chunk, pngs):
+            cache.put(("png", payloads[index], ecc, size), png)
+            results[index] = png
+    return results
+
+
+def qr_pixels_for_box(width_emu: int, dpi: int = QR_DPI) -> int:
+    return max(1, round(width_emu / EMU_PER_INCH * dpi))
+
+
+def make_qr_png(password: str, out_path: str):
     Path(out_path).parent.mkdir(parents=True, exist_ok=True)
-    img.save(out_path)
+    Path(out_path).write_bytes(qr_png(password))
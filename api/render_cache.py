@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import secrets
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class RenderCache:
+    """Rendered brochure PDFs on disk, addressed by what they were made from.
+
+    A released or expired reservation comes back with the same passwords
+    and templates, so its retry reuses the PDFs LibreOffice already made.
+    Files are written under a temporary name and renamed into place, which
+    keeps readers from ever seeing half a PDF. The least recently used files
+    go once the directory holds more than ``max_bytes``.
+    """
+
+    SUFFIX = ".pdf"
+    # A temporary file this old belongs to a write that died; younger ones
+    # may be another worker's store() in progress.
+    STALE_SECONDS = 3600
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        stale_before = time.time() - self.STALE_SECONDS
+        for path in self.directory.iterdir():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.suffix == ".tmp":
+                if stat.st_mtime < stale_before:
+                    path.unlink(missing_ok=True)
+                continue
+            if path.suffix != self.SUFFIX:
+                continue
+            files.append((stat.st_mtime_ns, path.name, stat.st_size))
+        self._sizes: OrderedDict[str, int] = OrderedDict(
+            (name, size) for _mtime, name, size in sorted(files)
+        )
+        self._bytes = sum(self._sizes.values())
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def key(*parts: object) -> str:
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def fetch(self, key: str, target: str | Path) -> bool:
+        """Place the cached PDF at ``target``; ``False`` on a miss."""
+        name = key + self.SUFFIX
+        path = self.directory / name
+        with self._lock:
+            if name not in self._sizes:
+                self.misses += 1
+                return False
+            try:
+                _link_or_copy(path, Path(target))
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back, e.g. by another worker's eviction.
+                self._bytes -= self._sizes.pop(name)
+                self.misses += 1
+                return False
+            self._sizes.move_to_end(name)
+            self.hits += 1
+            return True
+
+    def store(self, key: str, source: str | Path) -> None:
+        name = key + self.SUFFIX
+        temporary = self.directory / f".{key}.{secrets.token_hex(4)}.tmp"
+        _link_or_copy(Path(source), temporary)
+        size = temporary.stat().st_size
+        with self._lock:
+            os.replace(temporary, self.directory / name)
+            self._bytes += size - self._sizes.pop(name, 0)
+            self._sizes[name] = size
+            self.stored += 1
+            self._evict()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._sizes),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "evicted": self.evicted,
+            }
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._sizes:
+            name, size = self._sizes.popitem(last=False)
+            (self.directory / name).unlink(missing_ok=True)
+            self._bytes -= size
+            self.evicted += 1
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -25,14 +26,53 @@ class Settings(BaseModel):
 
     # Local standalone storage. DATABASE_URL takes precedence when configured.
     database_path: str = os.getenv("DATABASE_PATH", "data/vouchers.db")
+    # SQLite page cache per connection, memory-mapped I/O limit and how often
+    # the WAL is checkpointed in the background (0 disables it).
+    sqlite_cache_size_kib: int = int(os.getenv("SQLITE_CACHE_SIZE_KIB", "16384"))
+    sqlite_mmap_size: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    sqlite_checkpoint_seconds: float = float(
+        os.getenv("SQLITE_CHECKPOINT_SECONDS", "30")
+    )
     database_url: str = os.getenv("DATABASE_URL", "")
+    # PostgreSQL connection pool; connections are health-checked on checkout.
+    database_pool_min_size: int = int(os.getenv("DATABASE_POOL_MIN_SIZE", "1"))
+    database_pool_max_size: int = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+    database_pool_max_idle_seconds: float = float(
+        os.getenv("DATABASE_POOL_MAX_IDLE_SECONDS", "300")
+    )
+    database_pool_timeout_seconds: float = float(
+        os.getenv("DATABASE_POOL_TIMEOUT_SECONDS", "30")
+    )
+
+    # Threads that run blocking database calls for the async handlers (all of
+    # SQLite, administrative writes on PostgreSQL).
+    database_executor_workers: int = int(
+        os.getenv("DATABASE_EXECUTOR_WORKERS", "4")
+    )
 
     # Tenant boundary. Standalone mode is scoped to exactly one hotel.
     hotel_id: str = os.getenv("HOTEL_ID", "standalone")
     hotel_name: str = os.getenv("HOTEL_NAME", "Standalone hotel")
+    # More hotels in the same process: a JSON list of {"id", "name", and
+    # optionally template paths and max_pending_jobs}, served under
+    # /api/v1/hotels/{id}. The hotel above stays the default at /api/v1.
+    hotels_file: str = os.getenv("HOTELS_FILE", "")
+    # Generation jobs one hotel may have queued or running (0 = no limit).
+    hotel_max_pending_jobs: int = int(os.getenv("HOTEL_MAX_PENDING_JOBS", "0"))
     reservation_ttl_minutes: int = int(
         os.getenv("RESERVATION_TTL_MINUTES", "15")
     )
+    # Expired leases are released by a background task every this many
+    # seconds, at most this many reservations per transaction.
+    lease_reaper_interval_seconds: float = float(
+        os.getenv("LEASE_REAPER_INTERVAL_SECONDS", "30")
+    )
+    lease_reaper_batch_size: int = int(os.getenv("LEASE_REAPER_BATCH_SIZE", "50"))
+    # Used passwords and finished generations older than this many days move
+    # to the archive tables in batches (0 keeps everything in the hot tables).
+    archive_after_days: int = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    archive_batch_size: int = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+    archive_interval_hours: float = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "6"))
 
     # Templates in repo
     template_ru_path: str = os.getenv("TEMPLATE_RU_PATH", "api/templates/brochure_ru.pptx")
@@ -41,6 +81,69 @@ class Settings(BaseModel):
     # LibreOffice binary
     soffice_bin: str = _default_soffice_bin()
 
+    # Warm LibreOffice pool for the PPTX engine. Size 0 means one worker per
+    # available CPU; timeout 0 scales with the batch size; idle profiles are
+    # re-checked every probe interval (0 = only after a failed job).
+    office_pool_size: int = int(os.getenv("OFFICE_POOL_SIZE", "0"))
+    office_job_timeout_seconds: int = int(
+        os.getenv("OFFICE_JOB_TIMEOUT_SECONDS", "0")
+    )
+    office_probe_interval_seconds: float = float(
+        os.getenv("OFFICE_PROBE_INTERVAL_SECONDS", "300")
+    )
+    office_profile_dir: str = os.getenv(
+        "OFFICE_PROFILE_DIR",
+        str(Path(tempfile.gettempdir()) / "wifi-voucher-office"),
+    )
+    # Processes that instantiate PPTX brochures and QR codes; 0 = CPU count.
+    render_workers: int = int(os.getenv("RENDER_WORKERS", "0"))
+
+    # Brochure engine: "pdf" stamps passwords onto the pre-rendered templates
+    # from scripts/build_web_templates.py, "pptx" converts through LibreOffice,
+    # "auto" uses pdf whenever the pre-rendered templates are present.
+    brochure_renderer: str = os.getenv("BROCHURE_RENDERER", "auto")
+    pdf_template_dir: str = os.getenv("PDF_TEMPLATE_DIR", "web/public/templates")
+    pdf_font_path: str = os.getenv("PDF_FONT_PATH", "fonts/circe.ttf")
+    # Brochures per piece when /api/v1/generations?stream=true is used.
+    stream_chunk_size: int = int(os.getenv("STREAM_CHUNK_SIZE", "50"))
+
+    # Simultaneous renders across jobs, streams and ?wait=true requests
+    # (0 = one per CPU, or per LibreOffice profile in PPTX mode), jobs allowed
+    # to wait beyond that before 429, and how long a finished PDF stays
+    # downloadable.
+    generation_workers: int = int(os.getenv("GENERATION_WORKERS", "0"))
+    generation_queue_size: int = int(os.getenv("GENERATION_QUEUE_SIZE", "20"))
+    generation_retention_minutes: int = int(
+        os.getenv("GENERATION_RETENTION_MINUTES", "30")
+    )
+
+    # Disk cache of PDFs made by LibreOffice, reused when released passwords
+    # are printed again (0 MB = off).
+    render_cache_dir: str = os.getenv(
+        "RENDER_CACHE_DIR",
+        str(Path(tempfile.gettempdir()) / "wifi-voucher-render-cache"),
+    )
+    render_cache_max_mb: int = int(os.getenv("RENDER_CACHE_MAX_MB", "256"))
+
+    # Brochures rendered ahead for the next available passwords of every
+    # hotel (0 = off), the cache limit across hotels, where the PDFs are kept
+    # and how often the stock is topped up.
+    prerender_stock: int = int(os.getenv("PRERENDER_STOCK", "0"))
+    prerender_max_brochures: int = int(os.getenv("PRERENDER_MAX_BROCHURES", "2000"))
+    prerender_cache_dir: str = os.getenv(
+        "PRERENDER_CACHE_DIR",
+        str(Path(tempfile.gettempdir()) / "wifi-voucher-prerender"),
+    )
+    prerender_interval_seconds: float = float(
+        os.getenv("PRERENDER_INTERVAL_SECONDS", "5")
+    )
+
+    # /metrics re-reads password counts of a hotel only when no request has
+    # returned them for this many seconds.
+    metrics_stats_max_age_seconds: float = float(
+        os.getenv("METRICS_STATS_MAX_AGE_SECONDS", "30")
+    )
+
     # Optional HTTP Basic protection for the password management interface.
     admin_username: str = os.getenv("ADMIN_USERNAME", "admin")
     admin_password: str = os.getenv("ADMIN_PASSWORD", "")
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import copy
+import json
+import logging
 import sqlite3
+import threading
 import uuid
 from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import timedelta
 from pathlib import Path
-from typing import Iterable, Iterator, Protocol
+from typing import Callable, Iterable, Iterator, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
 
 
 class NotEnoughPasswords(RuntimeError):
@@ -25,10 +32,15 @@ class PasswordsUnavailable(RuntimeError):
     pass
 
 
+T = TypeVar("T")
+
+
 @dataclass(frozen=True)
 class Reservation:
     batch_id: str
     passwords: tuple[str, ...]
+    # Row ids of ``passwords``, in the same order.
+    ids: tuple[int, ...] = ()
 
 
 class Store(Protocol):
@@ -39,20 +51,59 @@ class Store(Protocol):
     def preview_import(self, passwords: Iterable[str]) -> dict: ...
     def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]: ...
     def stats(self) -> dict[str, int]: ...
+    def reconcile_counters(self) -> dict[str, int]: ...
     def list_available(
-        self, limit: int = 200, offset: int = 0, search: str = ""
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
     ) -> list[dict]: ...
     def list_generations(self, limit: int = 50) -> list[dict]: ...
+    def get_generation(self, batch_id: str) -> dict | None: ...
     def update_available(self, password_id: int, password: str) -> bool: ...
     def delete_available(self, password_id: int) -> bool: ...
     def delete_available_many(self, password_ids: Iterable[int]) -> int: ...
     def issue_available(self, password_ids: Iterable[int]) -> list[str]: ...
+    # The *_with_stats variants also return the counters read in the same
+    # transaction, so the UI never shows stats from another operator's change.
+    def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]: ...
+    def import_passwords_with_stats(
+        self, passwords: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]: ...
+    def update_available_with_stats(
+        self, password_id: int, password: str
+    ) -> tuple[bool, dict[str, int]]: ...
+    def delete_available_with_stats(
+        self, password_id: int
+    ) -> tuple[bool, dict[str, int]]: ...
+    def delete_available_many_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[int, dict[str, int]]: ...
+    def issue_available_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[list[str], dict[str, int]]: ...
     def reserve(
         self, count: int, ru_count: int = 0, en_count: int = 0
     ) -> Reservation: ...
-    def commit(self, batch_id: str) -> int: ...
-    def release(self, batch_id: str, error: str | None = None) -> int: ...
-    def release_stale_reservations(self, max_age_minutes: int | None = None) -> int: ...
+    def renew(self, batch_id: str) -> int: ...
+    def commit(self, batch_id: str, profile: dict | None = None) -> int: ...
+    def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int: ...
+    def release_stale_reservations(
+        self, max_age_minutes: int | None = None, batch_size: int | None = None
+    ) -> int: ...
+    def archive(self, retention_days: int, batch_size: int = 1000) -> dict[str, int]: ...
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> Store: ...
+    def close(self) -> None: ...
+    def pool_stats(self) -> dict | None: ...
 
 
 def normalize_password(password: str) -> str | None:
@@ -114,6 +165,109 @@ def build_import_preview(
     return {"items": items, "summary": summary}
 
 
+def counts_from_rows(rows) -> dict[str, int]:
+    counts = {"available": 0, "reserved": 0, "used": 0, "total": 0}
+    for row in rows:
+        count = int(row["count"])
+        # Archived passwords stay part of the used history.
+        status = "used" if row["status"] == "archived" else row["status"]
+        counts[status] += count
+        counts["total"] += count
+    return counts
+
+
+def _profile_json(profile: dict | None) -> str | None:
+    """Render profiles are stored as JSON text (JSONB in PostgreSQL)."""
+    return None if profile is None else json.dumps(profile)
+
+
+def counter_drift(stored: dict[str, int], actual: dict[str, int]) -> dict[str, int]:
+    return {
+        status: actual[status] - stored[status]
+        for status in ("available", "reserved", "used")
+        if actual[status] != stored[status]
+    }
+
+
+def normalize_import(passwords: Iterable[str]) -> tuple[int, int, list[str]]:
+    """Return requested and invalid counts plus unique values in input order."""
+    requested = 0
+    invalid = 0
+    values: dict[str, None] = {}
+    for password in passwords:
+        requested += 1
+        normalized = normalize_password(password)
+        if normalized is None:
+            invalid += 1
+            continue
+        values.setdefault(normalized)
+    return requested, invalid, list(values)
+
+
+class SqliteConnections:
+    """One long-lived SQLite connection per thread.
+
+    Pragmas are applied once when a thread first touches the database.
+    Connections of threads that have exited are closed the next time a new
+    thread connects, so short-lived worker threads do not leak handles.
+    """
+
+    def __init__(
+        self,
+        database_path: Path,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 256 * 1024 * 1024,
+    ):
+        self.database_path = database_path
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._owners: dict[threading.Thread, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+
+    def open(self) -> sqlite3.Connection:
+        self.database_path.parent.mkdir(parents=True, exist_ok=True)
+        # Each connection stays on the thread that opened it; the flag only
+        # lets close() run from another thread.
+        connection = sqlite3.connect(
+            self.database_path, timeout=30, check_same_thread=False
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.execute("PRAGMA busy_timeout = 30000")
+        # WAL keeps commits durable across crashes with NORMAL; only a power
+        # loss may drop the last transactions.
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        return connection
+
+    def get(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        connection = self.open()
+        self._local.connection = connection
+        with self._lock:
+            for thread in [t for t in self._owners if not t.is_alive()]:
+                self._owners.pop(thread).close()
+            self._owners[threading.current_thread()] = connection
+        return connection
+
+    def __len__(self) -> int:
+        return len(self._owners)
+
+    def close(self) -> None:
+        with self._lock:
+            connections = list(self._owners.values())
+            self._owners.clear()
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+
 class PasswordStore:
     """SQLite storage for local standalone operation and offline recovery."""
 
@@ -123,32 +277,64 @@ class PasswordStore:
         hotel_id: str = "standalone",
         hotel_name: str = "Standalone hotel",
         reservation_ttl_minutes: int = 15,
+        cache_size_kib: int = 16384,
+        mmap_size: int = 256 * 1024 * 1024,
     ):
         self.database_path = Path(database_path)
         self.hotel_id = hotel_id
         self.hotel_name = hotel_name
         self.reservation_ttl_minutes = reservation_ttl_minutes
-
-    def _connect(self) -> sqlite3.Connection:
-        self.database_path.parent.mkdir(parents=True, exist_ok=True)
-        connection = sqlite3.connect(self.database_path, timeout=30)
-        connection.row_factory = sqlite3.Row
-        connection.execute("PRAGMA foreign_keys = ON")
-        connection.execute("PRAGMA journal_mode = WAL")
-        connection.execute("PRAGMA busy_timeout = 30000")
-        return connection
+        self._connections = SqliteConnections(
+            self.database_path, cache_size_kib=cache_size_kib, mmap_size=mmap_size
+        )
+        self._checkpoint_stop: threading.Event | None = None
+        self._checkpoint_thread: threading.Thread | None = None
+        self._search_index = False
+        # Stores made by for_hotel() share the owner's connections.
+        self._owner = self
+
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> PasswordStore:
+        """The same database scoped to another hotel, on shared connections."""
+        store = copy.copy(self)
+        store.hotel_id = hotel_id
+        store.hotel_name = hotel_name
+        return store
 
     @contextmanager
     def _connection(self) -> Iterator[sqlite3.Connection]:
-        connection = self._connect()
+        connection = self._connections.get()
         try:
             yield connection
             connection.commit()
         except Exception:
             connection.rollback()
             raise
-        finally:
-            connection.close()
+
+    def checkpoint(self) -> tuple[int, int, int]:
+        """Copy committed WAL pages into the database without blocking writers."""
+        row = self._connections.get().execute(
+            "PRAGMA wal_checkpoint(PASSIVE)"
+        ).fetchone()
+        return tuple(row)
+
+    def start_checkpoints(self, interval_seconds: float) -> None:
+        """Checkpoint from a background thread so requests never pay for it."""
+        if self._checkpoint_thread is not None or interval_seconds <= 0:
+            return
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(interval_seconds):
+                try:
+                    self.checkpoint()
+                except sqlite3.Error:
+                    pass
+
+        self._checkpoint_stop = stop
+        self._checkpoint_thread = threading.Thread(
+            target=run, name="sqlite-checkpoint", daemon=True
+        )
+        self._checkpoint_thread.start()
 
     def initialize(self) -> None:
         with self._connection() as connection:
@@ -158,7 +344,8 @@ class PasswordStore:
                     "PRAGMA table_info(passwords)"
                 ).fetchall()
             }
-            if columns and "hotel_id" not in columns:
+            migrated = bool(columns) and "hotel_id" not in columns
+            if migrated:
                 self._migrate_legacy_schema(connection)
 
             connection.executescript(
@@ -192,17 +379,101 @@ class PasswordStore:
                         CHECK (status IN ('reserved', 'completed', 'failed')),
                     error TEXT,
                     created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TEXT
+                    completed_at TEXT,
+                    -- RenderProfile.to_dict() as JSON: phases, batches, bytes.
+                    profile TEXT
+                );
+
+                -- Hot queries only touch available and reserved rows, so the
+                -- indexes skip the ever-growing used history.
+                DROP INDEX IF EXISTS idx_passwords_hotel_status_id;
+                DROP INDEX IF EXISTS idx_passwords_hotel_batch;
+                CREATE INDEX IF NOT EXISTS idx_passwords_available
+                    ON passwords(hotel_id, id) WHERE status = 'available';
+                CREATE INDEX IF NOT EXISTS idx_passwords_reserved_lease
+                    ON passwords(hotel_id, reserved_at) WHERE status = 'reserved';
+                CREATE INDEX IF NOT EXISTS idx_passwords_reserved_batch
+                    ON passwords(hotel_id, batch_id) WHERE status = 'reserved';
+                CREATE INDEX IF NOT EXISTS idx_passwords_used_at
+                    ON passwords(hotel_id, used_at) WHERE status = 'used';
+
+                -- Cold tier for used passwords and finished generations past
+                -- the retention window.
+                CREATE TABLE IF NOT EXISTS passwords_archive (
+                    id INTEGER PRIMARY KEY,
+                    hotel_id TEXT NOT NULL REFERENCES hotels(id),
+                    password TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    used_at TEXT,
+                    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE (hotel_id, password)
                 );
 
-                CREATE INDEX IF NOT EXISTS idx_passwords_hotel_status_id
-                    ON passwords(hotel_id, status, id);
-                CREATE INDEX IF NOT EXISTS idx_passwords_hotel_batch
-                    ON passwords(hotel_id, batch_id);
+                CREATE TABLE IF NOT EXISTS generations_archive (
+                    id TEXT PRIMARY KEY,
+                    hotel_id TEXT NOT NULL REFERENCES hotels(id),
+                    ru_count INTEGER NOT NULL DEFAULT 0,
+                    en_count INTEGER NOT NULL DEFAULT 0,
+                    total_count INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    profile TEXT,
+                    archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
                 CREATE INDEX IF NOT EXISTS idx_generations_hotel_created
                     ON generations(hotel_id, created_at DESC);
+                CREATE INDEX IF NOT EXISTS idx_generations_archive_hotel_created
+                    ON generations_archive(hotel_id, created_at DESC);
+
+                -- Exact per-status counts, kept by triggers inside the same
+                -- transaction as every status change.
+                CREATE TABLE IF NOT EXISTS password_counters (
+                    hotel_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (hotel_id, status)
+                );
+
+                CREATE TRIGGER IF NOT EXISTS trg_passwords_counters_insert
+                AFTER INSERT ON passwords
+                BEGIN
+                    INSERT INTO password_counters(hotel_id, status, count)
+                    VALUES (NEW.hotel_id, NEW.status, 1)
+                    ON CONFLICT(hotel_id, status) DO UPDATE SET count = count + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_passwords_counters_delete
+                AFTER DELETE ON passwords
+                BEGIN
+                    UPDATE password_counters SET count = count - 1
+                    WHERE hotel_id = OLD.hotel_id AND status = OLD.status;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_passwords_counters_update
+                AFTER UPDATE OF hotel_id, status ON passwords
+                WHEN OLD.hotel_id IS NOT NEW.hotel_id OR OLD.status IS NOT NEW.status
+                BEGIN
+                    UPDATE password_counters SET count = count - 1
+                    WHERE hotel_id = OLD.hotel_id AND status = OLD.status;
+                    INSERT INTO password_counters(hotel_id, status, count)
+                    VALUES (NEW.hotel_id, NEW.status, 1)
+                    ON CONFLICT(hotel_id, status) DO UPDATE SET count = count + 1;
+                END;
                 """
             )
+            for table in ("generations", "generations_archive"):
+                generation_columns = {
+                    row["name"]
+                    for row in connection.execute(
+                        f"PRAGMA table_info({table})"
+                    ).fetchall()
+                }
+                if "profile" not in generation_columns:
+                    connection.execute(
+                        f"ALTER TABLE {table} ADD COLUMN profile TEXT"
+                    )
             connection.execute(
                 """
                 INSERT INTO hotels(id, name)
@@ -211,8 +482,64 @@ class PasswordStore:
                 """,
                 (self.hotel_id, self.hotel_name),
             )
+            self._search_index = self._create_search_index(
+                connection, rebuild=migrated
+            )
+        self.reconcile_counters()
         self.release_stale_reservations()
 
+    def _create_search_index(
+        self, connection: sqlite3.Connection, rebuild: bool
+    ) -> bool:
+        """Trigram index for substring search; needs SQLite 3.34 or newer."""
+        exists = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'passwords_search'"
+        ).fetchone()
+        try:
+            connection.execute(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS passwords_search USING fts5(
+                    password,
+                    content = 'passwords',
+                    content_rowid = 'id',
+                    tokenize = 'trigram'
+                )
+                """
+            )
+        except sqlite3.OperationalError:
+            return False
+        connection.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_search_insert
+            AFTER INSERT ON passwords
+            BEGIN
+                INSERT INTO passwords_search(rowid, password)
+                VALUES (NEW.id, NEW.password);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_search_delete
+            AFTER DELETE ON passwords
+            BEGIN
+                INSERT INTO passwords_search(passwords_search, rowid, password)
+                VALUES ('delete', OLD.id, OLD.password);
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_passwords_search_update
+            AFTER UPDATE OF password ON passwords
+            BEGIN
+                INSERT INTO passwords_search(passwords_search, rowid, password)
+                VALUES ('delete', OLD.id, OLD.password);
+                INSERT INTO passwords_search(rowid, password)
+                VALUES (NEW.id, NEW.password);
+            END;
+            """
+        )
+        if rebuild or not exists:
+            connection.execute(
+                "INSERT INTO passwords_search(passwords_search) VALUES ('rebuild')"
+            )
+        return True
+
     def _migrate_legacy_schema(self, connection: sqlite3.Connection) -> None:
         connection.execute("PRAGMA foreign_keys = OFF")
         connection.executescript(
@@ -275,33 +602,36 @@ class PasswordStore:
                     SELECT password
                     FROM passwords
                     WHERE hotel_id = ? AND password IN ({placeholders})
+                    UNION
+                    SELECT password
+                    FROM passwords_archive
+                    WHERE hotel_id = ? AND password IN ({placeholders})
                     """,
-                    (self.hotel_id, *chunk),
+                    (self.hotel_id, *chunk, self.hotel_id, *chunk),
                 ).fetchall()
                 existing.update(row["password"] for row in rows)
         return build_import_preview(values, existing)
 
-    def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]:
-        requested = 0
-        invalid = 0
+    def _import_passwords(
+        self, connection: sqlite3.Connection, passwords: Iterable[str]
+    ) -> dict[str, int]:
+        requested, invalid, values = normalize_import(passwords)
         added = 0
-
-        with self._connection() as connection:
+        if values:
             connection.execute("BEGIN IMMEDIATE")
-            for password in passwords:
-                requested += 1
-                normalized = normalize_password(password)
-                if normalized is None:
-                    invalid += 1
-                    continue
-                cursor = connection.execute(
-                    """
-                    INSERT OR IGNORE INTO passwords(hotel_id, password, status)
-                    VALUES (?, ?, 'available')
-                    """,
-                    (self.hotel_id, normalized),
+            # Archived passwords were used once and must stay duplicates.
+            cursor = connection.executemany(
+                """
+                INSERT OR IGNORE INTO passwords(hotel_id, password, status)
+                SELECT ?1, ?2, 'available'
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM passwords_archive
+                    WHERE hotel_id = ?1 AND password = ?2
                 )
-                added += cursor.rowcount
+                """,
+                ((self.hotel_id, value) for value in values),
+            )
+            added = cursor.rowcount
 
         return {
             "requested": requested,
@@ -310,138 +640,314 @@ class PasswordStore:
             "invalid": invalid,
         }
 
+    def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]:
+        with self._connection() as connection:
+            return self._import_passwords(connection, passwords)
+
+    def import_passwords_with_stats(
+        self, passwords: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        return self._with_stats(self._import_passwords, passwords)
+
+    def _stats(self, connection: sqlite3.Connection) -> dict[str, int]:
+        rows = connection.execute(
+            """
+            SELECT status, count
+            FROM password_counters
+            WHERE hotel_id = ?
+            """,
+            (self.hotel_id,),
+        ).fetchall()
+        return counts_from_rows(rows)
+
     def stats(self) -> dict[str, int]:
-        counts = {"available": 0, "reserved": 0, "used": 0, "total": 0}
         with self._connection() as connection:
-            rows = connection.execute(
+            return self._stats(connection)
+
+    def _with_stats(
+        self, operation: Callable[..., T], *args
+    ) -> tuple[T, dict[str, int]]:
+        """Run ``operation(connection, *args)`` and read the counters it left
+        behind before the same transaction commits."""
+        with self._connection() as connection:
+            result = operation(connection, *args)
+            return result, self._stats(connection)
+
+    def reconcile_counters(self) -> dict[str, int]:
+        """Rebuild counters from the passwords table; return corrected drift."""
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            stored = counts_from_rows(
+                connection.execute(
+                    "SELECT status, count FROM password_counters WHERE hotel_id = ?",
+                    (self.hotel_id,),
+                ).fetchall()
+            )
+            connection.execute(
+                "DELETE FROM password_counters WHERE hotel_id = ?",
+                (self.hotel_id,),
+            )
+            connection.execute(
                 """
-                SELECT status, COUNT(*) AS count
+                INSERT INTO password_counters(hotel_id, status, count)
+                SELECT hotel_id, status, COUNT(*)
                 FROM passwords
                 WHERE hotel_id = ?
-                GROUP BY status
+                GROUP BY hotel_id, status
+                UNION ALL
+                SELECT ?, 'archived', COUNT(*)
+                FROM passwords_archive
+                WHERE hotel_id = ?
                 """,
-                (self.hotel_id,),
-            ).fetchall()
-        for row in rows:
-            counts[row["status"]] = row["count"]
-            counts["total"] += row["count"]
-        return counts
+                (self.hotel_id, self.hotel_id, self.hotel_id),
+            )
+            actual = counts_from_rows(
+                connection.execute(
+                    "SELECT status, count FROM password_counters WHERE hotel_id = ?",
+                    (self.hotel_id,),
+                ).fetchall()
+            )
+        return counter_drift(stored, actual)
+
+    def _list_available(
+        self,
+        connection: sqlite3.Connection,
+        limit: int,
+        offset: int,
+        search: str,
+        after_id: int | None,
+    ) -> list[dict]:
+        conditions = ["hotel_id = ?", "status = 'available'", "id > ?"]
+        params: list = [self.hotel_id, after_id or 0]
+        term = search.strip()
+        if term:
+            # Trigram lookups need at least three characters.
+            if self._search_index and len(term) >= 3:
+                conditions.append(
+                    "id IN (SELECT rowid FROM passwords_search WHERE password LIKE ?)"
+                )
+            else:
+                conditions.append("password LIKE ?")
+            params.append(f"%{term}%")
+        rows = connection.execute(
+            f"""
+            SELECT id, password, created_at
+            FROM passwords
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id
+            LIMIT ? OFFSET ?
+            """,
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(row) for row in rows]
 
     def list_available(
-        self, limit: int = 200, offset: int = 0, search: str = ""
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
     ) -> list[dict]:
-        search_value = f"%{search.strip()}%"
+        """Available passwords by id; pass the last id as ``after_id`` to page."""
         with self._connection() as connection:
-            rows = connection.execute(
-                """
-                SELECT id, password, created_at
-                FROM passwords
-                WHERE hotel_id = ?
-                  AND status = 'available'
-                  AND password LIKE ?
-                ORDER BY id
-                LIMIT ? OFFSET ?
-                """,
-                (self.hotel_id, search_value, limit, offset),
-            ).fetchall()
-        return [dict(row) for row in rows]
+            return self._list_available(connection, limit, offset, search, after_id)
+
+    def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]:
+        with self._connection() as connection:
+            # One read transaction, so the page and the counters agree.
+            connection.execute("BEGIN")
+            items = self._list_available(connection, limit, offset, search, after_id)
+            return items, self._stats(connection)
+
+    @staticmethod
+    def _generation_row(row: sqlite3.Row) -> dict:
+        generation = dict(row)
+        if generation["profile"] is not None:
+            generation["profile"] = json.loads(generation["profile"])
+        return generation
 
     def list_generations(self, limit: int = 50) -> list[dict]:
         with self._connection() as connection:
+            # Archived generations stay in the history, after the live ones.
             rows = connection.execute(
                 """
-                SELECT id, ru_count, en_count, total_count, status,
-                       error, created_at, completed_at
-                FROM generations
-                WHERE hotel_id = ?
+                SELECT * FROM (
+                    SELECT id, ru_count, en_count, total_count, status,
+                           error, created_at, completed_at, profile
+                    FROM generations
+                    WHERE hotel_id = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT id, ru_count, en_count, total_count, status,
+                           error, created_at, completed_at, profile
+                    FROM generations_archive
+                    WHERE hotel_id = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                )
                 ORDER BY created_at DESC
                 LIMIT ?
                 """,
-                (self.hotel_id, limit),
+                (self.hotel_id, limit, self.hotel_id, limit, limit),
             ).fetchall()
-        return [dict(row) for row in rows]
+        return [self._generation_row(row) for row in rows]
 
-    def delete_available(self, password_id: int) -> bool:
+    def get_generation(self, batch_id: str) -> dict | None:
         with self._connection() as connection:
-            cursor = connection.execute(
+            row = connection.execute(
                 """
-                DELETE FROM passwords
-                WHERE id = ? AND hotel_id = ? AND status = 'available'
+                SELECT id, ru_count, en_count, total_count, status,
+                       error, created_at, completed_at, profile
+                FROM generations
+                WHERE id = ? AND hotel_id = ?
+                UNION ALL
+                SELECT id, ru_count, en_count, total_count, status,
+                       error, created_at, completed_at, profile
+                FROM generations_archive
+                WHERE id = ? AND hotel_id = ?
                 """,
-                (password_id, self.hotel_id),
-            )
+                (batch_id, self.hotel_id, batch_id, self.hotel_id),
+            ).fetchone()
+        return self._generation_row(row) if row else None
+
+    def _delete_available(
+        self, connection: sqlite3.Connection, password_id: int
+    ) -> bool:
+        cursor = connection.execute(
+            """
+            DELETE FROM passwords
+            WHERE id = ? AND hotel_id = ? AND status = 'available'
+            """,
+            (password_id, self.hotel_id),
+        )
         return cursor.rowcount == 1
 
-    def update_available(self, password_id: int, password: str) -> bool:
+    def delete_available(self, password_id: int) -> bool:
+        with self._connection() as connection:
+            return self._delete_available(connection, password_id)
+
+    def delete_available_with_stats(
+        self, password_id: int
+    ) -> tuple[bool, dict[str, int]]:
+        return self._with_stats(self._delete_available, password_id)
+
+    def _update_available(
+        self, connection: sqlite3.Connection, password_id: int, password: str
+    ) -> bool:
         normalized = normalize_password(password)
         if normalized is None:
             raise ValueError("Некорректный пароль")
+        connection.execute("BEGIN IMMEDIATE")
+        archived = connection.execute(
+            """
+            SELECT 1 FROM passwords_archive
+            WHERE hotel_id = ? AND password = ?
+            """,
+            (self.hotel_id, normalized),
+        ).fetchone()
+        if archived:
+            raise PasswordConflict("Такой пароль уже есть в базе")
         try:
-            with self._connection() as connection:
-                cursor = connection.execute(
-                    """
-                    UPDATE passwords
-                    SET password = ?
-                    WHERE id = ? AND hotel_id = ? AND status = 'available'
-                    """,
-                    (normalized, password_id, self.hotel_id),
-                )
+            cursor = connection.execute(
+                """
+                UPDATE passwords
+                SET password = ?
+                WHERE id = ? AND hotel_id = ? AND status = 'available'
+                """,
+                (normalized, password_id, self.hotel_id),
+            )
         except sqlite3.IntegrityError as error:
             raise PasswordConflict("Такой пароль уже есть в базе") from error
         return cursor.rowcount == 1
 
-    def delete_available_many(self, password_ids: Iterable[int]) -> int:
+    def update_available(self, password_id: int, password: str) -> bool:
+        with self._connection() as connection:
+            return self._update_available(connection, password_id, password)
+
+    def update_available_with_stats(
+        self, password_id: int, password: str
+    ) -> tuple[bool, dict[str, int]]:
+        return self._with_stats(self._update_available, password_id, password)
+
+    def _delete_available_many(
+        self, connection: sqlite3.Connection, password_ids: Iterable[int]
+    ) -> int:
         ids = sorted(set(int(item) for item in password_ids))
         if not ids:
             return 0
         placeholders = ",".join("?" for _ in ids)
-        with self._connection() as connection:
-            cursor = connection.execute(
-                f"""
-                DELETE FROM passwords
-                WHERE hotel_id = ?
-                  AND status = 'available'
-                  AND id IN ({placeholders})
-                """,
-                (self.hotel_id, *ids),
-            )
+        cursor = connection.execute(
+            f"""
+            DELETE FROM passwords
+            WHERE hotel_id = ?
+              AND status = 'available'
+              AND id IN ({placeholders})
+            """,
+            (self.hotel_id, *ids),
+        )
         return cursor.rowcount
 
-    def issue_available(self, password_ids: Iterable[int]) -> list[str]:
+    def delete_available_many(self, password_ids: Iterable[int]) -> int:
+        with self._connection() as connection:
+            return self._delete_available_many(connection, password_ids)
+
+    def delete_available_many_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[int, dict[str, int]]:
+        return self._with_stats(self._delete_available_many, password_ids)
+
+    def _issue_available(
+        self, connection: sqlite3.Connection, password_ids: Iterable[int]
+    ) -> list[str]:
         ids = sorted(set(int(item) for item in password_ids))
         if not ids:
             return []
         placeholders = ",".join("?" for _ in ids)
-        with self._connection() as connection:
-            connection.execute("BEGIN IMMEDIATE")
-            rows = connection.execute(
-                f"""
-                SELECT id, password
-                FROM passwords
-                WHERE hotel_id = ?
-                  AND status = 'available'
-                  AND id IN ({placeholders})
-                ORDER BY id
-                """,
-                (self.hotel_id, *ids),
-            ).fetchall()
-            if len(rows) != len(ids):
-                raise PasswordsUnavailable(
-                    "Один или несколько паролей уже недоступны"
-                )
-            connection.execute(
-                f"""
-                UPDATE passwords
-                SET status = 'used',
-                    used_at = CURRENT_TIMESTAMP,
-                    reserved_at = NULL,
-                    batch_id = NULL
-                WHERE hotel_id = ? AND id IN ({placeholders})
-                """,
-                (self.hotel_id, *ids),
-            )
+        connection.execute("BEGIN IMMEDIATE")
+        rows = connection.execute(
+            f"""
+            SELECT id, password
+            FROM passwords
+            WHERE hotel_id = ?
+              AND status = 'available'
+              AND id IN ({placeholders})
+            ORDER BY id
+            """,
+            (self.hotel_id, *ids),
+        ).fetchall()
+        if len(rows) != len(ids):
+            raise PasswordsUnavailable("Один или несколько паролей уже недоступны")
+        connection.execute(
+            f"""
+            UPDATE passwords
+            SET status = 'used',
+                used_at = CURRENT_TIMESTAMP,
+                reserved_at = NULL,
+                batch_id = NULL
+            WHERE hotel_id = ? AND id IN ({placeholders})
+            """,
+            (self.hotel_id, *ids),
+        )
         return [row["password"] for row in rows]
 
+    def issue_available(self, password_ids: Iterable[int]) -> list[str]:
+        with self._connection() as connection:
+            return self._issue_available(connection, password_ids)
+
+    def issue_available_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[list[str], dict[str, int]]:
+        return self._with_stats(self._issue_available, password_ids)
+
     def reserve(
         self, count: int, ru_count: int = 0, en_count: int = 0
     ) -> Reservation:
@@ -451,9 +957,6 @@ class PasswordStore:
         batch_id = uuid.uuid4().hex
         with self._connection() as connection:
             connection.execute("BEGIN IMMEDIATE")
-            self._release_stale_in_connection(
-                connection, self.reservation_ttl_minutes
-            )
             rows = connection.execute(
                 """
                 SELECT id, password
@@ -494,9 +997,23 @@ class PasswordStore:
         return Reservation(
             batch_id=batch_id,
             passwords=tuple(row["password"] for row in rows),
+            ids=tuple(row["id"] for row in rows),
         )
 
-    def commit(self, batch_id: str) -> int:
+    def renew(self, batch_id: str) -> int:
+        """Extend the lease of a reservation that is still being rendered."""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                """
+                UPDATE passwords
+                SET reserved_at = CURRENT_TIMESTAMP
+                WHERE hotel_id = ? AND status = 'reserved' AND batch_id = ?
+                """,
+                (self.hotel_id, batch_id),
+            )
+        return cursor.rowcount
+
+    def commit(self, batch_id: str, profile: dict | None = None) -> int:
         with self._connection() as connection:
             cursor = connection.execute(
                 """
@@ -512,14 +1029,18 @@ class PasswordStore:
             connection.execute(
                 """
                 UPDATE generations
-                SET status = 'completed', completed_at = CURRENT_TIMESTAMP
+                SET status = 'completed',
+                    completed_at = CURRENT_TIMESTAMP,
+                    profile = ?
                 WHERE id = ? AND hotel_id = ? AND status = 'reserved'
                 """,
-                (batch_id, self.hotel_id),
+                (_profile_json(profile), batch_id, self.hotel_id),
             )
         return cursor.rowcount
 
-    def release(self, batch_id: str, error: str | None = None) -> int:
+    def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int:
         with self._connection() as connection:
             cursor = connection.execute(
                 """
@@ -536,15 +1057,19 @@ class PasswordStore:
                 UPDATE generations
                 SET status = 'failed',
                     error = ?,
-                    completed_at = CURRENT_TIMESTAMP
+                    completed_at = CURRENT_TIMESTAMP,
+                    profile = ?
                 WHERE id = ? AND hotel_id = ? AND status = 'reserved'
                 """,
-                (error, batch_id, self.hotel_id),
+                (error, _profile_json(profile), batch_id, self.hotel_id),
             )
         return cursor.rowcount
 
     def _release_stale_in_connection(
-        self, connection: sqlite3.Connection, max_age_minutes: int
+        self,
+        connection: sqlite3.Connection,
+        max_age_minutes: int,
+        limit: int = -1,
     ) -> int:
         stale = connection.execute(
             """
@@ -554,8 +1079,9 @@ class PasswordStore:
               AND status = 'reserved'
               AND reserved_at < datetime('now', ?)
               AND batch_id IS NOT NULL
+            LIMIT ?
             """,
-            (self.hotel_id, f"-{max_age_minutes} minutes"),
+            (self.hotel_id, f"-{max_age_minutes} minutes", limit),
         ).fetchall()
         batch_ids = [row["batch_id"] for row in stale]
         if not batch_ids:
@@ -565,7 +1091,8 @@ class PasswordStore:
             f"""
             UPDATE passwords
             SET status = 'available', reserved_at = NULL, batch_id = NULL
-            WHERE hotel_id = ? AND batch_id IN ({placeholders})
+            WHERE hotel_id = ? AND status = 'reserved'
+              AND batch_id IN ({placeholders})
             """,
             (self.hotel_id, *batch_ids),
         )
@@ -581,10 +1108,128 @@ class PasswordStore:
         )
         return cursor.rowcount
 
-    def release_stale_reservations(self, max_age_minutes: int | None = None) -> int:
+    def release_stale_reservations(
+        self, max_age_minutes: int | None = None, batch_size: int | None = None
+    ) -> int:
+        """Release expired leases, ``batch_size`` reservations per transaction."""
         max_age = max_age_minutes or self.reservation_ttl_minutes
-        with self._connection() as connection:
-            return self._release_stale_in_connection(connection, max_age)
+        released = 0
+        while True:
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                count = self._release_stale_in_connection(
+                    connection, max_age, batch_size or -1
+                )
+            released += count
+            if not count or batch_size is None:
+                return released
+
+    def archive(self, retention_days: int, batch_size: int = 1000) -> dict[str, int]:
+        """Move used passwords and finished generations older than the window.
+
+        Every batch is its own short transaction, so reservations and imports
+        wait for one batch at most.
+        """
+        cutoff = f"-{int(retention_days)} days"
+        moved = {"passwords": 0, "generations": 0}
+        while True:
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                ids = [
+                    row["id"]
+                    for row in connection.execute(
+                        """
+                        SELECT id FROM passwords
+                        WHERE hotel_id = ? AND status = 'used'
+                          AND used_at < datetime('now', ?)
+                        ORDER BY used_at
+                        LIMIT ?
+                        """,
+                        (self.hotel_id, cutoff, batch_size),
+                    ).fetchall()
+                ]
+                if ids:
+                    placeholders = ",".join("?" for _ in ids)
+                    connection.execute(
+                        f"""
+                        INSERT INTO passwords_archive(
+                            id, hotel_id, password, created_at, used_at
+                        )
+                        SELECT id, hotel_id, password, created_at, used_at
+                        FROM passwords
+                        WHERE id IN ({placeholders})
+                        """,
+                        ids,
+                    )
+                    connection.execute(
+                        f"DELETE FROM passwords WHERE id IN ({placeholders})", ids
+                    )
+                    connection.execute(
+                        """
+                        INSERT INTO password_counters(hotel_id, status, count)
+                        VALUES (?, 'archived', ?)
+                        ON CONFLICT(hotel_id, status)
+                        DO UPDATE SET count = count + excluded.count
+                        """,
+                        (self.hotel_id, len(ids)),
+                    )
+            if not ids:
+                break
+            moved["passwords"] += len(ids)
+
+        while True:
+            with self._connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                ids = [
+                    row["id"]
+                    for row in connection.execute(
+                        """
+                        SELECT id FROM generations
+                        WHERE hotel_id = ? AND status <> 'reserved'
+                          AND created_at < datetime('now', ?)
+                        ORDER BY created_at
+                        LIMIT ?
+                        """,
+                        (self.hotel_id, cutoff, batch_size),
+                    ).fetchall()
+                ]
+                if ids:
+                    placeholders = ",".join("?" for _ in ids)
+                    connection.execute(
+                        f"""
+                        INSERT INTO generations_archive(
+                            id, hotel_id, ru_count, en_count, total_count,
+                            status, error, created_at, completed_at, profile
+                        )
+                        SELECT id, hotel_id, ru_count, en_count, total_count,
+                               status, error, created_at, completed_at, profile
+                        FROM generations
+                        WHERE id IN ({placeholders})
+                        """,
+                        ids,
+                    )
+                    connection.execute(
+                        f"DELETE FROM generations WHERE id IN ({placeholders})", ids
+                    )
+            if not ids:
+                break
+            moved["generations"] += len(ids)
+        return moved
+
+    def close(self) -> None:
+        if self._owner is not self:
+            return
+        if self._checkpoint_thread is not None:
+            self._checkpoint_stop.set()
+            self._checkpoint_thread.join()
+            self._checkpoint_thread = None
+        self._connections.close()
+
+    def pool_stats(self) -> dict | None:
+        return {
+            "connections": len(self._connections),
+            "checkpoints": self._checkpoint_thread is not None,
+        }
 
     def release_all_reservations(self) -> int:
         """Administrative compatibility helper; normal recovery uses leases."""
@@ -611,33 +1256,202 @@ class PostgresPasswordStore:
         hotel_id: str,
         hotel_name: str,
         reservation_ttl_minutes: int = 15,
+        pool_min_size: int = 1,
+        pool_max_size: int = 10,
+        pool_max_idle_seconds: float = 300,
+        pool_timeout_seconds: float = 30,
     ):
         self.database_url = database_url
         self.hotel_id = hotel_id
         self.hotel_name = hotel_name
         self.reservation_ttl_minutes = reservation_ttl_minutes
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_max_idle_seconds = pool_max_idle_seconds
+        self.pool_timeout_seconds = pool_timeout_seconds
+        # (min, max) of the blocking pool; split_pool() hands part of the
+        # budget to an async pool.
+        self.pool_bounds = (pool_min_size, pool_max_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Stores made by for_hotel() borrow connections from the owner's pool.
+        self._owner = self
+
+    def for_hotel(self, hotel_id: str, hotel_name: str) -> PostgresPasswordStore:
+        """The same database scoped to another hotel, on the shared pool."""
+        store = copy.copy(self)
+        store.hotel_id = hotel_id
+        store.hotel_name = hotel_name
+        return store
+
+    def split_pool(self) -> tuple[int, int]:
+        """Share ``pool_max_size`` with an async pool; return its (min, max).
+
+        The async pool carries the request traffic and gets the larger half,
+        so both pools together stay within the configured budget (each keeps
+        at least one connection).
+        """
+        sync_max = max(1, self.pool_max_size // 2)
+        async_max = max(1, self.pool_max_size - sync_max)
+        self.pool_bounds = (min(self.pool_min_size, sync_max), sync_max)
+        if self._pool is not None:
+            self._pool.resize(*self.pool_bounds)
+        return min(self.pool_min_size, async_max), async_max
+
+    def _get_pool(self):
+        """Open the pool on first use, so forked workers get their own."""
+        if self._owner is not self:
+            return self._owner._get_pool()
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    from psycopg.rows import dict_row
+                    from psycopg_pool import ConnectionPool
+
+                    min_size, max_size = self.pool_bounds
+                    self._pool = ConnectionPool(
+                        self.database_url,
+                        min_size=min_size,
+                        max_size=max_size,
+                        max_idle=self.pool_max_idle_seconds,
+                        timeout=self.pool_timeout_seconds,
+                        # Dropped pooler connections are replaced on checkout
+                        # instead of failing the request.
+                        check=ConnectionPool.check_connection,
+                        kwargs={
+                            "row_factory": dict_row,
+                            "connect_timeout": 15,
+                            "application_name": "wifi-voucher",
+                        },
+                        name="wifi-voucher",
+                        open=True,
+                    )
+        return self._pool
 
     @contextmanager
     def _connection(self):
-        import psycopg
-        from psycopg.rows import dict_row
+        # The pool commits on success and rolls back on error.
+        with self._get_pool().connection() as connection:
+            yield connection
 
-        connection = psycopg.connect(
-            self.database_url,
-            row_factory=dict_row,
-            connect_timeout=15,
-            application_name="wifi-voucher",
+    def _lock_archive(self, connection) -> None:
+        # Serializes archive batches with writers that check the archive for
+        # duplicates; held until the transaction ends.
+        connection.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))",
+            (f"{self.schema}.passwords_archive:{self.hotel_id}",),
         )
-        try:
-            yield connection
-            connection.commit()
-        except Exception:
-            connection.rollback()
-            raise
-        finally:
-            connection.close()
+
+    def archive(self, retention_days: int, batch_size: int = 1000) -> dict[str, int]:
+        """Move used passwords and finished generations older than the window.
+
+        Every batch is its own short transaction, so reservations and imports
+        wait for one batch at most.
+        """
+        cutoff = timedelta(days=retention_days)
+        moved = {"passwords": 0, "generations": 0}
+        while True:
+            with self._connection() as connection:
+                self._lock_archive(connection)
+                cursor = connection.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {self.schema}.passwords
+                        WHERE id IN (
+                            SELECT id FROM {self.schema}.passwords
+                            WHERE hotel_id = %s AND status = 'used'
+                              AND used_at < now() - %s
+                            ORDER BY used_at
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING id, hotel_id, password, created_at, used_at
+                    )
+                    INSERT INTO {self.schema}.passwords_archive(
+                        id, hotel_id, password, created_at, used_at
+                    )
+                    SELECT id, hotel_id, password, created_at, used_at FROM moved
+                    """,
+                    (self.hotel_id, cutoff, batch_size),
+                )
+                count = cursor.rowcount
+                if count:
+                    connection.execute(
+                        f"""
+                        INSERT INTO {self.schema}.password_counters(
+                            hotel_id, status, count
+                        )
+                        VALUES (%s, 'archived', %s)
+                        ON CONFLICT(hotel_id, status) DO UPDATE
+                        SET count = {self.schema}.password_counters.count
+                            + excluded.count
+                        """,
+                        (self.hotel_id, count),
+                    )
+            if not count:
+                break
+            moved["passwords"] += count
+
+        while True:
+            with self._connection() as connection:
+                cursor = connection.execute(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM {self.schema}.generations
+                        WHERE id IN (
+                            SELECT id FROM {self.schema}.generations
+                            WHERE hotel_id = %s AND status <> 'reserved'
+                              AND created_at < now() - %s
+                            ORDER BY created_at
+                            LIMIT %s
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        RETURNING id, hotel_id, ru_count, en_count, total_count,
+                                  status, error, created_at, completed_at,
+                                  profile
+                    )
+                    INSERT INTO {self.schema}.generations_archive(
+                        id, hotel_id, ru_count, en_count, total_count,
+                        status, error, created_at, completed_at, profile
+                    )
+                    SELECT id, hotel_id, ru_count, en_count, total_count,
+                           status, error, created_at, completed_at, profile
+                    FROM moved
+                    """,
+                    (self.hotel_id, cutoff, batch_size),
+                )
+                count = cursor.rowcount
+            if not count:
+                break
+            moved["generations"] += count
+        return moved
+
+    def close(self) -> None:
+        if self._owner is not self:
+            return
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+    def pool_stats(self) -> dict | None:
+        if self._owner is not self:
+            return self._owner.pool_stats()
+        if self._pool is None:
+            return None
+        stats = self._pool.get_stats()
+        return {
+            "size": stats.get("pool_size", 0),
+            "available": stats.get("pool_available", 0),
+            "waiting": stats.get("requests_waiting", 0),
+            "min_size": self.pool_bounds[0],
+            "max_size": self.pool_bounds[1],
+            "connections_lost": stats.get("connections_lost", 0),
+        }
 
     def initialize(self) -> None:
+        import psycopg
+
         with self._connection() as connection:
             connection.execute(f"CREATE SCHEMA IF NOT EXISTS {self.schema}")
             connection.execute(
@@ -679,28 +1493,169 @@ class PostgresPasswordStore:
                         CHECK (status IN ('reserved', 'completed', 'failed')),
                     error TEXT,
                     created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-                    completed_at TIMESTAMPTZ
+                    completed_at TIMESTAMPTZ,
+                    profile JSONB
                 )
                 """
             )
             connection.execute(
                 f"""
-                CREATE INDEX IF NOT EXISTS idx_passwords_hotel_status_id
-                ON {self.schema}.passwords(hotel_id, status, id)
+                ALTER TABLE {self.schema}.generations
+                ADD COLUMN IF NOT EXISTS profile JSONB
+                """
+            )
+            # Hot queries only touch available and reserved rows, so the
+            # indexes skip the ever-growing used history.
+            for index in ("idx_passwords_hotel_status_id", "idx_passwords_hotel_batch"):
+                connection.execute(f"DROP INDEX IF EXISTS {self.schema}.{index}")
+            for index, columns, status_name in (
+                ("idx_passwords_available", "hotel_id, id", "available"),
+                ("idx_passwords_reserved_lease", "hotel_id, reserved_at", "reserved"),
+                ("idx_passwords_reserved_batch", "hotel_id, batch_id", "reserved"),
+            ):
+                connection.execute(
+                    f"""
+                    CREATE INDEX IF NOT EXISTS {index}
+                    ON {self.schema}.passwords({columns})
+                    WHERE status = '{status_name}'
+                    """
+                )
+            # ILIKE '%term%' search over available passwords. Without the
+            # extension (no privilege) search falls back to a filtered scan.
+            try:
+                with connection.transaction():
+                    connection.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                    connection.execute(
+                        f"""
+                        CREATE INDEX IF NOT EXISTS idx_passwords_available_trgm
+                        ON {self.schema}.passwords
+                        USING gin (password gin_trgm_ops)
+                        WHERE status = 'available'
+                        """
+                    )
+            except psycopg.Error:
+                pass
+            connection.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS idx_generations_hotel_created
+                ON {self.schema}.generations(hotel_id, created_at DESC)
                 """
             )
             connection.execute(
                 f"""
-                CREATE INDEX IF NOT EXISTS idx_passwords_hotel_batch
-                ON {self.schema}.passwords(hotel_id, batch_id)
+                CREATE INDEX IF NOT EXISTS idx_passwords_used_at
+                ON {self.schema}.passwords(hotel_id, used_at)
+                WHERE status = 'used'
                 """
             )
+            # Cold tier for used passwords and finished generations past the
+            # retention window.
             connection.execute(
                 f"""
-                CREATE INDEX IF NOT EXISTS idx_generations_hotel_created
-                ON {self.schema}.generations(hotel_id, created_at DESC)
+                CREATE TABLE IF NOT EXISTS {self.schema}.passwords_archive (
+                    id BIGINT PRIMARY KEY,
+                    hotel_id TEXT NOT NULL
+                        REFERENCES {self.schema}.hotels(id),
+                    password TEXT NOT NULL,
+                    created_at TIMESTAMPTZ NOT NULL,
+                    used_at TIMESTAMPTZ,
+                    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    UNIQUE (hotel_id, password)
+                )
                 """
             )
+            connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.schema}.generations_archive (
+                    id UUID PRIMARY KEY,
+                    hotel_id TEXT NOT NULL
+                        REFERENCES {self.schema}.hotels(id),
+                    ru_count INTEGER NOT NULL DEFAULT 0,
+                    en_count INTEGER NOT NULL DEFAULT 0,
+                    total_count INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error TEXT,
+                    created_at TIMESTAMPTZ NOT NULL,
+                    completed_at TIMESTAMPTZ,
+                    profile JSONB,
+                    archived_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+            connection.execute(
+                f"""
+                ALTER TABLE {self.schema}.generations_archive
+                ADD COLUMN IF NOT EXISTS profile JSONB
+                """
+            )
+            connection.execute(
+                f"""
+                CREATE INDEX IF NOT EXISTS idx_generations_archive_hotel_created
+                ON {self.schema}.generations_archive(hotel_id, created_at DESC)
+                """
+            )
+            connection.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS {self.schema}.password_counters (
+                    hotel_id text NOT NULL,
+                    status text NOT NULL,
+                    count bigint NOT NULL DEFAULT 0,
+                    PRIMARY KEY (hotel_id, status)
+                )
+                """
+            )
+            # Statement-level triggers apply one grouped delta per statement,
+            # so reserving 500 passwords touches each counter row once.
+            connection.execute(
+                f"""
+                CREATE OR REPLACE FUNCTION {self.schema}.count_password_rows()
+                RETURNS trigger LANGUAGE plpgsql AS $$
+                BEGIN
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        UPDATE {self.schema}.password_counters AS counters
+                        SET count = counters.count - changed.count
+                        FROM (
+                            SELECT hotel_id, status, COUNT(*) AS count
+                            FROM old_rows
+                            GROUP BY hotel_id, status
+                        ) AS changed
+                        WHERE counters.hotel_id = changed.hotel_id
+                          AND counters.status = changed.status;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+                        INSERT INTO {self.schema}.password_counters(
+                            hotel_id, status, count
+                        )
+                        SELECT hotel_id, status, COUNT(*)
+                        FROM new_rows
+                        GROUP BY hotel_id, status
+                        ON CONFLICT(hotel_id, status) DO UPDATE
+                        SET count = {self.schema}.password_counters.count
+                            + excluded.count;
+                    END IF;
+                    RETURN NULL;
+                END
+                $$
+                """
+            )
+            for event, transition in (
+                ("INSERT", "NEW TABLE AS new_rows"),
+                ("DELETE", "OLD TABLE AS old_rows"),
+                ("UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+            ):
+                trigger = f"passwords_counters_{event.lower()}"
+                connection.execute(
+                    f"DROP TRIGGER IF EXISTS {trigger} ON {self.schema}.passwords"
+                )
+                connection.execute(
+                    f"""
+                    CREATE TRIGGER {trigger}
+                    AFTER {event} ON {self.schema}.passwords
+                    REFERENCING {transition}
+                    FOR EACH STATEMENT
+                    EXECUTE FUNCTION {self.schema}.count_password_rows()
+                    """
+                )
             connection.execute(
                 f"""
                 INSERT INTO {self.schema}.hotels(id, name)
@@ -709,6 +1664,7 @@ class PostgresPasswordStore:
                 """,
                 (self.hotel_id, self.hotel_name),
             )
+        self.reconcile_counters()
         self.release_stale_reservations()
 
     def health(self) -> bool:
@@ -732,104 +1688,329 @@ class PostgresPasswordStore:
                     SELECT password
                     FROM {self.schema}.passwords
                     WHERE hotel_id = %s AND password = ANY(%s)
+                    UNION
+                    SELECT password
+                    FROM {self.schema}.passwords_archive
+                    WHERE hotel_id = %s AND password = ANY(%s)
                     """,
-                    (self.hotel_id, candidates),
+                    (self.hotel_id, candidates, self.hotel_id, candidates),
                 ).fetchall()
                 existing.update(row["password"] for row in rows)
         return build_import_preview(values, existing)
 
-    def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]:
-        requested = 0
-        invalid = 0
+    def _import_passwords(
+        self, passwords: Iterable[str], counters: bool = False
+    ) -> tuple[dict[str, int], dict[str, int] | None]:
+        requested, invalid, values = normalize_import(passwords)
         added = 0
+        stats = None
         with self._connection() as connection:
-            for password in passwords:
-                requested += 1
-                normalized = normalize_password(password)
-                if normalized is None:
-                    invalid += 1
-                    continue
-                cursor = connection.execute(
+            if values:
+                self._lock_archive(connection)
+                # One COPY and one INSERT instead of a round-trip per value;
+                # the position keeps ids in paste order.
+                connection.execute(
+                    """
+                    CREATE TEMP TABLE password_import (
+                        position integer NOT NULL,
+                        password text NOT NULL
+                    ) ON COMMIT DROP
+                    """
+                )
+                with connection.cursor().copy(
+                    "COPY password_import (position, password) FROM STDIN"
+                ) as copy:
+                    for position, value in enumerate(values):
+                        copy.write_row((position, value))
+                added, stats = self._execute_counted(
+                    connection,
                     f"""
-                    INSERT INTO {self.schema}.passwords(
-                        hotel_id, password, status
+                    INSERT INTO {self.schema}.passwords(hotel_id, password, status)
+                    SELECT %s, password, 'available'
+                    FROM password_import
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM {self.schema}.passwords_archive AS archived
+                        WHERE archived.hotel_id = %s
+                          AND archived.password = password_import.password
                     )
-                    VALUES (%s, %s, 'available')
+                    ORDER BY position
                     ON CONFLICT(hotel_id, password) DO NOTHING
                     """,
-                    (self.hotel_id, normalized),
+                    (self.hotel_id, self.hotel_id),
+                    counters,
+                    target="available",
                 )
-                added += cursor.rowcount
-        return {
+            elif counters:
+                stats = self._stats(connection)
+        result = {
             "requested": requested,
             "added": added,
             "duplicates": requested - invalid - added,
             "invalid": invalid,
         }
+        return result, stats
+
+    def import_passwords(self, passwords: Iterable[str]) -> dict[str, int]:
+        return self._import_passwords(passwords)[0]
+
+    def import_passwords_with_stats(
+        self, passwords: Iterable[str]
+    ) -> tuple[dict[str, int], dict[str, int]]:
+        return self._import_passwords(passwords, counters=True)
+
+    def _stats_query(self) -> tuple[str, tuple]:
+        return (
+            f"""
+            SELECT status, count
+            FROM {self.schema}.password_counters
+            WHERE hotel_id = %s
+            """,
+            (self.hotel_id,),
+        )
 
     def stats(self) -> dict[str, int]:
-        counts = {"available": 0, "reserved": 0, "used": 0, "total": 0}
         with self._connection() as connection:
-            rows = connection.execute(
-                f"""
-                SELECT status, COUNT(*) AS count
-                FROM {self.schema}.passwords
-                WHERE hotel_id = %s
-                GROUP BY status
-                """,
+            return self._stats(connection)
+
+    def _stats(self, connection) -> dict[str, int]:
+        return counts_from_rows(connection.execute(*self._stats_query()).fetchall())
+
+    def _execute_counted(
+        self,
+        connection,
+        statement: str,
+        params: tuple,
+        counters: bool,
+        source: str | None = None,
+        target: str | None = None,
+    ) -> tuple[int, dict[str, int] | None]:
+        """Run one data-modifying statement and return the rows it changed.
+
+        With ``counters`` the same round trip also reads password_counters.
+        The statement triggers update them only after the statement, so the
+        move of the changed rows from ``source`` to ``target`` status is
+        applied here to report the counters this transaction commits.
+        """
+        if not counters:
+            return connection.execute(statement, params).rowcount, None
+        rows = connection.execute(
+            f"""
+            WITH changed AS ({statement} RETURNING 1)
+            SELECT statuses.status, counters.count,
+                   (SELECT COUNT(*) FROM changed) AS changed
+            FROM (
+                VALUES ('available'), ('reserved'), ('used'), ('archived')
+            ) AS statuses(status)
+            LEFT JOIN {self.schema}.password_counters AS counters
+              ON counters.hotel_id = %s AND counters.status = statuses.status
+            """,
+            (*params, self.hotel_id),
+        ).fetchall()
+        changed = int(rows[0]["changed"])
+        if any(row["count"] is None for row in rows):
+            # Reconciliation at startup writes every row; until then count
+            # the passwords after the change rather than report zeros.
+            logger.warning(
+                "password_counters of hotel %s are incomplete, counting passwords",
+                self.hotel_id,
+            )
+            return changed, counts_from_rows(
+                connection.execute(*self._scan_query()).fetchall()
+            )
+        stats = counts_from_rows(rows)
+        for status_name, sign in ((source, -1), (target, 1)):
+            if status_name is not None:
+                stats[status_name] += sign * changed
+                stats["total"] += sign * changed
+        return changed, stats
+
+    def _scan_query(self) -> tuple[str, tuple]:
+        """Counts by status straight from the password tables."""
+        return (
+            f"""
+            SELECT status, COUNT(*) AS count
+            FROM {self.schema}.passwords
+            WHERE hotel_id = %s
+            GROUP BY status
+            UNION ALL
+            SELECT 'archived', COUNT(*)
+            FROM {self.schema}.passwords_archive
+            WHERE hotel_id = %s
+            """,
+            (self.hotel_id, self.hotel_id),
+        )
+
+    def reconcile_counters(self) -> dict[str, int]:
+        """Rebuild counters from the passwords table; return corrected drift."""
+        with self._connection() as connection:
+            # Blocks status changes while counting; reads stay available.
+            connection.execute(
+                f"LOCK TABLE {self.schema}.passwords IN SHARE ROW EXCLUSIVE MODE"
+            )
+            stored = counts_from_rows(
+                connection.execute(
+                    f"""
+                    SELECT status, count
+                    FROM {self.schema}.password_counters
+                    WHERE hotel_id = %s
+                    """,
+                    (self.hotel_id,),
+                ).fetchall()
+            )
+            rows = connection.execute(*self._scan_query()).fetchall()
+            actual = counts_from_rows(rows)
+            connection.execute(
+                f"DELETE FROM {self.schema}.password_counters WHERE hotel_id = %s",
                 (self.hotel_id,),
-            ).fetchall()
-        for row in rows:
-            count = int(row["count"])
-            counts[row["status"]] = count
-            counts["total"] += count
-        return counts
+            )
+            found = {row["status"]: int(row["count"]) for row in rows}
+            for status_name in ("available", "reserved", "used", "archived"):
+                connection.execute(
+                    f"""
+                    INSERT INTO {self.schema}.password_counters(hotel_id, status, count)
+                    VALUES (%s, %s, %s)
+                    """,
+                    (self.hotel_id, status_name, found.get(status_name, 0)),
+                )
+        return counter_drift(stored, actual)
+
+    def _available_query(
+        self, limit: int, offset: int, search: str, after_id: int | None
+    ) -> tuple[str, tuple]:
+        conditions = ["hotel_id = %s", "status = 'available'", "id > %s"]
+        params: list = [self.hotel_id, after_id or 0]
+        term = search.strip()
+        if term:
+            conditions.append("password ILIKE %s")
+            params.append(f"%{term}%")
+        return (
+            f"""
+            SELECT id, password, created_at
+            FROM {self.schema}.passwords
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id
+            LIMIT %s OFFSET %s
+            """,
+            (*params, limit, offset),
+        )
 
     def list_available(
-        self, limit: int = 200, offset: int = 0, search: str = ""
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
     ) -> list[dict]:
+        """Available passwords by id; pass the last id as ``after_id`` to page."""
+        query = self._available_query(limit, offset, search, after_id)
         with self._connection() as connection:
-            rows = connection.execute(
-                f"""
-                SELECT id, password, created_at
-                FROM {self.schema}.passwords
-                WHERE hotel_id = %s
-                  AND status = 'available'
-                  AND password ILIKE %s
-                ORDER BY id
-                LIMIT %s OFFSET %s
-                """,
-                (self.hotel_id, f"%{search.strip()}%", limit, offset),
-            ).fetchall()
+            rows = connection.execute(*query).fetchall()
         return [dict(row) for row in rows]
 
-    def list_generations(self, limit: int = 50) -> list[dict]:
+    def list_available_with_stats(
+        self,
+        limit: int = 200,
+        offset: int = 0,
+        search: str = "",
+        after_id: int | None = None,
+    ) -> tuple[list[dict], dict[str, int]]:
+        query = self._available_query(limit, offset, search, after_id)
         with self._connection() as connection:
-            rows = connection.execute(
-                f"""
+            # Both queries go out in one network round trip.
+            with connection.pipeline():
+                items = connection.execute(*query)
+                counters = connection.execute(*self._stats_query())
+            rows = items.fetchall()
+            stats = counts_from_rows(counters.fetchall())
+        return [dict(row) for row in rows], stats
+
+    def _generations_query(self, limit: int) -> tuple[str, tuple]:
+        return (
+            f"""
+            (
                 SELECT id::text AS id, ru_count, en_count, total_count, status,
-                       error, created_at, completed_at
+                       error, created_at, completed_at, profile
                 FROM {self.schema}.generations
                 WHERE hotel_id = %s
                 ORDER BY created_at DESC
                 LIMIT %s
-                """,
-                (self.hotel_id, limit),
-            ).fetchall()
+            )
+            UNION ALL
+            (
+                SELECT id::text AS id, ru_count, en_count, total_count, status,
+                       error, created_at, completed_at, profile
+                FROM {self.schema}.generations_archive
+                WHERE hotel_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s
+            )
+            ORDER BY created_at DESC
+            LIMIT %s
+            """,
+            (self.hotel_id, limit, self.hotel_id, limit, limit),
+        )
+
+    def list_generations(self, limit: int = 50) -> list[dict]:
+        with self._connection() as connection:
+            rows = connection.execute(*self._generations_query(limit)).fetchall()
         return [dict(row) for row in rows]
 
-    def delete_available(self, password_id: int) -> bool:
+    def _generation_query(self, batch_id: str) -> tuple[str, tuple] | None:
+        """None when ``batch_id`` is not a UUID and cannot match anything."""
+        try:
+            uuid.UUID(batch_id)
+        except ValueError:
+            return None
+        return (
+            f"""
+            SELECT id::text AS id, ru_count, en_count, total_count, status,
+                   error, created_at, completed_at, profile
+            FROM {self.schema}.generations
+            WHERE id = %s::uuid AND hotel_id = %s
+            UNION ALL
+            SELECT id::text AS id, ru_count, en_count, total_count, status,
+                   error, created_at, completed_at, profile
+            FROM {self.schema}.generations_archive
+            WHERE id = %s::uuid AND hotel_id = %s
+            """,
+            (batch_id, self.hotel_id, batch_id, self.hotel_id),
+        )
+
+    def get_generation(self, batch_id: str) -> dict | None:
+        query = self._generation_query(batch_id)
+        if query is None:
+            return None
         with self._connection() as connection:
-            cursor = connection.execute(
+            row = connection.execute(*query).fetchone()
+        return dict(row) if row else None
+
+    def _delete_available(
+        self, password_id: int, counters: bool = False
+    ) -> tuple[bool, dict[str, int] | None]:
+        with self._connection() as connection:
+            changed, stats = self._execute_counted(
+                connection,
                 f"""
                 DELETE FROM {self.schema}.passwords
                 WHERE id = %s AND hotel_id = %s AND status = 'available'
                 """,
                 (password_id, self.hotel_id),
+                counters,
+                source="available",
             )
-        return cursor.rowcount == 1
+        return changed == 1, stats
 
-    def update_available(self, password_id: int, password: str) -> bool:
+    def delete_available(self, password_id: int) -> bool:
+        return self._delete_available(password_id)[0]
+
+    def delete_available_with_stats(
+        self, password_id: int
+    ) -> tuple[bool, dict[str, int]]:
+        return self._delete_available(password_id, counters=True)
+
+    def _update_available(
+        self, password_id: int, password: str, counters: bool = False
+    ) -> tuple[bool, dict[str, int] | None]:
         import psycopg
 
         normalized = normalize_password(password)
@@ -837,7 +2018,18 @@ class PostgresPasswordStore:
             raise ValueError("Некорректный пароль")
         try:
             with self._connection() as connection:
-                cursor = connection.execute(
+                self._lock_archive(connection)
+                archived = connection.execute(
+                    f"""
+                    SELECT 1 FROM {self.schema}.passwords_archive
+                    WHERE hotel_id = %s AND password = %s
+                    """,
+                    (self.hotel_id, normalized),
+                ).fetchone()
+                if archived:
+                    raise PasswordConflict("Такой пароль уже есть в базе")
+                changed, stats = self._execute_counted(
+                    connection,
                     f"""
                     UPDATE {self.schema}.passwords
                     SET password = %s
@@ -846,17 +2038,29 @@ class PostgresPasswordStore:
                       AND status = 'available'
                     """,
                     (normalized, password_id, self.hotel_id),
+                    counters,
                 )
         except psycopg.errors.UniqueViolation as error:
             raise PasswordConflict("Такой пароль уже есть в базе") from error
-        return cursor.rowcount == 1
+        return changed == 1, stats
 
-    def delete_available_many(self, password_ids: Iterable[int]) -> int:
+    def update_available(self, password_id: int, password: str) -> bool:
+        return self._update_available(password_id, password)[0]
+
+    def update_available_with_stats(
+        self, password_id: int, password: str
+    ) -> tuple[bool, dict[str, int]]:
+        return self._update_available(password_id, password, counters=True)
+
+    def _delete_available_many(
+        self, password_ids: Iterable[int], counters: bool = False
+    ) -> tuple[int, dict[str, int] | None]:
         ids = sorted(set(int(item) for item in password_ids))
-        if not ids:
-            return 0
         with self._connection() as connection:
-            cursor = connection.execute(
+            if not ids:
+                return 0, self._stats(connection) if counters else None
+            return self._execute_counted(
+                connection,
                 f"""
                 DELETE FROM {self.schema}.passwords
                 WHERE hotel_id = %s
@@ -864,14 +2068,25 @@ class PostgresPasswordStore:
                   AND id = ANY(%s)
                 """,
                 (self.hotel_id, ids),
+                counters,
+                source="available",
             )
-        return cursor.rowcount
 
-    def issue_available(self, password_ids: Iterable[int]) -> list[str]:
+    def delete_available_many(self, password_ids: Iterable[int]) -> int:
+        return self._delete_available_many(password_ids)[0]
+
+    def delete_available_many_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[int, dict[str, int]]:
+        return self._delete_available_many(password_ids, counters=True)
+
+    def _issue_available(
+        self, password_ids: Iterable[int], counters: bool = False
+    ) -> tuple[list[str], dict[str, int] | None]:
         ids = sorted(set(int(item) for item in password_ids))
-        if not ids:
-            return []
         with self._connection() as connection:
+            if not ids:
+                return [], self._stats(connection) if counters else None
             rows = connection.execute(
                 f"""
                 SELECT id, password
@@ -888,7 +2103,8 @@ class PostgresPasswordStore:
                 raise PasswordsUnavailable(
                     "Один или несколько паролей уже недоступны"
                 )
-            connection.execute(
+            _changed, stats = self._execute_counted(
+                connection,
                 f"""
                 UPDATE {self.schema}.passwords
                 SET status = 'used',
@@ -898,8 +2114,58 @@ class PostgresPasswordStore:
                 WHERE hotel_id = %s AND id = ANY(%s)
                 """,
                 (self.hotel_id, ids),
+                counters,
+                source="available",
+                target="used",
             )
-        return [row["password"] for row in rows]
+        return [row["password"] for row in rows], stats
+
+    def issue_available(self, password_ids: Iterable[int]) -> list[str]:
+        return self._issue_available(password_ids)[0]
+
+    def issue_available_with_stats(
+        self, password_ids: Iterable[int]
+    ) -> tuple[list[str], dict[str, int]]:
+        return self._issue_available(password_ids, counters=True)
+
+    def _reserve_queries(
+        self, batch_id: uuid.UUID, count: int, ru_count: int, en_count: int
+    ) -> tuple[tuple[str, tuple], Callable[[list[int]], list[tuple[str, tuple]]]]:
+        """The row-locking select and the writes for the ids it returned."""
+        select = (
+            f"""
+            SELECT id, password
+            FROM {self.schema}.passwords
+            WHERE hotel_id = %s AND status = 'available'
+            ORDER BY id
+            FOR UPDATE SKIP LOCKED
+            LIMIT %s
+            """,
+            (self.hotel_id, count),
+        )
+
+        def writes(ids: list[int]) -> list[tuple[str, tuple]]:
+            return [
+                (
+                    f"""
+                    UPDATE {self.schema}.passwords
+                    SET status = 'reserved', batch_id = %s, reserved_at = now()
+                    WHERE hotel_id = %s AND id = ANY(%s) AND status = 'available'
+                    """,
+                    (batch_id, self.hotel_id, ids),
+                ),
+                (
+                    f"""
+                    INSERT INTO {self.schema}.generations(
+                        id, hotel_id, ru_count, en_count, total_count, status
+                    )
+                    VALUES (%s, %s, %s, %s, %s, 'reserved')
+                    """,
+                    (batch_id, self.hotel_id, ru_count, en_count, count),
+                ),
+            ]
+
+        return select, writes
 
     def reserve(
         self, count: int, ru_count: int = 0, en_count: int = 0
@@ -908,50 +2174,43 @@ class PostgresPasswordStore:
             return Reservation(batch_id="", passwords=())
 
         batch_id = uuid.uuid4()
+        select, writes = self._reserve_queries(batch_id, count, ru_count, en_count)
         with self._connection() as connection:
-            self._release_stale_in_connection(
-                connection, self.reservation_ttl_minutes
-            )
-            rows = connection.execute(
-                f"""
-                SELECT id, password
-                FROM {self.schema}.passwords
-                WHERE hotel_id = %s AND status = 'available'
-                ORDER BY id
-                FOR UPDATE SKIP LOCKED
-                LIMIT %s
-                """,
-                (self.hotel_id, count),
-            ).fetchall()
+            rows = connection.execute(*select).fetchall()
             if len(rows) < count:
                 raise NotEnoughPasswords(needed=count, available=len(rows))
-
-            ids = [row["id"] for row in rows]
-            connection.execute(
-                f"""
-                UPDATE {self.schema}.passwords
-                SET status = 'reserved', batch_id = %s, reserved_at = now()
-                WHERE hotel_id = %s AND id = ANY(%s) AND status = 'available'
-                """,
-                (batch_id, self.hotel_id, ids),
-            )
-            connection.execute(
-                f"""
-                INSERT INTO {self.schema}.generations(
-                    id, hotel_id, ru_count, en_count, total_count, status
-                )
-                VALUES (%s, %s, %s, %s, %s, 'reserved')
-                """,
-                (batch_id, self.hotel_id, ru_count, en_count, count),
-            )
+            for query in writes([row["id"] for row in rows]):
+                connection.execute(*query)
         return Reservation(
             batch_id=str(batch_id),
             passwords=tuple(row["password"] for row in rows),
+            ids=tuple(row["id"] for row in rows),
+        )
+
+    def _renew_query(self, batch_id: str) -> tuple[str, tuple]:
+        return (
+            f"""
+            UPDATE {self.schema}.passwords
+            SET reserved_at = now()
+            WHERE hotel_id = %s
+              AND status = 'reserved'
+              AND batch_id = %s::uuid
+            """,
+            (self.hotel_id, batch_id),
         )
 
-    def commit(self, batch_id: str) -> int:
+    def renew(self, batch_id: str) -> int:
+        """Extend the lease of a reservation that is still being rendered."""
         with self._connection() as connection:
-            cursor = connection.execute(
+            cursor = connection.execute(*self._renew_query(batch_id))
+        return cursor.rowcount
+
+    def _commit_queries(
+        self, batch_id: str, profile: dict | None = None
+    ) -> list[tuple[str, tuple]]:
+        """Statements finishing a reservation; the first one counts passwords."""
+        return [
+            (
                 f"""
                 UPDATE {self.schema}.passwords
                 SET status = 'used',
@@ -963,22 +2222,33 @@ class PostgresPasswordStore:
                   AND batch_id = %s::uuid
                 """,
                 (self.hotel_id, batch_id),
-            )
-            connection.execute(
+            ),
+            (
                 f"""
                 UPDATE {self.schema}.generations
-                SET status = 'completed', completed_at = now()
+                SET status = 'completed', completed_at = now(), profile = %s::jsonb
                 WHERE id = %s::uuid
                   AND hotel_id = %s
                   AND status = 'reserved'
                 """,
-                (batch_id, self.hotel_id),
-            )
-        return cursor.rowcount
+                (_profile_json(profile), batch_id, self.hotel_id),
+            ),
+        ]
 
-    def release(self, batch_id: str, error: str | None = None) -> int:
+    def commit(self, batch_id: str, profile: dict | None = None) -> int:
         with self._connection() as connection:
-            cursor = connection.execute(
+            counted, *rest = self._commit_queries(batch_id, profile)
+            cursor = connection.execute(*counted)
+            for query in rest:
+                connection.execute(*query)
+        return cursor.rowcount
+
+    def _release_queries(
+        self, batch_id: str, error: str | None, profile: dict | None = None
+    ) -> list[tuple[str, tuple]]:
+        """Statements cancelling a reservation; the first one counts passwords."""
+        return [
+            (
                 f"""
                 UPDATE {self.schema}.passwords
                 SET status = 'available', reserved_at = NULL, batch_id = NULL
@@ -987,21 +2257,34 @@ class PostgresPasswordStore:
                   AND batch_id = %s::uuid
                 """,
                 (self.hotel_id, batch_id),
-            )
-            connection.execute(
+            ),
+            (
                 f"""
                 UPDATE {self.schema}.generations
-                SET status = 'failed', error = %s, completed_at = now()
+                SET status = 'failed',
+                    error = %s,
+                    completed_at = now(),
+                    profile = %s::jsonb
                 WHERE id = %s::uuid
                   AND hotel_id = %s
                   AND status = 'reserved'
                 """,
-                (error, batch_id, self.hotel_id),
-            )
+                (error, _profile_json(profile), batch_id, self.hotel_id),
+            ),
+        ]
+
+    def release(
+        self, batch_id: str, error: str | None = None, profile: dict | None = None
+    ) -> int:
+        with self._connection() as connection:
+            counted, *rest = self._release_queries(batch_id, error, profile)
+            cursor = connection.execute(*counted)
+            for query in rest:
+                connection.execute(*query)
         return cursor.rowcount
 
     def _release_stale_in_connection(
-        self, connection, max_age_minutes: int
+        self, connection, max_age_minutes: int, limit: int | None = None
     ) -> int:
         rows = connection.execute(
             f"""
@@ -1011,8 +2294,9 @@ class PostgresPasswordStore:
               AND status = 'reserved'
               AND reserved_at < now() - (%s * interval '1 minute')
               AND batch_id IS NOT NULL
+            LIMIT %s
             """,
-            (self.hotel_id, max_age_minutes),
+            (self.hotel_id, max_age_minutes, limit),
         ).fetchall()
         batch_ids = [row["batch_id"] for row in rows]
         if not batch_ids:
@@ -1021,7 +2305,7 @@ class PostgresPasswordStore:
             f"""
             UPDATE {self.schema}.passwords
             SET status = 'available', reserved_at = NULL, batch_id = NULL
-            WHERE hotel_id = %s AND batch_id = ANY(%s)
+            WHERE hotel_id = %s AND status = 'reserved' AND batch_id = ANY(%s)
             """,
             (self.hotel_id, batch_ids),
         )
@@ -1037,10 +2321,20 @@ class PostgresPasswordStore:
         )
         return cursor.rowcount
 
-    def release_stale_reservations(self, max_age_minutes: int | None = None) -> int:
+    def release_stale_reservations(
+        self, max_age_minutes: int | None = None, batch_size: int | None = None
+    ) -> int:
+        """Release expired leases, ``batch_size`` reservations per transaction."""
         max_age = max_age_minutes or self.reservation_ttl_minutes
-        with self._connection() as connection:
-            return self._release_stale_in_connection(connection, max_age)
+        released = 0
+        while True:
+            with self._connection() as connection:
+                count = self._release_stale_in_connection(
+                    connection, max_age, batch_size
+                )
+            released += count
+            if not count or batch_size is None:
+                return released
 
 
 def create_password_store(
@@ -1050,6 +2344,12 @@ def create_password_store(
     hotel_id: str,
     hotel_name: str,
     reservation_ttl_minutes: int,
+    pool_min_size: int = 1,
+    pool_max_size: int = 10,
+    pool_max_idle_seconds: float = 300,
+    pool_timeout_seconds: float = 30,
+    sqlite_cache_size_kib: int = 16384,
+    sqlite_mmap_size: int = 256 * 1024 * 1024,
 ) -> Store:
     if database_url:
         return PostgresPasswordStore(
@@ -1057,10 +2357,16 @@ def create_password_store(
             hotel_id=hotel_id,
             hotel_name=hotel_name,
             reservation_ttl_minutes=reservation_ttl_minutes,
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pool_max_idle_seconds=pool_max_idle_seconds,
+            pool_timeout_seconds=pool_timeout_seconds,
         )
     return PasswordStore(
         database_path=database_path,
         hotel_id=hotel_id,
         hotel_name=hotel_name,
         reservation_ttl_minutes=reservation_ttl_minutes,
+        cache_size_kib=sqlite_cache_size_kib,
+        mmap_size=sqlite_mmap_size,
     )
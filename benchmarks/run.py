@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Callable
+
+from api import qr
+from api.brochure import (
+    build_merged_pdf,
+    build_merged_pdf_overlay,
+    render_process_pool,
+)
+from api.office import OfficePool, default_pool_size
+from api.settings import settings
+from api.storage import PasswordStore, build_import_preview
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+SUITES = {
+    "full": {
+        "brochures": [1, 10, 100, 1000],
+        "rows": [1_000, 100_000, 1_000_000],
+        "qr_codes": 500,
+        "preview_lines": 5000,
+    },
+    # Minutes instead of hours on a laptop or in CI.
+    "quick": {
+        "brochures": [1, 10],
+        "rows": [1_000, 10_000],
+        "qr_codes": 100,
+        "preview_lines": 5000,
+    },
+}
+# Only slower than baseline by this much *and* by SLACK_SECONDS counts, so
+# sub-millisecond jitter is not reported.
+SLACK_SECONDS = 0.001
+# With fewer runs one stall (a WAL checkpoint, a page fault) moves the median
+# by several times on millisecond cases.
+MIN_REPEATS = 5
+
+
+def measure(
+    action: Callable[[], object],
+    repeats: int,
+    setup: Callable[[], object] | None = None,
+) -> dict:
+    samples = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        action()
+        samples.append(time.perf_counter() - started)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "repeats": repeats,
+    }
+
+
+def with_rate(result: dict, units: int, unit: str) -> dict:
+    result[f"{unit}_per_second"] = round(units / result["median_s"], 1)
+    return result
+
+
+def render_cases(sizes: list[int], repeats: int, work: Path) -> dict[str, dict]:
+    """Both engines, with the calls ``api.main.render_pdf`` makes.
+
+    The PPTX engine runs on a render process pool and a warmed
+    ``OfficePool`` sized as the service sizes them. The render cache is
+    left out, otherwise every repeat after the first would be a cache hit.
+    """
+    results = {}
+    out_pdf = work / "brochures.pdf"
+    soffice = shutil.which(settings.soffice_bin)
+    workers = settings.render_workers or default_pool_size()
+    executor = office_pool = None
+    if soffice is not None:
+        executor = render_process_pool(workers)
+        office_pool = OfficePool(
+            soffice,
+            size=settings.office_pool_size or default_pool_size(),
+            profile_root=str(work / "office"),
+        )
+        office_pool.start()
+    try:
+        for size in sizes:
+            ru = [f"RU-{index:06d}" for index in range(size)]
+            en = [f"EN-{index:06d}" for index in range(size)]
+            runs = repeats if size < 100 else 1
+            result = measure(
+                lambda: build_merged_pdf_overlay(
+                    settings.pdf_template_dir,
+                    settings.pdf_font_path,
+                    ru,
+                    en,
+                    str(out_pdf),
+                ),
+                runs,
+            )
+            result["bytes"] = out_pdf.stat().st_size
+            results[f"render_pdf.overlay[{size}]"] = with_rate(
+                result, size * 2, "brochures"
+            )
+
+            name = f"render_pdf.pptx[{size}]"
+            if soffice is None:
+                results[name] = {"skipped": f"{settings.soffice_bin} not found"}
+                continue
+            result = measure(
+                lambda: build_merged_pdf(
+                    soffice,
+                    settings.template_ru_path,
+                    settings.template_en_path,
+                    ru,
+                    en,
+                    None,
+                    str(work / "pptx"),
+                    str(out_pdf),
+                    office_pool=office_pool,
+                    executor=executor,
+                    workers=workers,
+                ),
+                runs,
+            )
+            result["bytes"] = out_pdf.stat().st_size
+            results[name] = with_rate(result, size * 2, "brochures")
+    finally:
+        if office_pool is not None:
+            office_pool.close()
+        if executor is not None:
+            executor.shutdown()
+    return results
+
+
+def qr_case(count: int, repeats: int, work: Path) -> dict[str, dict]:
+    payloads = [f"QR-{index:06d}" for index in range(count)]
+
+    def render() -> None:
+        for index, payload in enumerate(payloads):
+            qr.make_qr_png(payload, str(work / "qr" / f"{index}.png"))
+
+    # Cold cache, as on the first print of a new batch.
+    result = measure(render, repeats, setup=qr.cache.clear)
+    return {f"make_qr_png[{count}]": with_rate(result, count, "codes")}
+
+
+def seed(store: PasswordStore, rows: int, chunk: int = 50_000) -> None:
+    have = store.stats()["total"]
+    for start in range(have, rows, chunk):
+        store.import_passwords(
+            f"SEED-{index:08d}" for index in range(start, min(rows, start + chunk))
+        )
+
+
+def store_cases(sizes: list[int], repeats: int, work: Path) -> dict[str, dict]:
+    """Hot operations on a SQLite store holding ``size`` passwords."""
+    results = {}
+    store = PasswordStore(str(work / "benchmark.db"))
+    store.initialize()
+    try:
+        for size in sorted(sizes):
+            seed(store, size)
+            pastes = iter(range(repeats * 1000 * 2))
+
+            def paste() -> None:
+                store.import_passwords(
+                    f"PASTE-{size}-{next(pastes):08d}" for _ in range(1000)
+                )
+
+            def reserve_commit() -> None:
+                store.commit(store.reserve(50).batch_id)
+
+            results[f"store.import_passwords[{size}]"] = with_rate(
+                measure(paste, repeats), 1000, "passwords"
+            )
+            results[f"store.reserve[{size}]"] = measure(
+                lambda: store.release(store.reserve(50).batch_id), repeats
+            )
+            results[f"store.reserve_commit[{size}]"] = measure(
+                reserve_commit, repeats
+            )
+            results[f"store.list_available[{size}]"] = measure(
+                lambda: store.list_available(limit=200), repeats
+            )
+    finally:
+        store.close()
+    return results
+
+
+def preview_case(lines: int, repeats: int) -> dict[str, dict]:
+    # Half of the paste is already in the database, a tenth repeats itself.
+    paste = [f"PREVIEW-{index % (lines - lines // 10):06d}" for index in range(lines)]
+    existing = {f"PREVIEW-{index:06d}" for index in range(0, lines, 2)}
+    result = measure(lambda: build_import_preview(paste, existing), repeats)
+    return {f"build_import_preview[{lines}]": with_rate(result, lines, "lines")}
+
+
+def run_suite(suite: str, repeats: int) -> dict:
+    config = SUITES[suite]
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work = Path(temp_dir)
+        for name, cases in (
+            ("render", lambda: render_cases(config["brochures"], repeats, work)),
+            ("qr", lambda: qr_case(config["qr_codes"], repeats, work)),
+            ("preview", lambda: preview_case(config["preview_lines"], repeats)),
+            ("store", lambda: store_cases(config["rows"], repeats, work)),
+        ):
+            print(f"running {name} cases…", file=sys.stderr)
+            results.update(cases())
+    return {
+        "created_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "suite": suite,
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Cases slower than the baseline by more than ``tolerance``.
+
+    Both the median and the fastest run have to be slower.
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous or "median_s" not in previous or "median_s" not in current:
+            continue
+        limit = previous["median_s"] * (1 + tolerance)
+        # A real slowdown also slows the fastest run; a stall during a few
+        # runs only lifts the median.
+        fastest_slower = (
+            "min_s" not in current
+            or "min_s" not in previous
+            or current["min_s"] > previous["min_s"] * (1 + tolerance)
+        )
+        if (
+            current["median_s"] > limit
+            and fastest_slower
+            and current["median_s"] - previous["median_s"] > SLACK_SECONDS
+        ):
+            regressions.append(
+                f"{name}: {current['median_s'] * 1000:.2f} ms, baseline "
+                f"{previous['median_s'] * 1000:.2f} ms "
+                f"(+{(current['median_s'] / previous['median_s'] - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark rendering, QR codes and the password store."
+    )
+    parser.add_argument("--suite", choices=sorted(SUITES), default="full")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("benchmarks/results/latest.json"),
+        help="Where to write this run as JSON.",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown against the baseline median, 0.25 = 25%%.",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Merge this run into the baseline instead of comparing.",
+    )
+    args = parser.parse_args()
+    if args.repeats < MIN_REPEATS:
+        parser.error(
+            f"--repeats must be at least {MIN_REPEATS} for a comparable median"
+        )
+
+    run = run_suite(args.suite, args.repeats)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(run, indent=2) + "\n", encoding="utf-8")
+
+    print(f"{'case':<40} {'median ms':>12} {'rate':>14}")
+    for name, result in run["results"].items():
+        if "skipped" in result:
+            print(f"{name:<40} {'skipped':>12}")
+            continue
+        rate = next(
+            (f"{value:.0f}/s" for key, value in result.items() if key.endswith("_per_second")),
+            "",
+        )
+        print(f"{name:<40} {result['median_s'] * 1000:>12.2f} {rate:>14}")
+
+    baseline = (
+        json.loads(args.baseline.read_text(encoding="utf-8"))
+        if args.baseline.exists()
+        else {"results": {}}
+    )
+    if args.update_baseline:
+        baseline.update({key: run[key] for key in ("created_at", "machine")})
+        baseline["results"] = {**baseline.get("results", {}), **run["results"]}
+        args.baseline.write_text(
+            json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"baseline updated: {args.baseline}")
+        return
+
+    regressions = compare(run["results"], baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print("\nslower than baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("\nno regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from api.storage import PasswordStore, Store, create_password_store
+
+
+def grow_used(store: Store, target: int, chunk: int = 5000) -> None:
+    """Push the used history to ``target`` rows through the public API."""
+    missing = target - store.stats()["used"]
+    prefix = f"USED-{time.time_ns()}"
+    while missing > 0:
+        size = min(chunk, missing)
+        store.import_passwords(f"{prefix}-{missing - index}" for index in range(size))
+        store.commit(store.reserve(size).batch_id)
+        missing -= size
+
+
+def measure_reserve(store: Store, count: int, rounds: int) -> list[float]:
+    """Reserve and release ``count`` passwords; returns milliseconds per round."""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        reservation = store.reserve(count)
+        samples.append((time.perf_counter() - started) * 1000)
+        store.release(reservation.batch_id)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Show reserve() latency while the used password history grows."
+    )
+    parser.add_argument(
+        "--used",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Used-row counts to measure at, in increasing order.",
+    )
+    parser.add_argument("--available", type=int, default=2000)
+    parser.add_argument("--count", type=int, default=50, help="Passwords per reserve.")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument(
+        "--database-url",
+        default="",
+        help="PostgreSQL URL; a temporary SQLite database is used when empty.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.database_url:
+            store = create_password_store(
+                database_url=args.database_url,
+                database_path="",
+                hotel_id=f"benchmark-{time.time_ns()}",
+                hotel_name="Benchmark",
+                reservation_ttl_minutes=15,
+            )
+        else:
+            store = PasswordStore(str(Path(temp_dir) / "benchmark.db"))
+        store.initialize()
+        try:
+            print(f"{'used rows':>10} {'median ms':>10} {'p95 ms':>10}")
+            for used in sorted(args.used):
+                grow_used(store, used)
+                available = store.stats()["available"]
+                if available < args.available:
+                    store.import_passwords(
+                        f"FREE-{used}-{index}"
+                        for index in range(args.available - available)
+                    )
+                samples = sorted(measure_reserve(store, args.count, args.rounds))
+                p95 = samples[max(0, round(len(samples) * 0.95) - 1)]
+                print(f"{used:>10} {statistics.median(samples):>10.2f} {p95:>10.2f}")
+        finally:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
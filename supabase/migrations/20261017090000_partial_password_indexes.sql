@@ -0,0 +1,16 @@
+-- Hot queries (reserve, list, lease expiry, issue) only touch available and
+-- reserved rows; index those instead of the whole used history.
+drop index if exists wifi_voucher.idx_passwords_hotel_status_id;
+drop index if exists wifi_voucher.idx_passwords_hotel_batch;
+
+create index if not exists idx_passwords_available
+    on wifi_voucher.passwords(hotel_id, id)
+    where status = 'available';
+
+create index if not exists idx_passwords_reserved_lease
+    on wifi_voucher.passwords(hotel_id, reserved_at)
+    where status = 'reserved';
+
+create index if not exists idx_passwords_reserved_batch
+    on wifi_voucher.passwords(hotel_id, batch_id)
+    where status = 'reserved';
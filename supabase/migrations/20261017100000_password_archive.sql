@@ -0,0 +1,31 @@
+-- Cold tier: used passwords and finished generations past the retention
+-- window are moved here in batches by the API service (ARCHIVE_AFTER_DAYS).
+create index if not exists idx_passwords_used_at
+    on wifi_voucher.passwords(hotel_id, used_at)
+    where status = 'used';
+
+create table if not exists wifi_voucher.passwords_archive (
+    id bigint primary key,
+    hotel_id text not null references wifi_voucher.hotels(id),
+    password text not null,
+    created_at timestamptz not null,
+    used_at timestamptz,
+    archived_at timestamptz not null default now(),
+    unique (hotel_id, password)
+);
+
+create table if not exists wifi_voucher.generations_archive (
+    id uuid primary key,
+    hotel_id text not null references wifi_voucher.hotels(id),
+    ru_count integer not null default 0,
+    en_count integer not null default 0,
+    total_count integer not null,
+    status text not null,
+    error text,
+    created_at timestamptz not null,
+    completed_at timestamptz,
+    archived_at timestamptz not null default now()
+);
+
+alter table wifi_voucher.passwords_archive enable row level security;
+alter table wifi_voucher.generations_archive enable row level security;
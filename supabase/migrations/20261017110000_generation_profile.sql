@@ -0,0 +1,7 @@
+-- Per-phase render profile of a generation (phases_ms, office_batches,
+-- bytes), written by the API service when the reservation is finished.
+alter table wifi_voucher.generations
+    add column if not exists profile jsonb;
+
+alter table wifi_voucher.generations_archive
+    add column if not exists profile jsonb;
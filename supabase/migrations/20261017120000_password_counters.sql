@@ -0,0 +1,84 @@
+-- Per-hotel password counts by status, kept by statement-level triggers so
+-- the stats read one row per status instead of scanning passwords. The
+-- 'archived' row is maintained by the API service when it archives.
+create table if not exists wifi_voucher.password_counters (
+    hotel_id text not null,
+    status text not null,
+    count bigint not null default 0,
+    primary key (hotel_id, status)
+);
+
+alter table wifi_voucher.password_counters enable row level security;
+
+create or replace function wifi_voucher.count_password_rows()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update wifi_voucher.password_counters as counters
+        set count = counters.count - changed.count
+        from (
+            select hotel_id, status, count(*) as count
+            from old_rows
+            group by hotel_id, status
+        ) as changed
+        where counters.hotel_id = changed.hotel_id
+          and counters.status = changed.status;
+    end if;
+    if tg_op in ('UPDATE', 'INSERT') then
+        insert into wifi_voucher.password_counters(hotel_id, status, count)
+        select hotel_id, status, count(*)
+        from new_rows
+        group by hotel_id, status
+        on conflict (hotel_id, status) do update
+        set count = wifi_voucher.password_counters.count + excluded.count;
+    end if;
+    return null;
+end
+$$;
+
+-- No status change may slip in between installing the triggers and the
+-- rebuild below.
+lock table wifi_voucher.passwords in share row exclusive mode;
+
+drop trigger if exists passwords_counters_insert on wifi_voucher.passwords;
+create trigger passwords_counters_insert
+    after insert on wifi_voucher.passwords
+    referencing new table as new_rows
+    for each statement
+    execute function wifi_voucher.count_password_rows();
+
+drop trigger if exists passwords_counters_delete on wifi_voucher.passwords;
+create trigger passwords_counters_delete
+    after delete on wifi_voucher.passwords
+    referencing old table as old_rows
+    for each statement
+    execute function wifi_voucher.count_password_rows();
+
+drop trigger if exists passwords_counters_update on wifi_voucher.passwords;
+create trigger passwords_counters_update
+    after update on wifi_voucher.passwords
+    referencing old table as old_rows new table as new_rows
+    for each statement
+    execute function wifi_voucher.count_password_rows();
+
+-- Reconcile: one row per hotel and status, zeros included.
+delete from wifi_voucher.password_counters;
+
+insert into wifi_voucher.password_counters(hotel_id, status, count)
+select hotels.id, statuses.status, coalesce(found.count, 0)
+from wifi_voucher.hotels as hotels
+cross join (
+    values ('available'), ('reserved'), ('used'), ('archived')
+) as statuses(status)
+left join (
+    select hotel_id, status, count(*) as count
+    from wifi_voucher.passwords
+    group by hotel_id, status
+    union all
+    select hotel_id, 'archived', count(*)
+    from wifi_voucher.passwords_archive
+    group by hotel_id
+) as found
+    on found.hotel_id = hotels.id and found.status = statuses.status;
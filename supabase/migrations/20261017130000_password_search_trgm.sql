@@ -0,0 +1,8 @@
+-- Substring search (ILIKE '%term%') over available passwords uses a trigram
+-- index instead of a filtered scan of the hotel's stock.
+create extension if not exists pg_trgm with schema extensions;
+
+create index if not exists idx_passwords_available_trgm
+    on wifi_voucher.passwords
+    using gin (password extensions.gin_trgm_ops)
+    where status = 'available';
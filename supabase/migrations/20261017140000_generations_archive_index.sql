@@ -0,0 +1,3 @@
+-- The generation history lists archived generations too, newest first.
+create index if not exists idx_generations_archive_hotel_created
+    on wifi_voucher.generations_archive(hotel_id, created_at desc);
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import unittest
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from api.async_storage import (
+    AsyncPostgresPasswordStore,
+    ThreadedAsyncStore,
+    create_async_store,
+)
+from api.storage import NotEnoughPasswords, PasswordStore, PostgresPasswordStore
+
+
+class ThreadedAsyncStoreTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = PasswordStore(str(Path(self.temp_dir.name) / "vouchers.db"))
+        self.store.initialize()
+        self.astore = create_async_store(self.store, workers=2)
+
+    async def asyncTearDown(self):
+        await self.astore.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_calls_run_on_dedicated_database_threads(self):
+        self.assertIsInstance(self.astore, ThreadedAsyncStore)
+        seen = set()
+        original = self.store.stats
+
+        def stats():
+            seen.add(threading.current_thread().name)
+            return original()
+
+        with patch.object(self.store, "stats", stats):
+            await asyncio.gather(*(self.astore.stats() for _ in range(8)))
+
+        self.assertTrue(seen)
+        self.assertTrue(all(name.startswith("wifi-voucher-db") for name in seen))
+        self.assertNotIn(threading.current_thread().name, seen)
+
+    async def test_lifecycle_matches_the_blocking_store(self):
+        await self.astore.import_passwords(["FIRST", "SECOND", "THIRD"])
+        reservation = await self.astore.reserve(2, ru_count=2)
+        self.assertEqual(reservation.passwords, ("FIRST", "SECOND"))
+
+        self.assertEqual(await self.astore.renew(reservation.batch_id), 2)
+        self.assertEqual(await self.astore.commit(reservation.batch_id), 2)
+        with self.assertRaises(NotEnoughPasswords):
+            await self.astore.reserve(2)
+
+        self.assertEqual(
+            await self.astore.stats(),
+            {"available": 1, "reserved": 0, "used": 2, "total": 3},
+        )
+        generation = await self.astore.get_generation(reservation.batch_id)
+        self.assertEqual(generation["status"], "completed")
+
+
+class AsyncPostgresStoreTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = PostgresPasswordStore(
+            "postgresql://example/db",
+            hotel_id="hotel",
+            hotel_name="Hotel",
+            pool_min_size=2,
+            pool_max_size=4,
+        )
+        self.connection = MagicMock()
+        self.cursor = MagicMock()
+        self.cursor.rowcount = 2
+        self.cursor.fetchall = AsyncMock(
+            return_value=[{"id": 1, "password": "A"}, {"id": 2, "password": "B"}]
+        )
+        self.connection.execute = AsyncMock(return_value=self.cursor)
+
+        @asynccontextmanager
+        async def connection():
+            yield self.connection
+
+        self.pool = MagicMock()
+        self.pool.open = AsyncMock()
+        self.pool.close = AsyncMock()
+        self.pool.connection = connection
+
+    async def test_lifecycle_runs_the_shared_sql_on_one_async_pool(self):
+        astore = create_async_store(self.store)
+        self.assertIsInstance(astore, AsyncPostgresPasswordStore)
+
+        with patch(
+            "psycopg_pool.AsyncConnectionPool", return_value=self.pool
+        ) as factory:
+            reservation = await astore.reserve(2, ru_count=2)
+            committed = await astore.commit(reservation.batch_id)
+            await astore.close()
+
+        factory.assert_called_once()
+        _args, kwargs = factory.call_args
+        # The two pools share DATABASE_POOL_MAX_SIZE.
+        self.assertEqual((kwargs["min_size"], kwargs["max_size"]), (2, 2))
+        self.assertEqual(self.store.pool_bounds, (2, 2))
+        self.assertFalse(kwargs["open"])
+        self.pool.open.assert_awaited_once()
+        self.pool.close.assert_awaited_once()
+        self.assertEqual(reservation.passwords, ("A", "B"))
+        self.assertEqual(committed, 2)
+        statements = [call.args[0] for call in self.connection.execute.await_args_list]
+        self.assertEqual(len(statements), 5)
+        self.assertIn("FOR UPDATE SKIP LOCKED", statements[0])
+        self.assertIn("SET status = 'used'", statements[3])
+
+    async def test_open_blocking_pool_shrinks_to_its_share(self):
+        self.store.pool_max_size = 5
+        blocking = MagicMock()
+        self.store._pool = blocking
+
+        astore = AsyncPostgresPasswordStore(self.store)
+
+        blocking.resize.assert_called_once_with(2, 2)
+        self.assertEqual(astore.pool_bounds, (2, 3))
+        self.store._pool = None
+
+    async def test_invalid_generation_id_skips_the_database(self):
+        astore = AsyncPostgresPasswordStore(self.store)
+        with patch(
+            "psycopg_pool.AsyncConnectionPool", return_value=self.pool
+        ) as factory:
+            self.assertIsNone(await astore.get_generation("missing"))
+            await astore.close()
+        factory.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
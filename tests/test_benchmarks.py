@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import io
+import sys
+import unittest
+from contextlib import redirect_stderr
+from unittest.mock import patch
+
+from benchmarks.run import compare, main, preview_case
+
+
+class BaselineComparisonTests(unittest.TestCase):
+    def test_only_meaningful_slowdowns_are_flagged(self):
+        baseline = {
+            "render": {"median_s": 1.0},
+            "reserve": {"median_s": 0.0004},
+            "pptx": {"skipped": "soffice not found"},
+        }
+        results = {
+            "render": {"median_s": 1.3},
+            "reserve": {"median_s": 0.0008},
+            "pptx": {"median_s": 5.0},
+            "new_case": {"median_s": 2.0},
+        }
+
+        regressions = compare(results, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("render: 1300.00 ms"))
+        self.assertEqual(compare(results, baseline, tolerance=0.5), [])
+
+    def test_a_stall_that_leaves_the_fastest_run_alone_is_noise(self):
+        baseline = {"reserve_commit": {"median_s": 0.004, "min_s": 0.0035}}
+        stalled = {"reserve_commit": {"median_s": 0.0176, "min_s": 0.0036}}
+        slower = {"reserve_commit": {"median_s": 0.0176, "min_s": 0.009}}
+
+        self.assertEqual(compare(stalled, baseline, tolerance=0.25), [])
+        self.assertEqual(len(compare(slower, baseline, tolerance=0.25)), 1)
+
+    def test_too_few_repeats_are_refused(self):
+        with patch.object(sys, "argv", ["run.py", "--repeats", "2"]), patch(
+            "benchmarks.run.run_suite"
+        ) as run_suite, redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main()
+        run_suite.assert_not_called()
+
+    def test_cases_report_median_and_rate(self):
+        result = preview_case(100, repeats=2)["build_import_preview[100]"]
+
+        self.assertEqual(result["repeats"], 2)
+        self.assertGreater(result["lines_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,26 @@
 from __future__ import annotations
 
+import os
+import shutil
 import tempfile
 import unittest
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
-from api.brochure import convert_pptx_batch_to_pdf
+from pptx import Presentation
+from pypdf import PdfReader
+
+from api.brochure import (
+    build_merged_pdf_overlay,
+    compiled_template,
+    convert_pptx_batch_to_pdf,
+    iter_concatenated_pdf,
+    render_pptx_parts,
+    render_process_pool,
+)
+from api.profiling import RenderProfile
+from api.qr import qr_png
 
 
 class BatchConversionTests(unittest.TestCase):
@@ -29,15 +43,20 @@ class BatchConversionTests(unittest.TestCase):
                     (destination / f"{source_path.stem}.pdf").write_bytes(b"pdf")
                 return SimpleNamespace(returncode=0, stdout="", stderr="")
 
+            profile = RenderProfile()
             with patch("subprocess.run", side_effect=fake_run) as run:
                 result = convert_pptx_batch_to_pdf(
                     "soffice",
                     inputs,
                     str(output_dir),
                     batch_size=2,
+                    profile=profile,
                 )
 
             self.assertEqual(run.call_count, 2)
+            self.assertEqual(
+                [size for size, _seconds in profile.office_batches], [2, 1]
+            )
             self.assertEqual(
                 [Path(path).name for path in result],
                 ["first.pdf", "second.pdf", "third.pdf"],
@@ -48,5 +67,134 @@ class BatchConversionTests(unittest.TestCase):
             convert_pptx_batch_to_pdf("soffice", ["one.pptx"], ".", 0)
 
 
+class OverlayRendererTests(unittest.TestCase):
+    def test_stamps_passwords_in_order_without_libreoffice(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_pdf = Path(temp_dir) / "brochures.pdf"
+            profile = RenderProfile()
+
+            with patch("subprocess.run") as run:
+                build_merged_pdf_overlay(
+                    "web/public/templates",
+                    "fonts/circe.ttf",
+                    ["RU-FIRST", "RU-SECOND"],
+                    ["EN-ONLY"],
+                    str(out_pdf),
+                    profile=profile,
+                )
+
+            run.assert_not_called()
+            self.assertEqual(set(profile.phases), {"templates", "overlay", "merge"})
+            self.assertEqual(profile.bytes_written, out_pdf.stat().st_size)
+            timing = profile.server_timing(1.5)
+            self.assertTrue(timing.startswith("pdf;dur=1500, templates;dur="))
+            self.assertIn(f'bytes;desc="{profile.bytes_written}"', timing)
+            reader = PdfReader(out_pdf)
+            self.assertEqual(len(reader.pages), 6)
+            self.assertIn("RU-FIRST", reader.pages[1].extract_text())
+            self.assertIn("RU-SECOND", reader.pages[3].extract_text())
+            self.assertIn("EN-ONLY", reader.pages[5].extract_text())
+            self.assertNotIn("RU-FIRST", reader.pages[3].extract_text())
+
+
+    def test_concatenates_prerendered_brochures_and_removes_them(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parts = []
+            for password in ("RU-CACHED", "EN-CACHED"):
+                part = Path(temp_dir) / f"{password}.pdf"
+                build_merged_pdf_overlay(
+                    "web/public/templates",
+                    "fonts/circe.ttf",
+                    [password] if password.startswith("RU") else [],
+                    [password] if password.startswith("EN") else [],
+                    str(part),
+                )
+                parts.append(str(part))
+            out_pdf = Path(temp_dir) / "brochures.pdf"
+            profile = RenderProfile()
+
+            progress = []
+            with out_pdf.open("wb") as output:
+                for piece in iter_concatenated_pdf(
+                    parts, chunk_size=1, profile=profile
+                ):
+                    output.write(piece)
+                    progress.append(profile.brochures_written)
+
+            # Two chunks of one brochure, then the trailer with none.
+            self.assertEqual(progress, [1, 2, 2])
+            self.assertEqual(set(profile.phases), {"cached"})
+            self.assertGreater(profile.shared_objects, 0)
+            self.assertFalse(any(Path(part).exists() for part in parts))
+            reader = PdfReader(out_pdf)
+            self.assertEqual(len(reader.pages), 4)
+            self.assertIn("RU-CACHED", reader.pages[1].extract_text())
+            self.assertIn("EN-CACHED", reader.pages[3].extract_text())
+
+
+class ParallelPptxTests(unittest.TestCase):
+    def test_process_pool_keeps_ru_then_en_order(self):
+        passwords = ["RU-1", "RU-2", "RU-3", "EN-1"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            jobs = [
+                (
+                    f"api/templates/brochure_{password[:2].lower()}.pptx",
+                    password,
+                    str(root / f"qr_{index}.png"),
+                    str(root / f"part_{index}.pptx"),
+                )
+                for index, password in enumerate(passwords)
+            ]
+
+            with render_process_pool(2) as executor:
+                result = render_pptx_parts(jobs, executor=executor, workers=2)
+
+            self.assertEqual(result, [job[3] for job in jobs])
+            for password, path in zip(passwords, result):
+                text = " ".join(
+                    shape.text_frame.text
+                    for slide in Presentation(path).slides
+                    for shape in slide.shapes
+                    if shape.has_text_frame
+                )
+                self.assertIn(password, text)
+
+
+class CompiledTemplateTests(unittest.TestCase):
+    def test_instance_patches_password_and_qr_only(self):
+        qr_bytes = qr_png("A&B<1>")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = Path(temp_dir) / "brochure.pptx"
+            shutil.copy("api/templates/brochure_ru.pptx", template)
+            compiled = compiled_template(str(template))
+            out_pptx = Path(temp_dir) / "out.pptx"
+
+            compiled.render("A&B<1>", qr_bytes, str(out_pptx))
+
+            slide = Presentation(out_pptx).slides[1]
+            texts = [
+                shape.text_frame.text
+                for shape in slide.shapes
+                if shape.has_text_frame
+            ]
+            self.assertIn("A&B<1>", texts)
+            self.assertFalse(any("{{" in text for text in texts))
+            pictures = [shape for shape in slide.shapes if shape.shape_type == 13]
+            self.assertEqual(pictures[-1].image.blob, qr_bytes)
+
+    def test_cache_is_reused_until_template_changes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            template = Path(temp_dir) / "brochure.pptx"
+            shutil.copy("api/templates/brochure_ru.pptx", template)
+            first = compiled_template(str(template))
+            self.assertIs(compiled_template(str(template)), first)
+
+            shutil.copy("api/templates/brochure_en.pptx", template)
+            os.utime(template, ns=(first.mtime_ns + 10**9,) * 2)
+
+            self.assertNotEqual(compiled_template(str(template)).digest, first.digest)
+
+
 if __name__ == "__main__":
     unittest.main()
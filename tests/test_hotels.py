@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from api.hotels import HotelConfig, load_hotels
+
+DEFAULT = HotelConfig(
+    id="standalone",
+    name="Standalone hotel",
+    template_ru_path="ru.pptx",
+    template_en_path="en.pptx",
+    pdf_template_dir="templates",
+)
+
+
+class LoadHotelsTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.temp_dir.name) / "hotels.json"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_without_file_only_the_default_hotel_is_served(self):
+        self.assertEqual(load_hotels("", DEFAULT), {"standalone": DEFAULT})
+
+    def test_hotels_inherit_default_templates_unless_overridden(self):
+        self.path.write_text(
+            json.dumps(
+                [
+                    {"id": "sea", "name": "Sea", "max_pending_jobs": 2},
+                    {"id": "city", "name": "City", "pdf_template_dir": "city"},
+                ]
+            ),
+            encoding="utf-8",
+        )
+
+        hotels = load_hotels(str(self.path), DEFAULT)
+
+        self.assertEqual(list(hotels), ["standalone", "sea", "city"])
+        self.assertEqual(hotels["sea"].template_ru_path, "ru.pptx")
+        self.assertEqual(hotels["sea"].max_pending_jobs, 2)
+        self.assertEqual(hotels["city"].pdf_template_dir, "city")
+
+    def test_duplicate_hotel_is_rejected(self):
+        self.path.write_text(
+            json.dumps([{"id": "sea", "name": "Sea"}, {"id": "sea", "name": "Sea"}]),
+            encoding="utf-8",
+        )
+        with self.assertRaises(ValueError):
+            load_hotels(str(self.path), DEFAULT)
+
+
+if __name__ == "__main__":
+    unittest.main()
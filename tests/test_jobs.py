@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from api.async_storage import ThreadedAsyncStore
+from api.jobs import JobManager, LeaseReaper, RenderSlots, lease_heartbeat
+from api.storage import PasswordStore
+
+
+class RenderSlotsTests(unittest.IsolatedAsyncioTestCase):
+    async def test_requests_fail_fast_while_workers_wait(self):
+        slots = RenderSlots(1)
+        self.assertTrue(slots.try_acquire())
+        self.assertFalse(slots.try_acquire())
+
+        waiting = asyncio.create_task(slots.acquire())
+        await asyncio.sleep(0)
+        self.assertFalse(waiting.done())
+        slots.release()
+        await asyncio.wait_for(waiting, 1)
+
+        self.assertEqual(slots.busy, 1)
+        self.assertFalse(slots.try_acquire())
+        slots.release()
+        self.assertEqual(slots.busy, 0)
+
+
+class JobManagerTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = PasswordStore(str(Path(self.temp_dir.name) / "test.db"))
+        self.store.initialize()
+        self.store.import_passwords([f"PASS{index}" for index in range(6)])
+        self.astore = ThreadedAsyncStore(self.store)
+
+    async def asyncTearDown(self):
+        await self.astore.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def wait_finished(self, manager: JobManager, job_id: str):
+        for _ in range(200):
+            job = manager.get(job_id)
+            if job.status not in {"queued", "running"}:
+                return job
+            await asyncio.sleep(0.01)
+        self.fail("job did not finish")
+
+    async def test_completed_job_commits_and_reports_progress(self):
+        def render(job, work_dir, progress):
+            progress(2)
+            progress(job.total + 10)
+            out = work_dir / "brochures.pdf"
+            out.write_bytes(b"%PDF")
+            return str(out)
+
+        manager = JobManager(self.astore, render, lease_renewal_seconds=0.01)
+        await manager.start()
+        job = manager.submit(self.store.reserve(3, ru_count=2, en_count=1), 2, 1)
+        job = await self.wait_finished(manager, job.id)
+
+        self.assertEqual(job.status, "completed")
+        self.assertEqual((job.done, job.total), (3, 3))
+        self.assertEqual(job.pdf_path.read_bytes(), b"%PDF")
+        self.assertEqual(self.store.stats()["used"], 3)
+        await manager.stop()
+        self.assertFalse(job.pdf_path.exists())
+
+    async def test_jobs_render_concurrently_up_to_slot_count(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def render(_job, work_dir, _progress):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+            out = work_dir / "brochures.pdf"
+            out.write_bytes(b"%PDF")
+            return str(out)
+
+        manager = JobManager(
+            self.astore, render, workers=3, slots=RenderSlots(2)
+        )
+        await manager.start()
+        submitted = [
+            manager.submit(self.store.reserve(2, ru_count=2), 2, 0)
+            for _ in range(3)
+        ]
+        for job in submitted:
+            await self.wait_finished(manager, job.id)
+        await manager.stop()
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(self.store.stats()["used"], 6)
+
+    async def test_failed_job_releases_reservation(self):
+        def render(_job, _work_dir, _progress):
+            raise RuntimeError("soffice crashed")
+
+        manager = JobManager(self.astore, render)
+        await manager.start()
+        job = manager.submit(self.store.reserve(2, ru_count=2), 2, 0)
+        job = await self.wait_finished(manager, job.id)
+        await manager.stop()
+
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(self.store.stats()["available"], 6)
+        self.assertEqual(
+            self.store.get_generation(job.id)["error"], "soffice crashed"
+        )
+
+    async def test_database_errors_fail_the_job_but_not_the_worker(self):
+        def render(_job, work_dir, _progress):
+            out = work_dir / "brochures.pdf"
+            out.write_bytes(b"%PDF")
+            return str(out)
+
+        commit = self.astore.commit
+        manager = JobManager(self.astore, render, lease_renewal_seconds=0.01)
+        await manager.start()
+        with patch.object(
+            self.astore, "commit", AsyncMock(side_effect=[RuntimeError("gone"), 2])
+        ), patch.object(
+            self.astore, "release", AsyncMock(side_effect=RuntimeError("gone"))
+        ), patch.object(
+            self.astore, "renew", AsyncMock(side_effect=RuntimeError("gone"))
+        ), self.assertLogs("api.jobs", "ERROR"):
+            first = manager.submit(self.store.reserve(2, ru_count=2), 2, 0)
+            first = await self.wait_finished(manager, first.id)
+            self.astore.commit.side_effect = commit
+            second = manager.submit(self.store.reserve(2, ru_count=2), 2, 0)
+            second = await self.wait_finished(manager, second.id)
+            await asyncio.sleep(0.03)
+            housekeeping_alive = not manager._tasks[-1].done()
+        await manager.stop()
+
+        self.assertEqual((first.status, first.error), ("failed", "gone"))
+        self.assertIsNotNone(first.finished_at)
+        self.assertEqual(second.status, "completed")
+        self.assertTrue(housekeeping_alive)
+
+    async def test_hotels_take_turns_and_quota_counts_per_hotel(self):
+        other = self.astore.for_hotel("other", "Other")
+        other.store.initialize()
+        await other.import_passwords([f"OTHER{index}" for index in range(3)])
+        order = []
+
+        def render(job, work_dir, _progress):
+            order.append(job.hotel_id)
+            out = work_dir / "brochures.pdf"
+            out.write_bytes(b"%PDF")
+            return str(out)
+
+        manager = JobManager(self.astore, render)
+        submitted = [
+            manager.submit(self.store.reserve(1), 1, 0) for _ in range(3)
+        ] + [
+            manager.submit(await other.reserve(1), 1, 0, other) for _ in range(3)
+        ]
+        self.assertEqual(manager.pending("other"), 3)
+        self.assertEqual(manager.pending(), 6)
+
+        await manager.start()
+        for job in submitted:
+            await self.wait_finished(manager, job.id)
+        await manager.stop()
+
+        self.assertEqual(order, ["standalone", "other"] * 3)
+        self.assertEqual((await other.stats())["used"], 3)
+        self.assertEqual(self.store.stats()["used"], 3)
+
+    def expire_leases(self):
+        with self.store._connection() as connection:
+            connection.execute(
+                """
+                UPDATE passwords
+                SET reserved_at = datetime('now', '-20 minutes')
+                WHERE status = 'reserved'
+                """
+            )
+
+    async def test_reaper_releases_expired_leases_and_reports_runs(self):
+        self.store.reserve(2)
+        self.store.reserve(1)
+        self.expire_leases()
+        reaper = LeaseReaper(self.astore, batch_size=1)
+
+        self.assertEqual(await reaper.run_once(), 3)
+        self.assertEqual(await reaper.run_once(), 0)
+
+        stats = reaper.stats()
+        self.assertEqual(
+            (stats["runs"], stats["released"], stats["last_released"]), (2, 3, 0)
+        )
+        self.assertIsNotNone(stats["last_duration_ms"])
+        self.assertEqual(self.store.stats()["available"], 6)
+
+    async def test_heartbeat_keeps_long_render_lease_alive(self):
+        reservation = self.store.reserve(2)
+        self.expire_leases()
+        async with lease_heartbeat(self.astore, reservation.batch_id, 0.01):
+            await asyncio.sleep(0.05)
+            await LeaseReaper(self.astore).run_once()
+
+        self.assertEqual(self.store.stats()["reserved"], 2)
+
+    async def test_heartbeat_keeps_beating_after_a_failed_renewal(self):
+        failures = [RuntimeError("gone")]
+
+        def flaky(_batch_id):
+            if failures:
+                raise failures.pop()
+            return 1
+
+        renew = AsyncMock(side_effect=flaky)
+        with patch.object(self.astore, "renew", renew), self.assertLogs(
+            "api.jobs", "ERROR"
+        ):
+            async with lease_heartbeat(self.astore, "batch", 0.01):
+                await asyncio.sleep(0.05)
+
+        self.assertGreater(renew.await_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from prometheus_client import REGISTRY
+
+from api import metrics
+from api.async_storage import ThreadedAsyncStore
+from api.brochure import convert_pptx_batch_to_pdf
+from api.profiling import RenderProfile
+from api.storage import PasswordStore
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class MeteredStoreTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = PasswordStore(
+            str(Path(self.temp_dir.name) / "vouchers.db"), hotel_id="metered"
+        )
+        self.store.initialize()
+        self.astore = metrics.MeteredStore(ThreadedAsyncStore(self.store))
+
+    async def asyncTearDown(self):
+        await self.astore.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_calls_are_timed_and_returned_stats_feed_the_gauge(self):
+        before = sample(
+            "wifi_voucher_store_operation_duration_seconds_count",
+            operation="import_passwords_with_stats",
+        )
+
+        await self.astore.import_passwords_with_stats(["ONE", "TWO"])
+        await self.astore.reserve(1)
+
+        self.assertEqual(
+            sample(
+                "wifi_voucher_store_operation_duration_seconds_count",
+                operation="import_passwords_with_stats",
+            ),
+            before + 1,
+        )
+        self.assertEqual(
+            sample("wifi_voucher_passwords", hotel="metered", status="available"), 2
+        )
+        self.assertFalse(metrics.stats_stale("metered", 60))
+        self.assertTrue(metrics.stats_stale("metered", -1))
+        self.assertEqual(self.astore.hotel_id, "metered")
+
+        await self.astore.stats()
+        self.assertEqual(
+            sample("wifi_voucher_passwords", hotel="metered", status="reserved"), 1
+        )
+
+
+class OfficeMetricsTests(unittest.TestCase):
+    def test_failed_batch_is_counted_and_timed(self):
+        failures = sample("wifi_voucher_office_conversion_failures_total")
+        conversions = sample("wifi_voucher_office_conversion_duration_seconds_count")
+        profile = RenderProfile()
+
+        with tempfile.TemporaryDirectory() as temp_dir, patch(
+            "subprocess.run",
+            return_value=SimpleNamespace(returncode=1, stdout="", stderr="crash"),
+        ):
+            with self.assertRaisesRegex(RuntimeError, "crash"):
+                convert_pptx_batch_to_pdf(
+                    "soffice",
+                    [str(Path(temp_dir) / "one.pptx")],
+                    temp_dir,
+                    profile=profile,
+                )
+        metrics.record_generation("metered", "failed", profile)
+
+        self.assertEqual(
+            sample("wifi_voucher_office_conversion_failures_total"), failures + 1
+        )
+        self.assertEqual(
+            sample("wifi_voucher_office_conversion_duration_seconds_count"),
+            conversions + 1,
+        )
+
+    def test_rendering_does_not_need_the_prometheus_client(self):
+        subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, api.brochure, api.office; "
+                "sys.exit('prometheus_client' in sys.modules)",
+            ],
+            check=True,
+        )
+
+if __name__ == "__main__":
+    unittest.main()
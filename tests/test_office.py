@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from api.office import OfficePool
+
+
+def _profile(command: list[str]) -> str:
+    return next(part for part in command if part.startswith("-env:"))
+
+
+class OfficePoolTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.inputs = []
+        for index in range(5):
+            path = self.root / f"part_{index}.pptx"
+            path.write_bytes(b"pptx")
+            self.inputs.append(str(path))
+        self.commands: list[list[str]] = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fake_run(self, command, **_kwargs):
+        self.commands.append(command)
+        if "--convert-to" in command:
+            out_index = command.index("--outdir")
+            destination = Path(command[out_index + 1])
+            for source in command[out_index + 2:]:
+                (destination / f"{Path(source).stem}.pdf").write_bytes(b"pdf")
+        return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+    def test_warm_profiles_are_reused_and_order_is_kept(self):
+        pool = OfficePool("soffice", size=2, profile_root=str(self.root / "lo"))
+        with patch("subprocess.run", side_effect=self.fake_run):
+            pool.start()
+            first = pool.convert(self.inputs, str(self.root / "pdf"))
+            second = pool.convert(self.inputs[:2], str(self.root / "pdf"))
+        pool.close()
+
+        self.assertEqual(
+            [Path(path).name for path in first],
+            [f"part_{index}.pdf" for index in range(5)],
+        )
+        self.assertEqual(len(second), 2)
+        warmups = [c for c in self.commands if "--terminate_after_init" in c]
+        conversions = [c for c in self.commands if "--convert-to" in c]
+        self.assertEqual(len(warmups), 2)
+        self.assertEqual(
+            {_profile(c) for c in conversions},
+            {_profile(c) for c in warmups},
+        )
+        self.assertEqual(pool.health()["healthy"], 2)
+
+    def test_failed_job_rewarms_worker(self):
+        pool = OfficePool("soffice", size=1, profile_root=str(self.root / "lo"))
+
+        def crashing_run(command, **kwargs):
+            if "--convert-to" in command:
+                self.commands.append(command)
+                return SimpleNamespace(returncode=81, stdout="", stderr="crash")
+            return self.fake_run(command, **kwargs)
+
+        with patch("subprocess.run", side_effect=crashing_run):
+            pool.start()
+            with self.assertRaisesRegex(RuntimeError, "crash"):
+                pool.convert(self.inputs[:1], str(self.root / "pdf"))
+        pool.close()
+
+        worker = pool.health()["workers"][0]
+        self.assertEqual(worker["failures"], 1)
+        self.assertEqual(worker["restarts"], 1)
+        self.assertEqual(pool.health()["idle"], 1)
+
+    def test_probe_rebuilds_broken_profiles_and_rechecks_healthy_ones(self):
+        pool = OfficePool("soffice", size=2, profile_root=str(self.root / "lo"))
+        with patch("subprocess.run", side_effect=self.fake_run):
+            pool.start()
+            pool.workers[0].healthy = False
+            shutil.rmtree(pool.workers[1].profile_dir, ignore_errors=True)
+            self.commands.clear()
+            pool.probe()
+            pool.probe()
+        pool.close()
+
+        health = pool.health()
+        self.assertEqual(health["healthy"], 2)
+        self.assertEqual(health["idle"], 2)
+        self.assertEqual(health["probes"], 2)
+        self.assertEqual([w["restarts"] for w in health["workers"]], [1, 1])
+        # Two rebuilds, then two cheap re-checks of the healthy profiles.
+        self.assertEqual(len(self.commands), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
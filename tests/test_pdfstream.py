@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import gc
+import io
+import tempfile
+import unittest
+import weakref
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+    TextStringObject,
+)
+
+from api.brochure import build_merged_pdf_overlay
+from api.pdfstream import StreamingPdfWriter
+
+
+class StreamingPdfWriterTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.parts = []
+        # Separate files, as LibreOffice and the brochure caches produce them.
+        for password in ("RU-ONE", "RU-TWO", "RU-THREE"):
+            part = Path(cls.temp_dir.name) / f"{password}.pdf"
+            build_merged_pdf_overlay(
+                "web/public/templates", "fonts/circe.ttf", [password], [], str(part)
+            )
+            cls.parts.append(part)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def assemble(self, writer: StreamingPdfWriter) -> bytes:
+        pieces = [
+            writer.add_page(page)
+            for part in self.parts
+            for page in PdfReader(part).pages
+        ]
+        return b"".join(pieces) + writer.finish()
+
+    def test_identical_resources_of_separate_files_are_written_once(self):
+        writer = StreamingPdfWriter()
+        data = self.assemble(writer)
+
+        self.assertGreater(writer.shared_objects, 0)
+        self.assertLess(len(data), sum(part.stat().st_size for part in self.parts) / 2)
+        reader = PdfReader(io.BytesIO(data), strict=True)
+        self.assertEqual(len(reader.pages), 6)
+        self.assertIn("RU-ONE", reader.pages[1].extract_text())
+        self.assertIn("RU-THREE", reader.pages[5].extract_text())
+        self.assertNotIn("RU-ONE", reader.pages[5].extract_text())
+
+    def test_compression_uses_object_and_xref_streams(self):
+        compressed = self.assemble(StreamingPdfWriter())
+        plain = self.assemble(StreamingPdfWriter(compress=False))
+
+        self.assertIn(b"/ObjStm", compressed)
+        self.assertIn(b"/XRef", compressed)
+        self.assertNotIn(b"\nxref\n", compressed)
+        self.assertIn(b"\nxref\n", plain)
+        self.assertLess(len(compressed), len(plain))
+        for data in (compressed, plain):
+            reader = PdfReader(io.BytesIO(data), strict=True)
+            self.assertEqual(len(reader.pages), 6)
+            self.assertIn("RU-TWO", reader.pages[3].extract_text())
+
+    def test_p_is_dropped_only_as_a_back_reference(self):
+        source = PdfWriter()
+        page = source.add_blank_page(100, 100)
+        annotation = DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Annot"),
+                NameObject("/Subtype"): NameObject("/Text"),
+                NameObject("/Rect"): ArrayObject(NumberObject(0) for _ in range(4)),
+                NameObject("/P"): page.indirect_reference,
+            }
+        )
+        page[NameObject("/Annots")] = ArrayObject([source._add_object(annotation)])
+        page[NameObject("/PieceInfo")] = DictionaryObject(
+            {NameObject("/P"): TextStringObject("kept")}
+        )
+        writer = StreamingPdfWriter()
+
+        data = writer.add_page(page) + writer.finish()
+
+        written = PdfReader(io.BytesIO(data), strict=True).pages[0]
+        self.assertEqual(written["/PieceInfo"]["/P"], "kept")
+        self.assertNotIn("/P", written["/Annots"][0].get_object())
+
+    def test_direct_streams_are_released_after_their_page(self):
+        writer = StreamingPdfWriter()
+        pieces = []
+        for text in (b"BT ET", b"BT ET %second"):
+            source = PdfWriter()
+            page = source.add_blank_page(100, 100)
+            contents = StreamObject()
+            contents._data = text
+            page[NameObject("/Contents")] = contents
+            released = weakref.ref(contents)
+            pieces.append(writer.add_page(page))
+            del source, page, contents
+            gc.collect()
+
+            self.assertIsNone(released())
+
+        reader = PdfReader(io.BytesIO(b"".join(pieces) + writer.finish()), strict=True)
+        self.assertEqual(reader.pages[1].get_contents().get_data(), b"BT ET %second")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from api.async_storage import ThreadedAsyncStore
+from api.hotels import HotelConfig, Tenant
+from api.jobs import RenderSlots
+from api.prerender import PrerenderPool, file_fingerprint
+from api.storage import PasswordStore
+
+HOTEL = HotelConfig("main", "Main", "ru.pptx", "en.pptx", "templates")
+
+
+class PrerenderPoolTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        self.store = PasswordStore(str(root / "test.db"))
+        self.store.initialize()
+        self.store.import_passwords([f"PASS{index}" for index in range(4)])
+        self.astore = ThreadedAsyncStore(self.store)
+        self.template = "v1"
+        self.renders: list[tuple[str, list[str]]] = []
+
+        def render(hotel, language, passwords, out_dir):
+            self.renders.append((language, list(passwords)))
+            paths = []
+            for index, password in enumerate(passwords):
+                path = Path(out_dir) / f"{index}.pdf"
+                path.write_text(f"{language}:{password}:{self.template}")
+                paths.append(str(path))
+            return paths
+
+        self.pool = PrerenderPool(
+            [Tenant(HOTEL, self.astore)],
+            str(root / "cache"),
+            render,
+            lambda _hotel: self.template,
+            stock=2,
+            max_brochures=10,
+        )
+        self.pool.cache_dir.mkdir()
+
+    async def asyncTearDown(self):
+        await self.astore.close()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def test_full_hit_returns_files_in_print_order(self):
+        self.assertEqual(await self.pool.run_once(), 4)
+        reservation = self.store.reserve(2, ru_count=1, en_count=1)
+
+        paths = self.pool.take(HOTEL, reservation.ids, list(reservation.passwords), 1)
+
+        self.assertEqual(
+            [Path(path).read_text() for path in paths],
+            ["ru:PASS0:v1", "en:PASS1:v1"],
+        )
+        self.assertEqual(self.pool.size(), 2)
+        self.assertEqual(self.pool.stats()["hits"], 1)
+
+    async def test_partial_hit_falls_back_to_rendering(self):
+        await self.pool.run_once()
+        reservation = self.store.reserve(3, ru_count=3)
+
+        self.assertIsNone(
+            self.pool.take(HOTEL, reservation.ids, list(reservation.passwords), 3)
+        )
+        self.assertEqual(self.pool.size(), 4)
+        self.assertEqual(self.pool.stats()["misses"], 1)
+
+    async def test_edited_password_and_template_change_invalidate(self):
+        await self.pool.run_once()
+        first = self.store.list_available(limit=1)[0]["id"]
+        self.store.update_available(first, "EDITED")
+        reservation = self.store.reserve(1, ru_count=1)
+        self.assertIsNone(
+            self.pool.take(HOTEL, reservation.ids, list(reservation.passwords), 1)
+        )
+        self.store.release(reservation.batch_id)
+
+        self.template = "v2"
+        self.renders.clear()
+        await self.pool.run_once()
+
+        self.assertEqual(
+            self.renders, [("ru", ["EDITED", "PASS1"]), ("en", ["EDITED", "PASS1"])]
+        )
+        reservation = self.store.reserve(1, ru_count=1)
+        paths = self.pool.take(HOTEL, reservation.ids, list(reservation.passwords), 1)
+        self.assertEqual(Path(paths[0]).read_text(), "ru:EDITED:v2")
+
+    async def test_discard_removes_files(self):
+        await self.pool.run_once()
+        first = self.store.list_available(limit=1)[0]["id"]
+
+        self.pool.discard(HOTEL.id, [first])
+
+        self.assertEqual(self.pool.size(), 2)
+        self.assertEqual(len(list(self.pool.cache_dir.glob("*.pdf"))), 2)
+
+    async def test_limit_evicts_oldest_and_stops_rendering(self):
+        self.pool.max_brochures = 3
+
+        await self.pool.run_once()
+        self.assertEqual(self.pool.size(), 3)
+        self.assertEqual(self.pool.stats()["evicted"], 1)
+        self.assertEqual(len(list(self.pool.cache_dir.glob("*.pdf"))), 3)
+
+        self.renders.clear()
+        await self.pool.run_once()
+        self.assertEqual(self.renders, [])
+
+    async def test_any_busy_render_slot_postpones_filling(self):
+        slots = RenderSlots(2)
+        self.pool.slots = slots
+        async with slots:
+            self.assertEqual(await self.pool.run_once(), 0)
+        self.assertEqual(await self.pool.run_once(), 4)
+
+    async def test_filling_leaves_every_slot_to_requests(self):
+        slots = RenderSlots(1)
+        self.pool.slots = slots
+        taken = []
+
+        def render(hotel, language, passwords, out_dir):
+            taken.append(slots.try_acquire())
+            slots.release()
+            return []
+
+        self.pool.render = render
+        await self.pool.run_once()
+
+        self.assertEqual(taken, [True, True])
+
+
+class FileFingerprintTests(unittest.TestCase):
+    def test_changes_when_a_file_changes_or_disappears(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "brochure_ru.pdf"
+            path.write_bytes(b"one")
+            before = file_fingerprint([path])
+            path.write_bytes(b"longer")
+            after = file_fingerprint([path])
+            path.unlink()
+
+            self.assertNotEqual(before, after)
+            self.assertNotEqual(after, file_fingerprint([path]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import io
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from api import qr
+
+
+class QrCacheTests(unittest.TestCase):
+    def setUp(self):
+        qr.cache.clear()
+
+    def test_png_has_exact_pixel_size_and_is_cached(self):
+        first = qr.qr_png("ABCD-1234", size=431)
+        second = qr.qr_png("ABCD-1234", size=431)
+
+        self.assertIs(first, second)
+        self.assertEqual(Image.open(io.BytesIO(first)).size, (431, 431))
+        self.assertEqual(qr.cache.hits, 1)
+
+    def test_cache_is_bounded_lru(self):
+        cache = qr.QrCache(max_size=2)
+        cache.put(("a",), 1)
+        cache.put(("b",), 2)
+        cache.get(("a",))
+        cache.put(("c",), 3)
+
+        self.assertEqual(cache.get(("a",)), 1)
+        self.assertIsNone(cache.get(("b",)))
+        self.assertEqual(len(cache), 2)
+
+    def test_batch_keeps_order_and_fills_cache(self):
+        payloads = [f"PASSWORD-{index}" for index in range(10)]
+        qr.qr_png("PASSWORD-3", size=200)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pngs = qr.qr_png_batch(
+                payloads, size=200, executor=executor, chunk_size=3
+            )
+
+        self.assertEqual(pngs, [qr.qr_png(payload, size=200) for payload in payloads])
+        self.assertEqual(len(qr.cache), 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from api.brochure import render_brochure_pdfs
+from api.profiling import RenderProfile
+from api.render_cache import RenderCache
+
+
+class RenderCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.cache_dir = self.root / "cache"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def pdf(self, name: str, size: int) -> Path:
+        path = self.root / name
+        path.write_bytes(b"x" * size)
+        return path
+
+    def test_fetch_returns_what_was_stored(self):
+        cache = RenderCache(str(self.cache_dir), max_bytes=1000)
+        key = RenderCache.key("template", "PASS1")
+
+        self.assertFalse(cache.fetch(key, self.root / "miss.pdf"))
+        cache.store(key, self.pdf("rendered.pdf", 10))
+        self.assertTrue(cache.fetch(key, self.root / "hit.pdf"))
+
+        self.assertEqual((self.root / "hit.pdf").read_bytes(), b"x" * 10)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertNotEqual(key, RenderCache.key("template", "PASS2"))
+
+    def test_byte_budget_evicts_least_recently_used(self):
+        cache = RenderCache(str(self.cache_dir), max_bytes=25)
+        cache.store("a", self.pdf("a.pdf", 10))
+        cache.store("b", self.pdf("b.pdf", 10))
+        self.assertTrue(cache.fetch("a", self.root / "a-again.pdf"))
+
+        cache.store("c", self.pdf("c.pdf", 10))
+
+        self.assertTrue(cache.fetch("a", self.root / "a-third.pdf"))
+        self.assertFalse(cache.fetch("b", self.root / "b-again.pdf"))
+        self.assertEqual(cache.stats()["bytes"], 20)
+        self.assertEqual(cache.stats()["evicted"], 1)
+
+    def test_restart_keeps_files_and_drops_abandoned_writes(self):
+        cache = RenderCache(str(self.cache_dir), max_bytes=1000)
+        cache.store("a", self.pdf("a.pdf", 10))
+        abandoned = self.cache_dir / ".b.1234.tmp"
+        abandoned.write_bytes(b"half")
+        old = time.time() - RenderCache.STALE_SECONDS - 60
+        os.utime(abandoned, (old, old))
+        # Another worker's store() that is still copying.
+        (self.cache_dir / ".c.5678.tmp").write_bytes(b"half")
+
+        reopened = RenderCache(str(self.cache_dir), max_bytes=1000)
+
+        self.assertTrue(reopened.fetch("a", self.root / "a-again.pdf"))
+        self.assertEqual(sorted(os.listdir(self.cache_dir)), [".c.5678.tmp", "a.pdf"])
+        self.assertEqual(reopened.stats()["bytes"], 10)
+
+
+class CachedRenderTests(unittest.TestCase):
+    def test_retry_converts_only_brochures_not_seen_before(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            cache = RenderCache(str(root / "cache"), max_bytes=10_000_000)
+            converted: list[str] = []
+
+            def fake_run(command, **_kwargs):
+                out_index = command.index("--outdir")
+                destination = Path(command[out_index + 1])
+                for source in command[out_index + 2:]:
+                    converted.append(Path(source).stem)
+                    (destination / f"{Path(source).stem}.pdf").write_bytes(
+                        Path(source).stem.encode()
+                    )
+                return SimpleNamespace(returncode=0, stdout="", stderr="")
+
+            def render(passwords: list[str], attempt: str) -> list[str]:
+                work = root / attempt
+                work.mkdir()
+                return render_brochure_pdfs(
+                    "soffice",
+                    [
+                        (
+                            "api/templates/brochure_ru.pptx",
+                            password,
+                            str(work / f"ru_{index}.pptx"),
+                        )
+                        for index, password in enumerate(passwords)
+                    ],
+                    str(work),
+                    profile=profile,
+                    render_cache=cache,
+                )
+
+            profile = RenderProfile()
+            with patch("subprocess.run", side_effect=fake_run):
+                render(["RU-1", "RU-2"], "first")
+                retried = render(["RU-1", "RU-2", "RU-3"], "retry")
+
+            self.assertEqual(converted, ["ru_0", "ru_1", "ru_2"])
+            self.assertEqual(
+                [Path(path).read_bytes() for path in retried],
+                [b"ru_0", b"ru_1", b"ru_2"],
+            )
+            self.assertIn("cache", profile.phases)
+            self.assertEqual(cache.stats()["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
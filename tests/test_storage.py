@@ -1,11 +1,18 @@
 from __future__ import annotations
 
 import tempfile
+import time
 import unittest
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
-from api.storage import NotEnoughPasswords, PasswordStore
+from api.storage import (
+    NotEnoughPasswords,
+    PasswordConflict,
+    PasswordStore,
+    PostgresPasswordStore,
+)
 
 
 class PasswordStoreTests(unittest.TestCase):
@@ -15,6 +22,7 @@ class PasswordStoreTests(unittest.TestCase):
         self.store.initialize()
 
     def tearDown(self):
+        self.store.close()
         self.temp_dir.cleanup()
 
     def test_import_skips_headers_empty_values_and_duplicates(self):
@@ -41,6 +49,24 @@ class PasswordStoreTests(unittest.TestCase):
             ["THIRD"],
         )
 
+    def test_render_profile_is_saved_with_the_generation(self):
+        self.store.import_passwords(["FIRST", "SECOND"])
+        profile = {"phases_ms": {"overlay": 12.5}, "office_batches": [], "bytes": 42}
+
+        committed = self.store.reserve(1)
+        self.store.commit(committed.batch_id, profile)
+        released = self.store.reserve(1)
+        self.store.release(released.batch_id, "boom")
+
+        generations = {
+            item["id"]: item["profile"] for item in self.store.list_generations()
+        }
+        self.assertEqual(generations[committed.batch_id], profile)
+        self.assertIsNone(generations[released.batch_id])
+        self.assertEqual(
+            self.store.get_generation(committed.batch_id)["profile"], profile
+        )
+
     def test_failed_generation_can_release_reservation(self):
         self.store.import_passwords(["FIRST", "SECOND"])
         reservation = self.store.reserve(2)
@@ -59,6 +85,101 @@ class PasswordStoreTests(unittest.TestCase):
         self.assertEqual(self.store.stats()["available"], 1)
         self.assertEqual(self.store.stats()["reserved"], 0)
 
+    def test_bulk_import_keeps_accounting_and_paste_order(self):
+        self.store.import_passwords(["P-00005"])
+        batch = [f"P-{index:05d}" for index in range(20000)]
+        batch += ["P-00001", "", "Пароль"]
+
+        result = self.store.import_passwords(reversed(batch))
+
+        self.assertEqual(
+            result,
+            {"requested": 20003, "added": 19999, "duplicates": 2, "invalid": 2},
+        )
+        items = self.store.list_available(limit=3)
+        self.assertEqual(
+            [item["password"] for item in items],
+            ["P-00005", "P-00001", "P-19999"],
+        )
+
+    def test_keyset_pages_follow_after_id(self):
+        self.store.import_passwords([f"P-{index:02d}" for index in range(7)])
+        pages = []
+        after_id = None
+        while True:
+            items = self.store.list_available(limit=3, after_id=after_id)
+            if not items:
+                break
+            pages.append([item["password"] for item in items])
+            after_id = items[-1]["id"]
+
+        self.assertEqual(
+            pages,
+            [["P-00", "P-01", "P-02"], ["P-03", "P-04", "P-05"], ["P-06"]],
+        )
+
+    def test_search_uses_trigram_index_and_tracks_changes(self):
+        self.store.import_passwords(["alpha-one", "BETA-TWO", "gamma-ALPHA", "xy"])
+        items = {item["password"]: item["id"] for item in self.store.list_available()}
+        self.store.update_available(items["BETA-TWO"], "beta-alpha")
+        self.store.delete_available(items["gamma-ALPHA"])
+        self.store.issue_available([items["alpha-one"]])
+
+        def search(term: str) -> list[str]:
+            return [item["password"] for item in self.store.list_available(search=term)]
+
+        self.assertTrue(self.store._search_index)
+        self.assertEqual(search("ALPHA"), ["beta-alpha"])
+        self.assertEqual(search("two"), [])
+        self.assertEqual(search("xy"), ["xy"])
+        with self.store._connection() as connection:
+            plan = " ".join(
+                row["detail"]
+                for row in connection.execute(
+                    """
+                    EXPLAIN QUERY PLAN
+                    SELECT rowid FROM passwords_search WHERE password LIKE '%alp%'
+                    """
+                ).fetchall()
+            )
+        self.assertIn("VIRTUAL TABLE INDEX", plan)
+
+    def test_hot_queries_use_partial_indexes(self):
+        queries = {
+            "idx_passwords_available": (
+                """
+                SELECT id FROM passwords
+                WHERE hotel_id = ? AND status = 'available'
+                ORDER BY id LIMIT 10
+                """,
+                (self.store.hotel_id,),
+            ),
+            "idx_passwords_reserved_lease": (
+                """
+                SELECT batch_id FROM passwords
+                WHERE hotel_id = ? AND status = 'reserved'
+                  AND reserved_at < datetime('now', '-15 minutes')
+                """,
+                (self.store.hotel_id,),
+            ),
+            "idx_passwords_reserved_batch": (
+                """
+                SELECT id FROM passwords
+                WHERE hotel_id = ? AND status = 'reserved' AND batch_id = ?
+                """,
+                (self.store.hotel_id, "batch"),
+            ),
+        }
+        with self.store._connection() as connection:
+            for index, (query, params) in queries.items():
+                plan = " ".join(
+                    row["detail"]
+                    for row in connection.execute(
+                        f"EXPLAIN QUERY PLAN {query}", params
+                    ).fetchall()
+                )
+                self.assertIn(index, plan)
+
     def test_used_password_cannot_be_imported_again(self):
         self.store.import_passwords(["ONCE"])
         reservation = self.store.reserve(1)
@@ -160,6 +281,218 @@ class PasswordStoreTests(unittest.TestCase):
         self.assertEqual(restarted_store.stats()["available"], 2)
         self.assertEqual(restarted_store.stats()["reserved"], 0)
 
+    def test_renewed_lease_survives_stale_release(self):
+        self.store.import_passwords(["FIRST", "SECOND"])
+        reservation = self.store.reserve(2, ru_count=2)
+        with self.store._connection() as connection:
+            connection.execute(
+                """
+                UPDATE passwords
+                SET reserved_at = datetime('now', '-20 minutes')
+                WHERE hotel_id = ? AND status = 'reserved'
+                """,
+                (self.store.hotel_id,),
+            )
+
+        self.assertEqual(self.store.renew(reservation.batch_id), 2)
+        self.assertEqual(self.store.release_stale_reservations(), 0)
+        self.assertEqual(self.store.stats()["reserved"], 2)
+        self.assertEqual(
+            self.store.get_generation(reservation.batch_id)["status"],
+            "reserved",
+        )
+        self.assertIsNone(self.store.get_generation("missing"))
+
+    def test_expired_leases_are_released_in_batches_outside_reserve(self):
+        self.store.import_passwords([f"P-{index}" for index in range(8)])
+        expired = [self.store.reserve(2) for _ in range(3)]
+        with self.store._connection() as connection:
+            connection.execute(
+                """
+                UPDATE passwords
+                SET reserved_at = datetime('now', '-20 minutes')
+                WHERE hotel_id = ? AND status = 'reserved'
+                """,
+                (self.store.hotel_id,),
+            )
+
+        self.store.reserve(2)
+        self.assertEqual(self.store.stats()["reserved"], 8)
+        self.assertEqual(self.store.release_stale_reservations(batch_size=2), 6)
+        self.assertEqual(self.store.stats()["available"], 6)
+        self.assertEqual(
+            {self.store.get_generation(item.batch_id)["status"] for item in expired},
+            {"failed"},
+        )
+
+    def test_connection_is_reused_per_thread_with_tuned_pragmas(self):
+        with self.store._connection() as first:
+            pass
+        with self.store._connection() as second:
+            synchronous = second.execute("PRAGMA synchronous").fetchone()[0]
+            temp_store = second.execute("PRAGMA temp_store").fetchone()[0]
+        self.assertIs(first, second)
+        # NORMAL = 1, MEMORY = 2
+        self.assertEqual((synchronous, temp_store), (1, 2))
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            other = executor.submit(lambda: self.store._connections.get()).result()
+        self.assertIsNot(other, first)
+        self.assertEqual(self.store.pool_stats()["connections"], 2)
+
+    def test_background_checkpoint_flushes_wal(self):
+        self.store.import_passwords([f"PASSWORD-{index}" for index in range(50)])
+        self.store.start_checkpoints(0.01)
+        wal = Path(f"{self.store.database_path}-wal")
+        for _ in range(100):
+            busy, log_frames, checkpointed = self.store.checkpoint()
+            if log_frames == checkpointed:
+                break
+            time.sleep(0.01)
+        self.assertTrue(self.store.pool_stats()["checkpoints"])
+        self.assertEqual(busy, 0)
+        self.assertEqual(log_frames, checkpointed)
+        self.assertTrue(wal.exists())
+        self.store.close()
+        self.assertFalse(self.store.pool_stats()["checkpoints"])
+
+    def scanned_stats(self) -> dict[str, int]:
+        with self.store._connection() as connection:
+            rows = connection.execute(
+                """
+                SELECT status, COUNT(*) AS count
+                FROM passwords
+                WHERE hotel_id = ?
+                GROUP BY status
+                """,
+                (self.store.hotel_id,),
+            ).fetchall()
+        counts = {"available": 0, "reserved": 0, "used": 0, "total": 0}
+        for row in rows:
+            counts[row["status"]] = row["count"]
+            counts["total"] += row["count"]
+        return counts
+
+    def test_counters_match_a_full_scan_after_every_mutation(self):
+        steps = []
+        self.store.import_passwords([f"P-{index:02d}" for index in range(30)])
+        steps.append(self.store.stats())
+        self.store.import_passwords(["P-01", "NEW"])
+        items = self.store.list_available()
+        self.store.update_available(items[0]["id"], "EDITED")
+        self.store.delete_available(items[1]["id"])
+        self.store.delete_available_many([items[2]["id"], items[3]["id"]])
+        self.store.issue_available([items[4]["id"], items[5]["id"]])
+        steps.append(self.store.stats())
+        committed = self.store.reserve(5)
+        released = self.store.reserve(4)
+        stale = self.store.reserve(3)
+        steps.append(self.store.stats())
+        self.store.commit(committed.batch_id)
+        self.store.release(released.batch_id, "failed")
+        with self.store._connection() as connection:
+            connection.execute(
+                """
+                UPDATE passwords
+                SET reserved_at = datetime('now', '-20 minutes')
+                WHERE batch_id = ?
+                """,
+                (stale.batch_id,),
+            )
+        self.store.release_stale_reservations()
+        steps.append(self.store.stats())
+
+        self.assertEqual(steps[-1], self.scanned_stats())
+        self.assertEqual(
+            steps[-1],
+            {"available": 21, "reserved": 0, "used": 7, "total": 28},
+        )
+        self.assertEqual(steps[2]["reserved"], 12)
+        self.assertEqual(self.store.reconcile_counters(), {})
+
+    def test_mutations_return_stats_from_their_own_transaction(self):
+        result, stats = self.store.import_passwords_with_stats(["A", "B", "C", "D"])
+        self.assertEqual(result["added"], 4)
+        self.assertEqual(stats, self.scanned_stats())
+        items, stats = self.store.list_available_with_stats(limit=2)
+        self.assertEqual([item["password"] for item in items], ["A", "B"])
+        self.assertEqual(stats["available"], 4)
+
+        steps = [
+            self.store.update_available_with_stats(items[0]["id"], "A2"),
+            self.store.issue_available_with_stats([items[1]["id"]]),
+            self.store.delete_available_many_with_stats([items[0]["id"]]),
+            self.store.delete_available_with_stats(items[0]["id"]),
+        ]
+
+        self.assertEqual(
+            [result for result, _stats in steps], [True, ["B"], 1, False]
+        )
+        self.assertEqual(
+            [stats["available"] for _result, stats in steps], [4, 3, 2, 2]
+        )
+        self.assertEqual(steps[-1][1], self.scanned_stats())
+        with self.assertRaises(PasswordConflict):
+            self.store.update_available_with_stats(items[0]["id"] + 2, "B")
+
+    def test_reconcile_repairs_counter_drift(self):
+        self.store.import_passwords(["FIRST", "SECOND"])
+        with self.store._connection() as connection:
+            connection.execute(
+                "UPDATE password_counters SET count = 7 WHERE status = 'available'"
+            )
+
+        self.assertEqual(self.store.reconcile_counters(), {"available": -5})
+        self.assertEqual(self.store.stats(), self.scanned_stats())
+
+    def test_archive_moves_old_history_and_keeps_uniqueness(self):
+        self.store.import_passwords([f"P-{index}" for index in range(6)])
+        old = self.store.reserve(3)
+        self.store.commit(old.batch_id)
+        recent = self.store.reserve(1)
+        self.store.commit(recent.batch_id)
+        with self.store._connection() as connection:
+            connection.execute(
+                """
+                UPDATE passwords SET used_at = datetime('now', '-40 days')
+                WHERE password IN (?, ?, ?)
+                """,
+                old.passwords,
+            )
+            connection.execute(
+                """
+                UPDATE generations SET created_at = datetime('now', '-40 days')
+                WHERE id = ?
+                """,
+                (old.batch_id,),
+            )
+        before = self.store.stats()
+
+        moved = self.store.archive(retention_days=30, batch_size=2)
+
+        self.assertEqual(moved, {"passwords": 3, "generations": 1})
+        self.assertEqual(self.store.stats(), before)
+        self.assertEqual(self.scanned_stats()["used"], 1)
+        self.assertEqual(self.store.get_generation(old.batch_id)["status"], "completed")
+        self.assertEqual(
+            [item["id"] for item in self.store.list_generations()],
+            [recent.batch_id, old.batch_id],
+        )
+        self.assertEqual(len(self.store.list_generations(limit=1)), 1)
+        self.assertEqual(self.store.reconcile_counters(), {})
+        archived = old.passwords[0]
+        self.assertEqual(self.store.import_passwords([archived])["duplicates"], 1)
+        self.assertEqual(
+            self.store.preview_import([archived])["items"][0]["status"], "duplicate"
+        )
+        with self.assertRaises(PasswordConflict):
+            self.store.update_available(
+                self.store.list_available()[0]["id"], archived
+            )
+        self.assertEqual(
+            self.store.archive(retention_days=30), {"passwords": 0, "generations": 0}
+        )
+
     def test_hotel_scopes_do_not_leak(self):
         shared_path = str(self.store.database_path)
         other = PasswordStore(shared_path, hotel_id="other", hotel_name="Other")
@@ -170,6 +503,126 @@ class PasswordStoreTests(unittest.TestCase):
         self.assertEqual(self.store.stats()["total"], 1)
         self.assertEqual(other.stats()["total"], 1)
 
+    def test_hotel_store_shares_connections_and_owner_closes_them(self):
+        other = self.store.for_hotel("other", "Other")
+        other.initialize()
+        other.import_passwords(["OTHER1", "OTHER2"])
+
+        self.assertIs(other._connections, self.store._connections)
+        self.assertIs(other._connections.get(), self.store._connections.get())
+        self.assertEqual(other.stats()["available"], 2)
+        self.assertEqual(self.store.stats()["available"], 0)
+
+        other.close()
+        self.assertEqual(self.store.stats()["total"], 0)
+
+
+class PostgresPoolTests(unittest.TestCase):
+    def test_connections_come_from_one_lazily_opened_pool(self):
+        store = PostgresPasswordStore(
+            "postgresql://example/db",
+            hotel_id="hotel",
+            hotel_name="Hotel",
+            pool_min_size=2,
+            pool_max_size=4,
+        )
+        pool = MagicMock()
+        pool.get_stats.return_value = {"pool_size": 2, "pool_available": 1}
+        self.assertIsNone(store.pool_stats())
+
+        with patch("psycopg_pool.ConnectionPool", return_value=pool) as factory:
+            with store._connection():
+                pass
+            with store._connection():
+                pass
+            store.close()
+
+        factory.assert_called_once()
+        _args, kwargs = factory.call_args
+        self.assertEqual((kwargs["min_size"], kwargs["max_size"]), (2, 4))
+        self.assertIsNotNone(kwargs["check"])
+        self.assertEqual(pool.connection.call_count, 2)
+        pool.close.assert_called_once()
+
+    def test_hotel_store_borrows_the_owner_pool(self):
+        store = PostgresPasswordStore(
+            "postgresql://example/db", hotel_id="hotel", hotel_name="Hotel"
+        )
+        other = store.for_hotel("other", "Other")
+        pool = MagicMock()
+
+        with patch("psycopg_pool.ConnectionPool", return_value=pool) as factory:
+            with other._connection():
+                pass
+            with store._connection():
+                pass
+            other.close()
+            pool.close.assert_not_called()
+            store.close()
+
+        factory.assert_called_once()
+        self.assertEqual(other.hotel_id, "other")
+        pool.close.assert_called_once()
+
+    def test_counted_statement_reports_counters_after_the_change(self):
+        store = PostgresPasswordStore(
+            "postgresql://example/db", hotel_id="hotel", hotel_name="Hotel"
+        )
+        connection = MagicMock()
+        connection.execute.return_value.fetchall.return_value = [
+            {"status": "available", "count": 5, "changed": 2},
+            {"status": "reserved", "count": 0, "changed": 2},
+            {"status": "used", "count": 1, "changed": 2},
+            {"status": "archived", "count": 3, "changed": 2},
+        ]
+
+        changed, stats = store._execute_counted(
+            connection,
+            "UPDATE wifi_voucher.passwords SET status = 'used' WHERE id = ANY(%s)",
+            ([1, 2],),
+            True,
+            source="available",
+            target="used",
+        )
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            stats, {"available": 3, "reserved": 0, "used": 6, "total": 9}
+        )
+        statement, params = connection.execute.call_args.args
+        self.assertIn("WITH changed AS (UPDATE", statement)
+        self.assertIn("RETURNING 1)", statement)
+        self.assertEqual(params, ([1, 2], "hotel"))
+
+    def test_missing_counter_rows_fall_back_to_counting_passwords(self):
+        store = PostgresPasswordStore(
+            "postgresql://example/db", hotel_id="hotel", hotel_name="Hotel"
+        )
+        connection = MagicMock()
+        connection.execute.return_value.fetchall.side_effect = [
+            [
+                {"status": status, "count": None, "changed": 2}
+                for status in ("available", "reserved", "used", "archived")
+            ],
+            [{"status": "available", "count": 4}, {"status": "used", "count": 2}],
+        ]
+
+        with self.assertLogs("api.storage", "WARNING"):
+            changed, stats = store._execute_counted(
+                connection,
+                "UPDATE wifi_voucher.passwords SET status = 'used' WHERE id = ANY(%s)",
+                ([1, 2],),
+                True,
+                source="available",
+                target="used",
+            )
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(
+            stats, {"available": 4, "reserved": 0, "used": 2, "total": 6}
+        )
+        self.assertIn("passwords_archive", connection.execute.call_args.args[0])
+
 
 if __name__ == "__main__":
     unittest.main()